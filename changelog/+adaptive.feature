@@ -0,0 +1 @@
+Add ``--adaptive`` option to ``generate`` to search the efficient number of nodes adaptively.
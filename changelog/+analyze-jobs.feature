@@ -0,0 +1 @@
+Add ``--jobs`` option to ``analyze`` to read benchmarks in parallel.
@@ -0,0 +1 @@
+Add speedup, efficiency and cost columns to ``analyze``. Add ``--min-throughput`` option and ``--rank-by`` cost, throughput or efficiency.
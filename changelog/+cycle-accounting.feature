@@ -0,0 +1 @@
+Write the GROMACS cycle and time accounting table to the CSV file of ``analyze``.
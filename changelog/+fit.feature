@@ -0,0 +1 @@
+Add ``--fit`` and ``--predict`` options to ``analyze`` to fit scaling models and predict the performance on more nodes.
@@ -0,0 +1 @@
+Add ``--jobs`` option to ``generate`` to write benchmarks in parallel.
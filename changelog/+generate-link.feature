@@ -0,0 +1 @@
+Add ``--link`` option to ``generate`` to link input files instead of copying them.
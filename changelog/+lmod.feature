@@ -0,0 +1 @@
+Read the available modules from the Lmod spider cache, if it exists.
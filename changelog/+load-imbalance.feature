@@ -0,0 +1 @@
+Report the load imbalance of GROMACS benchmarks and suggest a value for ``-npme``. Add ``--rank-by waste`` to ``analyze``.
@@ -0,0 +1 @@
+Add ``--mdrun-option`` option to ``generate`` to sweep over mdrun options (GROMACS-only).
@@ -0,0 +1 @@
+Cache the modules found in ``MODULEPATH``. Use ``--refresh-modules`` to update the cache.
@@ -0,0 +1 @@
+Add global ``--profile`` option to print the time spent in each phase of a command.
@@ -0,0 +1 @@
+Add ``recommend`` command to suggest production job settings from the benchmarks.
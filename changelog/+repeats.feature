@@ -0,0 +1 @@
+Add ``--repeats`` option to ``generate`` to run replicates, which are aggregated by ``analyze``.
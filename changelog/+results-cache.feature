@@ -0,0 +1 @@
+Cache parsed log files in ``analyze``. Use ``--no-cache`` to disable and ``--rebuild-cache`` to rebuild the cache.
@@ -0,0 +1 @@
+Add ``status`` command to show the scheduler state of submitted benchmarks.
@@ -0,0 +1 @@
+Add ``--array`` option to ``submit`` to submit benchmarks with the same resources as job arrays.
@@ -0,0 +1 @@
+Add ``--jobs`` option to ``submit`` to submit benchmarks concurrently.
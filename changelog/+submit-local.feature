@@ -0,0 +1 @@
+Add ``--local`` option to ``submit`` to run benchmarks on the local machine.
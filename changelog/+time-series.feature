@@ -0,0 +1 @@
+Add ``--time-series`` option to ``analyze`` to detect runs whose performance drifted (GROMACS-only).
@@ -0,0 +1,139 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+from mdbenchmark import console
+from mdbenchmark.mdengines.utils import parse_log
+
+CACHE_FILENAME = ".mdbenchmark-cache.sqlite"
+# Increase this number whenever the output of `parse_log` changes. Caches
+# written with another version are rebuilt from scratch.
+CACHE_VERSION = 3
+
+
+class ResultsCache:
+    """Persistent cache of parsed log files.
+
+    The cache is stored as a SQLite database at the top of the benchmark
+    directory. Each entry is keyed by the path of the log file relative to that
+    directory and is only valid as long as the modification time and size of
+    the log file did not change.
+
+    All entries are read once on initialization and new entries are only
+    written back on `save`, so that the cache can be used from multiple
+    threads at once.
+    """
+
+    def __init__(self, directory, rebuild=False):
+        self.directory = os.path.abspath(directory)
+        self.filename = os.path.join(self.directory, CACHE_FILENAME)
+        self.rebuild = rebuild
+        self._entries = {}
+        self._updates = {}
+        self._lock = threading.Lock()
+
+        if not self.rebuild:
+            self._load()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.filename)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS logs "
+            "(path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, metrics TEXT)"
+        )
+        return connection
+
+    def _load(self):
+        """Read all entries of an existing cache file."""
+        if not os.path.exists(self.filename):
+            return
+
+        try:
+            with closing(sqlite3.connect(self.filename)) as connection:
+                version = connection.execute(
+                    "SELECT value FROM metadata WHERE key = 'version'"
+                ).fetchone()
+                if version is None or version[0] != str(CACHE_VERSION):
+                    self.rebuild = True
+                    return
+
+                rows = connection.execute("SELECT path, mtime, size, metrics FROM logs")
+                self._entries = {
+                    path: (mtime, size, metrics) for path, mtime, size, metrics in rows
+                }
+        except sqlite3.Error:
+            # Treat unreadable caches as empty. They are overwritten on `save`.
+            self.rebuild = True
+
+    def parse_log(self, engine, filename):
+        """Return the metrics of a log file, parsing it only if it changed.
+
+        See `mdbenchmark.mdengines.utils.parse_log` for details.
+        """
+        stat = os.stat(filename)
+        key = os.path.relpath(os.path.abspath(filename), self.directory)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return json.loads(entry[2])
+
+        metrics = parse_log(engine, filename)
+        with self._lock:
+            self._updates[key] = (
+                stat.st_mtime_ns,
+                stat.st_size,
+                json.dumps(metrics),
+            )
+
+        return metrics
+
+    def save(self):
+        """Write all new and changed entries to the cache file."""
+        if not self._updates and not self.rebuild:
+            return
+
+        try:
+            # Start from an empty file, the old one might be outdated or corrupt.
+            if self.rebuild and os.path.exists(self.filename):
+                os.remove(self.filename)
+
+            with closing(self._connect()) as connection, connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO metadata VALUES ('version', ?)",
+                    (str(CACHE_VERSION),),
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?)",
+                    [(key,) + entry for key, entry in self._updates.items()],
+                )
+        except (OSError, sqlite3.Error) as e:
+            console.warn("Could not write the results cache {}: {}", self.filename, e)
+            return
+
+        self._entries.update(self._updates)
+        self._updates = {}
+        self.rebuild = False
@@ -18,33 +18,150 @@
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
 import click
-import datreant as dtr
 import numpy as np
 
-from mdbenchmark import console
-from mdbenchmark.utils import map_columns, parse_bundle, print_dataframe
+from mdbenchmark import console, profiling, scaling, timeseries
+from mdbenchmark.cache import ResultsCache
+from mdbenchmark.discover import discover
+from mdbenchmark.utils import (
+    RANK_BY,
+    REPEAT_COLUMNS,
+    add_diagnostics,
+    add_efficiency,
+    aggregate_repeats,
+    fit_scaling,
+    map_columns,
+    parse_bundle,
+    print_dataframe,
+    printed_columns,
+    rank_dataframe,
+)
 from mdbenchmark.versions import VersionFactory
 
+NPME_COLUMNS = ["module", "nodes", "number_of_ranks", "npme", "pme_load"]
+STEADY_STATE_COLUMNS = [
+    "module",
+    "host",
+    "nodes",
+    "throughput_drift",
+    "throughput_noise",
+]
 
-def do_analyze(directory, save_csv):
-    """Analyze benchmarks."""
-    bundle = dtr.discover(directory)
-    version = VersionFactory(categories=bundle.categories).version_class
 
-    df = parse_bundle(
-        bundle, columns=version.analyze_categories, sort_values_by=version.analyze_sort,
+def print_npme_suggestions(df, version):
+    """Print the benchmarks where the PME and PP load is not balanced."""
+    if "suggested_npme" not in df.columns:
+        return
+
+    unbalanced = df[
+        df["suggested_npme"].notnull() & (df["suggested_npme"] != df["npme"])
+    ]
+    if unbalanced.empty:
+        return
+
+    console.info(
+        "The load of the PME and PP ranks is not balanced in {} benchmarks. "
+        "Consider to change the number of PME ranks with {}:",
+        len(unbalanced),
+        "-npme",
+    )
+    columns = NPME_COLUMNS + ["suggested_npme"]
+    print_dataframe(
+        unbalanced[columns], columns=map_columns(version.category_mapping, columns)
     )
 
-    # Remove the versions column from the DataFrame
-    columns_to_drop = ["version"]
-    df = df.drop(columns=columns_to_drop)
 
-    if save_csv is not None:
-        if not save_csv.endswith(".csv"):
-            save_csv = "{}.csv".format(save_csv)
-        df.to_csv(save_csv, index=False)
+def print_unsteady_benchmarks(df, version):
+    """Print the benchmarks whose performance did not reach a steady state."""
+    if "throughput_drift" not in df.columns or df["throughput_drift"].isnull().all():
+        console.warn(
+            "Not enough samples to judge the performance over time of any "
+            "benchmark. GROMACS writes a sample with every checkpoint, use {} "
+            "to write them more often.",
+            "--mdrun-option -cpt=1",
+        )
+        return
+
+    steady = [
+        timeseries.is_steady(drift, noise)
+        for drift, noise in zip(df["throughput_drift"], df["throughput_noise"])
+    ]
+    unsteady = df[~np.array(steady)]
+    if unsteady.empty:
+        return
+
+    console.warn(
+        "The performance of {} benchmarks drifted or varied by more than {}. "
+        "They did not run at a steady state, e.g., due to thermal throttling "
+        "or other jobs on the network:",
+        len(unsteady),
+        "{:.0%}".format(timeseries.STEADY_STATE_TOLERANCE),
+    )
+    columns = STEADY_STATE_COLUMNS
+    print_dataframe(
+        unsteady[columns].round({"throughput_drift": 3, "throughput_noise": 3}),
+        columns=map_columns(version.category_mapping, columns),
+    )
+
+
+def print_scaling_fits(df, version, predict_nodes, threshold):
+    """Print the scaling models fitted to each group of benchmarks."""
+    if not predict_nodes:
+        largest = int(df["nodes"].max())
+        predict_nodes = [2 * largest, 4 * largest]
+    performance_column = "performance" if "performance" in df.columns else "ns/day"
+
+    with profiling.phase("aggregate"):
+        fits = fit_scaling(
+            df,
+            columns=version.consolidate_categories,
+            predict_nodes=predict_nodes,
+            threshold=threshold,
+            performance_column=performance_column,
+        )
+    if fits.empty:
+        console.warn(
+            "Not enough finished benchmarks to fit a scaling model. At least {} "
+            "different node counts are needed.",
+            min(len(terms) for terms in scaling.MODELS.values()),
+        )
+        return
+
+    console.info(
+        "Scaling models fitted to the time per nanosecond. The efficient nodes "
+        "are the largest number of nodes with a parallel efficiency of at "
+        "least {}.",
+        "{:.0%}".format(threshold),
+    )
+    columns = printed_columns(fits, version.consolidate_categories)
+    results = ["model", "serial_fraction", "efficient_nodes"] + [
+        "predicted_{}".format(n) for n in predict_nodes
+    ]
+    fits = fits.round({"serial_fraction": 4})
+    print_dataframe(
+        fits[columns + results],
+        columns=map_columns(version.category_mapping, columns)
+        + ["Model", "Serial fraction", "Efficient nodes"]
+        + ["ns/day on {} nodes".format(n) for n in predict_nodes],
+    )
+
 
-        console.success("Successfully benchmark data to {}.", save_csv)
+def print_benchmarks(df, version, rank_by, min_throughput, performance_column):
+    """Print the benchmark categories and results of all benchmarks."""
+    # Only print the columns of the benchmark categories
+    printing = printed_columns(df, version.analyze_printing + REPEAT_COLUMNS)
+    if rank_by is not None:
+        column, _ = RANK_BY[rank_by]
+        # The performance is printed anyway
+        if column != "performance":
+            printing.append(column)
+    df = df[printing]
+
+    # Only show the benchmarks that reach the requested performance
+    if min_throughput is not None:
+        df = df[df[performance_column] >= min_throughput]
+        if df.empty:
+            console.error("None of the benchmarks reaches {} ns/day.", min_throughput)
 
     # Reformat NaN values nicely into question marks.
     # move this to the bundle function!
@@ -69,5 +186,98 @@ def do_analyze(directory, save_csv):
 
     # Print the data to the console
     print_dataframe(
-        df, columns=map_columns(version.category_mapping, version.analyze_printing),
+        df, columns=map_columns(version.category_mapping, printing),
+    )
+
+
+def analyze_directory(
+    directory, jobs=1, use_cache=True, rebuild_cache=False, time_series=False
+):
+    """Return a DataFrame with the results of all benchmarks in `directory`
+    and the version of their categories.
+
+    Replicates of a benchmark are aggregated into a single row. The
+    diagnostics, speedup, efficiency and cost of the benchmarks are added.
+    With `time_series`, the drift and noise of the performance over the
+    course of each run are added as well.
+    """
+    bundle = discover(directory, jobs=jobs)
+    version = VersionFactory(categories=bundle.categories).version_class
+
+    cache = None
+    if use_cache:
+        cache = ResultsCache(directory, rebuild=rebuild_cache)
+
+    df = parse_bundle(
+        bundle,
+        columns=version.analyze_categories,
+        sort_values_by=version.analyze_sort,
+        jobs=jobs,
+        cache=cache,
+        details=True,
+        time_series=time_series,
+    )
+
+    if cache is not None:
+        cache.save()
+
+    performance_column = "performance" if "performance" in df.columns else "ns/day"
+    with profiling.phase("aggregate"):
+        df = aggregate_repeats(df, performance_column=performance_column)
+        df = add_diagnostics(df)
+        df = add_efficiency(
+            df,
+            columns=version.consolidate_categories,
+            performance_column=performance_column,
+        )
+
+    return df, version
+
+
+def do_analyze(
+    directory,
+    save_csv,
+    jobs=1,
+    use_cache=True,
+    rebuild_cache=False,
+    rank_by=None,
+    min_throughput=None,
+    fit=False,
+    predict_nodes=(),
+    efficiency_threshold=scaling.EFFICIENCY_THRESHOLD,
+    time_series=False,
+):
+    """Analyze benchmarks."""
+    df, version = analyze_directory(
+        directory,
+        jobs=jobs,
+        use_cache=use_cache,
+        rebuild_cache=rebuild_cache,
+        time_series=time_series,
     )
+
+    performance_column = "performance" if "performance" in df.columns else "ns/day"
+    with profiling.phase("aggregate"):
+        if rank_by is not None:
+            df = rank_dataframe(df, rank_by, performance_column=performance_column)
+
+    # Remove the versions column from the DataFrame
+    columns_to_drop = ["version"]
+    df = df.drop(columns=columns_to_drop)
+
+    if save_csv is not None:
+        if not save_csv.endswith(".csv"):
+            save_csv = "{}.csv".format(save_csv)
+        with profiling.phase("write"):
+            df.to_csv(save_csv, index=False)
+        console.info("Successfully saved benchmark data to {}.", save_csv)
+
+    print_benchmarks(df, version, rank_by, min_throughput, performance_column)
+
+    print_npme_suggestions(df, version)
+
+    if time_series:
+        print_unsteady_benchmarks(df, version)
+
+    if fit:
+        print_scaling_fits(df, version, predict_nodes, efficiency_threshold)
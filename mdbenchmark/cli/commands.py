@@ -19,21 +19,34 @@
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
 import click
 
+from mdbenchmark import profiling
 from mdbenchmark.__version__ import VERSION
 from mdbenchmark.cli.options import AliasedGroup
 from mdbenchmark.cli.validators import (
     print_known_hosts,
     validate_hosts,
+    validate_mdrun_options,
     validate_module,
     validate_name,
+    validate_rate_limit,
 )
+from mdbenchmark.constants import EFFICIENCY_THRESHOLD, LINK_METHODS, RANK_BY
 
 
 @click.group(cls=AliasedGroup)
 @click.version_option(version=VERSION)
-def cli():
+@click.option(
+    "--profile",
+    help="Print the time spent in each phase of the subcommand (timings, the "
+    "default without a value) or write a cProfile file (cprofile).",
+    type=click.Choice(profiling.PROFILERS),
+)
+@click.pass_context
+def cli(ctx, profile):
     """Generate, run and analyze benchmarks of molecular dynamics simulations."""
-    pass
+    if profile is not None:
+        profiling.start(profile, command=ctx.invoked_subcommand)
+        ctx.call_on_close(profiling.stop)
 
 
 @cli.command()
@@ -50,7 +63,81 @@ def cli():
     default=None,
     help="Filename for the CSV file containing benchmark results.",
 )
-def analyze(directory, save_csv):
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of benchmarks to analyze in parallel.",
+    default=1,
+    show_default=True,
+    type=click.IntRange(1, None),
+)
+@click.option(
+    "--cache/--no-cache",
+    "use_cache",
+    help="Reuse results of log files that did not change since the last analysis.",
+    default=True,
+    show_default=True,
+)
+@click.option(
+    "--rebuild-cache",
+    help="Discard all cached results and parse every log file again.",
+    is_flag=True,
+)
+@click.option(
+    "--rank-by",
+    help="Sort the benchmarks, best first. waste: time spent waiting due to load "
+    "imbalance (GROMACS only), cost: node-hours per ns, throughput: ns/day, "
+    "efficiency: parallel efficiency.",
+    type=click.Choice(list(RANK_BY)),
+    default=None,
+)
+@click.option(
+    "--min-throughput",
+    help="Only print benchmarks that reach this performance in ns/day.",
+    type=float,
+    default=None,
+)
+@click.option(
+    "--fit",
+    help="Fit scaling models to the benchmarks and predict their performance.",
+    is_flag=True,
+)
+@click.option(
+    "--predict",
+    "predict_nodes",
+    help="Number of nodes to predict the performance for with --fit. Can be "
+    "given multiple times. Defaults to two and four times the most nodes.",
+    multiple=True,
+    type=click.IntRange(1, None),
+)
+@click.option(
+    "--efficiency-threshold",
+    help="Parallel efficiency that the efficient number of nodes of --fit must "
+    "reach.",
+    type=click.FloatRange(0, 1),
+    default=EFFICIENCY_THRESHOLD,
+    show_default=True,
+)
+@click.option(
+    "--time-series",
+    help="Reconstruct the performance over the course of each GROMACS run and "
+    "warn about runs that drifted or were noisy. Requires frequent checkpoints, "
+    "generate the benchmarks with --mdrun-option -cpt=1.",
+    is_flag=True,
+)
+def analyze(
+    directory,
+    save_csv,
+    jobs,
+    use_cache,
+    rebuild_cache,
+    rank_by,
+    min_throughput,
+    fit,
+    predict_nodes,
+    efficiency_threshold,
+    time_series,
+):
     """Analyze benchmarks and print the performance results.
 
     Benchmarks are searched recursively starting from the directory specified
@@ -63,10 +150,115 @@ def analyze(directory, save_csv):
     The benchmark performance results can be saved in a CSV file with the
     ``--save-csv`` option and a custom filename. To plot the results use
     ``mdbenchmark plot``.
+
+    Log files of many benchmarks can be read in parallel with the ``--jobs``
+    option. This speeds up the analysis on network file systems.
+
+    Parsed results are cached in the directory specified in ``--directory``.
+    Only new or changed log files are parsed again. Use ``--no-cache`` to
+    neither read nor write the cache and ``--rebuild-cache`` to start from
+    scratch.
+
+    For GROMACS, the load imbalance, the balance of the PME and PP ranks and the
+    timings of all tasks are written to the CSV file, too. Use ``--rank-by
+    waste`` to sort the benchmarks by the time lost waiting due to load
+    imbalance. If the load of the PME and PP ranks is not balanced, a better
+    value for ``-npme`` is suggested.
+
+    The speedup and parallel efficiency relative to the smallest number of
+    nodes, as well as the core-hours and node-hours per simulated nanosecond,
+    are written to the CSV file. Use ``--rank-by cost``, ``throughput`` or
+    ``efficiency`` to sort the benchmarks by them. Together with
+    ``--min-throughput``, the cheapest benchmark that reaches a given
+    performance is printed first.
+
+    Use ``--fit`` to fit Amdahl's law and a model with communication costs to
+    the benchmarks of each configuration. The serial fraction, the largest
+    number of nodes with a parallel efficiency of at least
+    ``--efficiency-threshold`` and the predicted performance on the number of
+    nodes given with ``--predict`` are printed.
+
+    Use ``--time-series`` to reconstruct the performance of GROMACS runs from
+    the checkpoints written to the log files. GROMACS only writes a checkpoint
+    every 15 minutes by default, so the benchmarks must be generated with
+    ``--mdrun-option -cpt=1`` or a similar interval. The series are stored next to
+    the log files. The drift and noise of the performance in the measured
+    second half of each run are written to the CSV file and benchmarks that
+    did not run at a steady state are printed.
+    """
+    with profiling.phase("import"):
+        from mdbenchmark.cli.analyze import do_analyze
+
+    do_analyze(
+        directory=directory,
+        save_csv=save_csv,
+        jobs=jobs,
+        use_cache=use_cache,
+        rebuild_cache=rebuild_cache,
+        rank_by=rank_by,
+        min_throughput=min_throughput,
+        fit=fit,
+        predict_nodes=predict_nodes,
+        efficiency_threshold=efficiency_threshold,
+        time_series=time_series,
+    )
+
+
+@cli.command()
+@click.option(
+    "-d",
+    "--directory",
+    help="Path in which to look for benchmarks.",
+    default=".",
+    show_default=True,
+)
+@click.option(
+    "--csv",
+    help="Read the results from CSV files written by analyze instead.",
+    multiple=True,
+)
+@click.option(
+    "--max-nodes", help="Maximal number of nodes.", type=click.IntRange(1, None),
+)
+@click.option(
+    "--min-throughput", help="Minimal performance in ns/day.", type=float,
+)
+@click.option(
+    "--max-cost", help="Maximal cost in node-hours per ns.", type=float,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of benchmarks to analyze in parallel.",
+    default=1,
+    show_default=True,
+    type=click.IntRange(1, None),
+)
+def recommend(directory, csv, max_nodes, min_throughput, max_cost, jobs):
+    """Recommend the best configurations for production runs.
+
+    Benchmarks are searched recursively starting from the directory specified
+    in ``--directory`` and analyzed like with ``analyze``. Alternatively, the
+    results can be read from CSV files written by ``analyze --save-csv``.
+
+    Only benchmarks that meet all constraints are considered: at most
+    ``--max-nodes`` nodes, a performance of at least ``--min-throughput`` ns/day
+    and a cost of at most ``--max-cost`` node-hours per ns. Of these, all
+    configurations are printed for which no other configuration on the same
+    host, module and GPU usage is both faster and cheaper. The settings of
+    each configuration are printed ready to be pasted into a SLURM job script.
     """
-    from mdbenchmark.cli.analyze import do_analyze
+    with profiling.phase("import"):
+        from mdbenchmark.cli.recommend import do_recommend
 
-    do_analyze(directory=directory, save_csv=save_csv)
+    do_recommend(
+        directory=directory,
+        csv=csv,
+        max_nodes=max_nodes,
+        min_throughput=min_throughput,
+        max_cost=max_cost,
+        jobs=jobs,
+    )
 
 
 @cli.command()
@@ -142,6 +334,12 @@ def analyze(directory, save_csv):
     default=False,
     is_flag=True,
 )
+@click.option(
+    "--refresh-modules",
+    help="Rescan the module directories instead of using the cached list of modules.",
+    default=False,
+    is_flag=True,
+)
 @click.option(
     "--job-name", help="Give an optional to the generated benchmarks.", default=None
 )
@@ -184,6 +382,51 @@ def analyze(directory, save_csv):
     type=int,
     default=(1,),
 )
+@click.option(
+    "--mdrun-option",
+    "mdrun_options",
+    help="Generate benchmarks for each value of an mdrun option, "
+    "e.g., -npme=0,2,4. Can be given multiple times.",
+    metavar="NAME=VALUES",
+    multiple=True,
+    callback=validate_mdrun_options,
+)
+@click.option(
+    "--repeats",
+    help="Number of replicates to generate of each benchmark.",
+    default=1,
+    show_default=True,
+    type=click.IntRange(1, None),
+)
+@click.option(
+    "--adaptive",
+    help="Only generate the node counts needed next to find the largest "
+    "efficient number of nodes.",
+    default=False,
+    is_flag=True,
+)
+@click.option(
+    "--efficiency-threshold",
+    help="Parallel efficiency below which more nodes are not worth it.",
+    type=click.FloatRange(0, 1),
+    default=EFFICIENCY_THRESHOLD,
+    show_default=True,
+)
+@click.option(
+    "--link",
+    help="How to put the input files into the benchmark folders.",
+    type=click.Choice(LINK_METHODS),
+    default="copy",
+    show_default=True,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of benchmarks to generate in parallel.",
+    default=1,
+    show_default=True,
+    type=click.IntRange(1, None),
+)
 def generate(
     name,
     cpu,
@@ -194,6 +437,7 @@ def generate(
     max_nodes,
     time,
     skip_validation,
+    refresh_modules,
     job_name,
     yes,
     physical_cores,
@@ -201,6 +445,12 @@ def generate(
     number_of_ranks,
     enable_hyperthreading,
     multidir,
+    mdrun_options,
+    repeats,
+    adaptive,
+    efficiency_threshold,
+    link,
+    jobs,
 ):
     """Generate benchmarks for molecular dynamics simulations.
 
@@ -210,7 +460,9 @@ def generate(
     name, or can be overwritten with the ``--job-name`` option.
 
     The specified module name will be validated and searched on the current
-    system. To skip this check, use the ``--skip-validation`` option.
+    system. To skip this check, use the ``--skip-validation`` option. The list
+    of available modules is cached and only updated when the module directories
+    change or at least once a day. Use ``--refresh-modules`` to update it now.
 
     Benchmarks will be generated for CPUs per default (``--cpu``), but can also
     be generated for GPUs (``--gpu``) at the same time or without CPUs
@@ -221,8 +473,31 @@ def generate(
     for the MPCDF clusters ``cobra``, ``draco`` and ``hydra`` are provided with the
     package. All available templates can be listed with the ``--list-hosts``
     option.
+
+    Use ``--mdrun-option`` to sweep over options of ``gmx mdrun``, e.g.,
+    ``--mdrun-option -npme=0,2,4 --mdrun-option -nb=cpu,gpu``. A separate
+    benchmark is generated for every combination of values.
+
+    Use ``--repeats`` to generate several replicates of each benchmark. The
+    results of all replicates are aggregated by ``analyze``.
+
+    With ``--adaptive``, benchmarks are only generated for a geometric subset
+    of the nodes, e.g., 1, 2, 4 and 8 nodes. Once these finished, calling the
+    same command again generates the node counts in between, until the largest
+    number of nodes with a parallel efficiency of at least
+    ``--efficiency-threshold`` is found.
+
+    Input files are copied into each benchmark folder. Use ``--link`` to create
+    hard links (``hard``), symbolic links (``sym``) or copy-on-write clones
+    (``reflink``) instead. If a method is not supported by the file system, we
+    fall back to a reflink or a plain copy.
+
+    Use ``--jobs`` to write several benchmark folders at the same time, e.g., on
+    network file systems. Benchmarks that could not be generated are listed at
+    the end.
     """
-    from mdbenchmark.cli.generate import do_generate
+    with profiling.phase("import"):
+        from mdbenchmark.cli.generate import do_generate
 
     do_generate(
         name=name,
@@ -241,6 +516,13 @@ def generate(
         number_of_ranks=number_of_ranks,
         enable_hyperthreading=enable_hyperthreading,
         multidir=multidir,
+        link=link,
+        jobs=jobs,
+        refresh_modules=refresh_modules,
+        mdrun_options=mdrun_options,
+        adaptive=adaptive,
+        efficiency_threshold=efficiency_threshold,
+        repeats=repeats,
     )
 
 
@@ -348,7 +630,8 @@ def plot(
     spread the usage of MDBenchmark. You can remove the watermark with the
     ``--no-watermark`` option.
     """
-    from mdbenchmark.cli.plot import do_plot
+    with profiling.phase("import"):
+        from mdbenchmark.cli.plot import do_plot
 
     do_plot(
         csv,
@@ -383,7 +666,32 @@ def plot(
     is_flag=True,
 )
 @click.option("-y", "--yes", is_flag=True, help="Answer all prompts with yes.")
-def submit(directory, force_restart, yes):
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of benchmarks to analyze and submit in parallel.",
+    default=1,
+    show_default=True,
+    type=click.IntRange(1, None),
+)
+@click.option(
+    "--array",
+    help="Submit benchmarks with the same job name, host template, nodes, ranks, "
+    "threads, hyperthreading, GPU usage and run time as one job array.",
+    is_flag=True,
+)
+@click.option(
+    "--rate-limit",
+    help="Maximal number of jobs to submit per second.",
+    type=float,
+    callback=validate_rate_limit,
+)
+@click.option(
+    "--local",
+    help="Run the benchmarks on this machine instead of a queuing system.",
+    is_flag=True,
+)
+def submit(directory, force_restart, yes, jobs, array, rate_limit, local):
     """Submit benchmarks to queuing system.
 
     Benchmarks are searched recursively starting from the directory specified
@@ -395,10 +703,58 @@ def submit(directory, force_restart, yes):
     Checks whether benchmark folders were already generated, exits otherwise.
     Only runs benchmarks that were not already started. Can be overwritten with
     ``--force``.
+
+    With ``--array`` all benchmarks that request the same resources, i.e.,
+    that share the job name, host template, number of nodes, ranks and
+    threads, hyperthreading, GPU usage and run time, are submitted as a single
+    job array. Their modules and mdrun options may differ. The host template
+    must support job arrays.
+
+    Jobs are submitted ``--jobs`` at a time. Use ``--rate-limit`` to limit the
+    number of submissions per second. Only successfully submitted benchmarks
+    are marked as started and their job IDs are stored.
+
+    With ``--local`` the job scripts are run on this machine, ``--jobs`` at a
+    time. Each benchmark is pinned to as many CPUs as its ranks and threads
+    require. Use the ``local`` host template to generate such benchmarks.
+    """
+    with profiling.phase("import"):
+        from mdbenchmark.cli.submit import do_submit
+
+    do_submit(
+        directory=directory,
+        force_restart=force_restart,
+        yes=yes,
+        jobs=jobs,
+        array=array,
+        rate_limit=rate_limit,
+        local=local,
+    )
+
+
+@cli.command()
+@click.option(
+    "-d",
+    "--directory",
+    help="Path in which to look for benchmarks.",
+    default=".",
+    show_default=True,
+)
+def status(directory):
+    """Show the state of submitted benchmarks.
+
+    Benchmarks are searched recursively starting from the directory specified
+    in ``--directory``. If the option is not specified, the working directory
+    will be used.
+
+    Queries the queuing system once for the job IDs stored during ``submit``
+    and prints how many benchmarks of each sweep are pending, running or
+    finished. Log files are not read, use ``analyze`` to get the results.
     """
-    from mdbenchmark.cli.submit import do_submit
+    with profiling.phase("import"):
+        from mdbenchmark.cli.status import do_status
 
-    do_submit(directory=directory, force_restart=force_restart, yes=yes)
+    do_status(directory=directory)
 
 
 @cli.command()
@@ -22,19 +22,22 @@ import os.path
 import click
 import pandas as pd
 
-from mdbenchmark import console, mdengines, utils
+from mdbenchmark import console, mdengines, profiling, scaling, utils
 from mdbenchmark.cli.validators import (
     validate_cpu_gpu_flags,
     validate_number_of_nodes,
     validate_number_of_simulations,
 )
-from mdbenchmark.mdengines.utils import write_benchmark
+from mdbenchmark.mdengines.utils import benchmark_dirname, write_benchmark
 from mdbenchmark.models import Processor
 from mdbenchmark.utils import (
     consolidate_dataframe,
     construct_generate_data,
     map_columns,
+    parallel_map,
     print_dataframe,
+    printed_columns,
+    select_adaptive_nodes,
     validate_required_files,
 )
 from mdbenchmark.versions import Version3Categories
@@ -64,6 +67,13 @@ def do_generate(
     number_of_ranks,
     enable_hyperthreading,
     multidir,
+    link="copy",
+    jobs=1,
+    refresh_modules=False,
+    mdrun_options=(),
+    adaptive=False,
+    efficiency_threshold=scaling.EFFICIENCY_THRESHOLD,
+    repeats=1,
 ):
     """Generate a bunch of benchmarks."""
 
@@ -110,9 +120,17 @@ def do_generate(
     if any(["namd" in m for m in module]):
         console.warn(NAMD_WARNING, "--gpu")
 
+    # Only GROMACS knows how to sweep over mdrun options.
+    if mdrun_options and any(
+        mdengines.detect_md_engine(m) is not mdengines.gromacs for m in module
+    ):
+        console.error("{} is only supported for GROMACS modules.", "--mdrun-option")
+
     # Stop if we cannot find any modules. If the user specified multiple
     # modules, we will continue with only the valid ones.
-    modules = mdengines.normalize_modules(module, skip_validation)
+    modules = mdengines.normalize_modules(
+        module, skip_validation, refresh=refresh_modules
+    )
     if not modules:
         console.error("No requested modules available!")
 
@@ -130,34 +148,50 @@ def do_generate(
             console.error(e)
 
     # Create all benchmark combinations and put them into a DataFrame
-    data = construct_generate_data(
-        name,
-        job_name,
-        modules,
-        host,
-        template,
-        cpu,
-        gpu,
-        time,
-        min_nodes,
-        max_nodes,
-        processor,
-        number_of_ranks,
-        enable_hyperthreading,
-        multidir,
-    )
-    df = pd.DataFrame(data, columns=benchmark_version.generate_categories)
+    with profiling.phase("aggregate"):
+        data = construct_generate_data(
+            name,
+            job_name,
+            modules,
+            host,
+            template,
+            cpu,
+            gpu,
+            time,
+            min_nodes,
+            max_nodes,
+            processor,
+            number_of_ranks,
+            enable_hyperthreading,
+            multidir,
+            mdrun_options,
+            repeats,
+        )
+        df = pd.DataFrame(data, columns=benchmark_version.generate_categories)
+
+    # Only generate the node counts that are needed next to find the number of
+    # nodes at which the parallel efficiency drops below the threshold.
+    if adaptive:
+        df = select_adaptive_nodes(
+            df,
+            columns=benchmark_version.consolidate_categories,
+            min_nodes=min_nodes,
+            max_nodes=max_nodes,
+            threshold=efficiency_threshold,
+        )
+        if df.empty:
+            console.success("No further benchmarks are needed.")
 
     # Consolidate the data by grouping on the number of nodes and print to the
     # user as an overview.
     consolidated_df = consolidate_dataframe(
         df, columns=benchmark_version.consolidate_categories
     )
+    printing = printed_columns(consolidated_df, benchmark_version.generate_printing)
     print_dataframe(
-        consolidated_df[benchmark_version.generate_printing],
+        consolidated_df[printing],
         columns=map_columns(
-            map_dict=benchmark_version.category_mapping,
-            columns=benchmark_version.generate_printing,
+            map_dict=benchmark_version.category_mapping, columns=printing,
         ),
     )
 
@@ -179,20 +213,58 @@ def do_generate(
         console.error("Exiting. No benchmarks were generated.")
 
     # Generate the benchmarks
-    with click.progressbar(
-        df.iterrows(),
+    benchmarks = []
+    for _, row in df.iterrows():
+        relative_path, file_basename = os.path.split(row["name"])
+        mappings = benchmark_version.generate_mapping
+        kwargs = {"name": file_basename, "relative_path": relative_path, "link": link}
+        for key, value in mappings.items():
+            kwargs[value] = row[key]
+        benchmarks.append(kwargs)
+
+    def generate(kwargs):
+        """Write a single benchmark. Returns the error if it failed."""
+        try:
+            write_benchmark(**kwargs)
+        except Exception as e:
+            return e
+
+        return None
+
+    with parallel_map(jobs) as pmap, click.progressbar(
+        pmap(generate, benchmarks),
         length=number_of_benchmarks,
         show_pos=True,
         label="Generating benchmarks",
     ) as bar:
-        for _, row in bar:
-            relative_path, file_basename = os.path.split(row["name"])
-            mappings = benchmark_version.generate_mapping
-            kwargs = {"name": file_basename, "relative_path": relative_path}
-            for key, value in mappings.items():
-                kwargs[value] = row[key]
+        errors = list(bar)
 
-            write_benchmark(**kwargs)
+    failed = [
+        "{}: {}".format(
+            os.path.join(
+                kwargs["base_directory"].relpath,
+                benchmark_dirname(
+                    kwargs["nodes"],
+                    kwargs["number_of_ranks"],
+                    kwargs["number_of_threads"],
+                    kwargs["hyperthreading"],
+                    kwargs["multidir"],
+                    kwargs["mdrun_options"],
+                    kwargs["repeat"],
+                ),
+            ),
+            error,
+        )
+        for kwargs, error in zip(benchmarks, errors)
+        if error is not None
+    ]
+    if failed:
+        console.error(
+            "Could not generate {} of {} benchmarks:\n{}",
+            len(failed),
+            number_of_benchmarks,
+            "\n".join(failed),
+        )
 
     # Finish up by telling the user how to submit the benchmarks
     console.info(
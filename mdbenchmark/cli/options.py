@@ -22,6 +22,29 @@ import click
 
 class AliasedGroup(click.Group):
     aliases = {"start": "submit"}
+    # Options of the group that may be given without a value, e.g., `--profile`
+    # instead of `--profile=timings`.
+    optional_values = {"--profile": "timings"}
+
+    def parse_args(self, ctx, args):
+        args = list(args)
+        # Only look at the options of the group, i.e., before the subcommand.
+        i = 0
+        while i < len(args) and args[i].startswith("-"):
+            if args[i] in self.optional_values:
+                choices = [
+                    choice
+                    for param in self.params
+                    if args[i] in param.opts
+                    for choice in getattr(param.type, "choices", [])
+                ]
+                if i + 1 < len(args) and args[i + 1] in choices:
+                    i += 1
+                else:
+                    args[i] = "{}={}".format(args[i], self.optional_values[args[i]])
+            i += 1
+
+        return super().parse_args(ctx, args)
 
     def get_command(self, ctx, cmd_name):
         rv = click.Group.get_command(self, ctx, cmd_name)
@@ -25,7 +25,7 @@ from matplotlib import rcParams
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 from matplotlib.figure import Figure
 
-from mdbenchmark import console
+from mdbenchmark import console, profiling
 from mdbenchmark.mdengines import SUPPORTED_ENGINES
 from mdbenchmark.utils import generate_output_name
 from mdbenchmark.versions import VersionFactory
@@ -80,6 +80,17 @@ def plot_line(df, selection, label, fit, performance_column="performance", ax=No
     )
     color = p[0].get_color()
 
+    # Show the spread of replicated benchmarks
+    if "performance_std" in df.columns:
+        ax.errorbar(
+            df[selection][mask],
+            df[performance_column][mask],
+            yerr=df["performance_std"][mask].fillna(0),
+            fmt="none",
+            ecolor=color,
+            capsize=5,
+        )
+
     if fit and (len(df[selection]) > 1):
         plot_projection(
             df=df,
@@ -98,31 +109,40 @@ def plot_over_group(df, plot_cores, fit, performance_column, ax=None):
         version="3" if "use_gpu" in df.columns else "2"
     ).version_class
 
-    for key, group in df.groupby(benchmark_version.consolidate_categories):
+    # CSV files written before mdrun options could be swept lack the column.
+    # Empty options are read as NaN, which would be dropped by `groupby`.
+    columns = [
+        column
+        for column in benchmark_version.consolidate_categories
+        if column in df.columns
+    ]
+    if "mdrun_options" in df.columns:
+        df = df.assign(mdrun_options=df["mdrun_options"].fillna(""))
+
+    for key, group in df.groupby(columns):
         # Do not try to plot groups without performance values
         if group[performance_column].isnull().all():
             continue
 
-        if benchmark_version.version == "3":
-            module, template, gpus, ranks, hyperthreading, multidir = key
-            threads = group.number_of_threads.iloc[0]
-        else:
-            gpus, module, template = key
+        values = dict(zip(columns, key))
+        gpus = values["use_gpu"] if "use_gpu" in values else values["gpu"]
 
         label = "{template} - {module}, {node_type}".format(
-            template=template,
-            module=module,
+            template=values["host"],
+            module=values["module"],
             node_type="mixed CPU-GPU" if gpus else "CPU-only",
         )
 
         # Add ranks, threads and multdir information to label
         if benchmark_version.version == "3":
             label += " (ranks: {ranks}, threads: {threads}{ht}, nsims: {nsims})".format(
-                ranks=ranks,
-                threads=threads,
-                ht=" [HT]" if hyperthreading else "",
-                nsims=multidir,
+                ranks=values["number_of_ranks"],
+                threads=group.number_of_threads.iloc[0],
+                ht=" [HT]" if values["hyperthreading"] else "",
+                nsims=values["multidir"],
             )
+            if values.get("mdrun_options"):
+                label += " {}".format(values["mdrun_options"])
 
         plot_line(
             df=group,
@@ -223,7 +243,8 @@ def do_plot(
             "You must specify at least one CSV file.", param_hint='"--csv"'
         )
 
-    df = pd.concat([pd.read_csv(c) for c in csv])
+    with profiling.phase("parse"):
+        df = pd.concat([pd.read_csv(c) for c in csv])
     performance_column = "performance" if "performance" in df.columns else "ns/day"
 
     df = filter_dataframe_for_plotting(df, template, module, gpu, cpu)
@@ -236,13 +257,14 @@ def do_plot(
     fig = Figure()
     FigureCanvas(fig)
     ax = fig.add_subplot(111)
-    ax = plot_over_group(
-        df=df,
-        plot_cores=plot_cores,
-        fit=fit,
-        performance_column=performance_column,
-        ax=ax,
-    )
+    with profiling.phase("render"):
+        ax = plot_over_group(
+            df=df,
+            plot_cores=plot_cores,
+            fit=fit,
+            performance_column=performance_column,
+            ax=ax,
+        )
 
     # Update xticks
     selection = "ncores" if plot_cores else "nodes"
@@ -280,7 +302,8 @@ def do_plot(
     elif not output_name.endswith(".{}".format(output_format)):
         output_name = "{}.{}".format(output_name, output_format)
 
-    fig.savefig(
-        output_name, bbox_extra_artists=(legend,), bbox_inches="tight", dpi=dpi,
-    )
+    with profiling.phase("write"):
+        fig.savefig(
+            output_name, bbox_extra_artists=(legend,), bbox_inches="tight", dpi=dpi,
+        )
     console.info("The plot was saved as '{}'.", output_name)
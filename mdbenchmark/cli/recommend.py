@@ -0,0 +1,153 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import pandas as pd
+
+from mdbenchmark import console, profiling
+from mdbenchmark.cli.analyze import analyze_directory
+from mdbenchmark.mdengines import detect_md_engine, gromacs
+from mdbenchmark.utils import (
+    add_efficiency,
+    map_columns,
+    pareto_front,
+    print_dataframe,
+    printed_columns,
+)
+from mdbenchmark.versions import VersionFactory
+
+COST_COLUMN = "node_hours_per_ns"
+RECOMMEND_COLUMNS = [
+    "host",
+    "module",
+    "gpu",
+    "use_gpu",
+    "nodes",
+    "ns/day",
+    "performance",
+    COST_COLUMN,
+    "efficiency",
+    "number_of_ranks",
+    "number_of_threads",
+    "hyperthreading",
+    "multidir",
+    "mdrun_options",
+]
+
+
+def format_job_settings(row):
+    """Return the settings of a benchmark as lines for a SLURM job script.
+
+    Settings that are unknown, e.g., the ranks of version 2 benchmarks, are
+    left out. The call of `gmx mdrun` is only added for GROMACS modules.
+    """
+    lines = ["#SBATCH --nodes={}".format(int(row["nodes"]))]
+
+    ranks = row.get("number_of_ranks")
+    threads = row.get("number_of_threads")
+    if not pd.isnull(ranks):
+        lines.append("#SBATCH --ntasks-per-node={}".format(int(ranks)))
+    if not pd.isnull(threads):
+        lines.append("#SBATCH --cpus-per-task={}".format(int(threads)))
+    hyperthreading = row.get("hyperthreading")
+    if not pd.isnull(hyperthreading) and hyperthreading:
+        lines.append("#SBATCH --ntasks-per-core=2")
+    if not pd.isnull(threads):
+        lines.append("export OMP_NUM_THREADS={}".format(int(threads)))
+
+    if detect_md_engine(row["module"]) is gromacs:
+        mdrun = ["srun gmx_mpi mdrun"]
+        if not pd.isnull(threads):
+            mdrun.append("-ntomp $OMP_NUM_THREADS")
+        multidir = row.get("multidir")
+        if not pd.isnull(multidir) and int(multidir) != 1:
+            mdrun.append(gromacs.prepare_multidir(int(multidir)))
+        mdrun_options = row.get("mdrun_options")
+        if not pd.isnull(mdrun_options) and mdrun_options:
+            mdrun.append(mdrun_options)
+        lines.append(" ".join(mdrun))
+
+    return lines
+
+
+def do_recommend(
+    directory, csv, max_nodes=None, min_throughput=None, max_cost=None, jobs=1
+):
+    """Print the Pareto-optimal benchmarks of each host, module and GPU usage."""
+    if csv:
+        with profiling.phase("parse"):
+            df = pd.concat([pd.read_csv(c) for c in csv], ignore_index=True)
+        version = VersionFactory(
+            version="3" if "use_gpu" in df.columns else "2"
+        ).version_class
+    else:
+        df, version = analyze_directory(directory, jobs=jobs)
+
+    performance_column = "performance" if "performance" in df.columns else "ns/day"
+    gpu_column = "use_gpu" if "use_gpu" in df.columns else "gpu"
+
+    with profiling.phase("aggregate"):
+        if csv:
+            df = add_efficiency(
+                df,
+                columns=version.consolidate_categories,
+                performance_column=performance_column,
+            )
+
+        # Only keep finished benchmarks that meet all constraints
+        df = df[df[performance_column].notnull()]
+        if max_nodes is not None:
+            df = df[df["nodes"] <= max_nodes]
+        if min_throughput is not None:
+            df = df[df[performance_column] >= min_throughput]
+        if max_cost is not None:
+            df = df[df[COST_COLUMN] <= max_cost]
+        if df.empty:
+            console.error("None of the benchmarks meets the constraints.")
+
+        df = pareto_front(
+            df,
+            columns=["host", "module", gpu_column],
+            maximize=performance_column,
+            minimize=COST_COLUMN,
+        )
+        if "mdrun_options" in df.columns:
+            df["mdrun_options"] = df["mdrun_options"].fillna("")
+
+    console.info(
+        "Found {} configurations where no other configuration on the same host, "
+        "module and GPU usage is both faster and cheaper:",
+        len(df),
+    )
+    columns = printed_columns(df, [c for c in RECOMMEND_COLUMNS if c in df.columns])
+    print_dataframe(
+        df[columns].round({COST_COLUMN: 3, "efficiency": 2}).fillna("?"),
+        columns=map_columns(version.category_mapping, columns),
+    )
+
+    console.info("Settings for your production job scripts:")
+    for _, row in df.iterrows():
+        console.info(
+            "\n{} - {}, {}: {} ns/day for {} node-hours/ns",
+            row["host"],
+            row["module"],
+            "mixed CPU-GPU" if row[gpu_column] else "CPU-only",
+            round(row[performance_column], 3),
+            round(row[COST_COLUMN], 3),
+        )
+        console.info("\n".join("  " + line for line in format_job_settings(row)))
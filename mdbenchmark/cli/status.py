@@ -0,0 +1,106 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+
+import pandas as pd
+
+from mdbenchmark import console
+from mdbenchmark.discover import discover
+from mdbenchmark.schedulers import FINISHED, PENDING, RUNNING, detect_scheduler
+from mdbenchmark.utils import print_dataframe
+
+NOT_SUBMITTED = "not submitted"
+UNKNOWN = "unknown"
+STATES = [NOT_SUBMITTED, PENDING, RUNNING, FINISHED, UNKNOWN]
+
+
+def query_states(benchmarks, scheduler):
+    """Return the state of each benchmark.
+
+    The queuing system is queried only once for all benchmarks with a job ID.
+    Benchmarks that were started without storing a job ID have an unknown
+    state.
+    """
+    job_ids = [
+        b.categories["job_id"]
+        for b in benchmarks
+        if b.categories.get("started") and b.categories.get("job_id") is not None
+    ]
+
+    queue = {}
+    if job_ids:
+        if scheduler is None:
+            console.warn(
+                "Was not able to find a batch system. Cannot query the state of "
+                "submitted benchmarks."
+            )
+        else:
+            queue = scheduler.status(job_ids)
+            if queue is None:
+                console.warn("Could not query the {} queue.", scheduler.name)
+                queue = {}
+
+    states = []
+    for benchmark in benchmarks:
+        if not benchmark.categories.get("started"):
+            states.append(NOT_SUBMITTED)
+        else:
+            states.append(queue.get(benchmark.categories.get("job_id"), UNKNOWN))
+
+    return states
+
+
+def do_status(directory):
+    """Print the number of benchmarks in each state, grouped by sweep."""
+    bundle = discover(directory)
+
+    if not bundle:
+        console.error("No benchmarks found.")
+
+    states = query_states(bundle, detect_scheduler())
+
+    root = os.path.abspath(directory)
+    df = pd.DataFrame(
+        {
+            "sweep": [
+                os.path.relpath(os.path.dirname(b.abspath), root) for b in bundle
+            ],
+            "state": states,
+        }
+    )
+    df = (
+        pd.crosstab(df["sweep"], df["state"])
+        .reindex(columns=STATES, fill_value=0)
+        .reset_index()
+    )
+    df.insert(1, "total", df[STATES].sum(axis=1))
+
+    print_dataframe(
+        df,
+        columns=[
+            "Sweep",
+            "Benchmarks",
+            "Not submitted",
+            "Pending",
+            "Running",
+            "Finished",
+            "Unknown",
+        ],
+    )
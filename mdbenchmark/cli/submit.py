@@ -17,49 +17,287 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import datetime as dt
 import os
-import subprocess
-from glob import glob
+import threading
+import time
 
 import click
-import datreant as dtr
 import numpy as np
 
 from mdbenchmark import console
+from mdbenchmark.discover import discover
 from mdbenchmark.mdengines import detect_md_engine
-from mdbenchmark.mdengines.utils import cleanup_before_restart
+from mdbenchmark.mdengines.utils import cleanup_before_restart, render_job_script
+from mdbenchmark.schedulers import LocalScheduler, detect_scheduler
 from mdbenchmark.utils import (
     consolidate_dataframe,
     map_columns,
+    parallel_map,
     parse_bundle,
     print_dataframe,
+    printed_columns,
+    retrieve_host_template,
 )
 from mdbenchmark.versions import VersionFactory
 
-PATHS = os.environ["PATH"].split(":")
-BATCH_SYSTEMS = {"slurm": "sbatch", "sge": "qsub", "Loadleveler": "llsubmit"}
+ARRAY_DIRECTORY = ".mdbenchmark-arrays"
+# Categories that define the resources of a job array
+ARRAY_CATEGORIES = [
+    "host",
+    "nodes",
+    "ranks",
+    "threads",
+    "hyperthreading",
+    "gpu",
+    "time",
+]
 
 
-def get_batch_command():
-    for p in PATHS:
-        for b in BATCH_SYSTEMS.values():
-            if glob(os.path.join(p, b)):
-                return b
-    console.error(
-        "Was not able to find a batch system. Are you trying to use this "
-        "package on a host with a queuing system?"
+def get_scheduler(local=False):
+    """Return the queuing system of this host or exit if there is none.
+
+    With `local`, the benchmarks are run directly on this machine instead.
+    """
+    if local:
+        return LocalScheduler()
+
+    scheduler = detect_scheduler()
+    if scheduler is None:
+        console.error(
+            "Was not able to find a batch system. Are you trying to use this "
+            "package on a host with a queuing system?"
+        )
+
+    return scheduler
+
+
+def check_local_resources(benchmarks, scheduler):
+    """Exit if any benchmark cannot be run on this machine."""
+    for benchmark in benchmarks:
+        categories = benchmark.categories
+        if categories.get("nodes", 1) > 1:
+            console.error(
+                "Benchmarks on more than one node cannot be run locally: {}",
+                benchmark.relpath,
+            )
+
+        cpus = scheduler.cpus_required(categories)
+        if cpus is not None and cpus > len(scheduler.cpus):
+            console.error(
+                "The benchmark {} needs {} CPUs, but only {} are available.",
+                benchmark.relpath,
+                cpus,
+                len(scheduler.cpus),
+            )
+
+
+class RateLimiter:
+    """Limit the number of calls per second, shared between threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next_call = time.monotonic()
+
+    def wait(self):
+        """Block until the next call is allowed."""
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+def group_array_jobs(benchmarks):
+    """Group benchmarks that can be run as tasks of the same job array.
+
+    All tasks of a job array share the same job name and resources, so we group
+    benchmarks of the same host template by the categories in
+    `ARRAY_CATEGORIES`. Each task runs the job script of its own benchmark, so
+    the module, the mdrun options and the input files may differ.
+    """
+    groups = {}
+    for benchmark in benchmarks:
+        categories = benchmark.categories
+        job_name = categories.get("job_name") or categories.get("name")
+        key = (job_name,) + tuple(categories.get(c) for c in ARRAY_CATEGORIES)
+        groups.setdefault(key, []).append(benchmark)
+
+    return list(groups.values())
+
+
+def write_array_job(benchmarks, directory, index):
+    """Write the job script and index file for a job array.
+
+    The job script is rendered from the host template of the benchmarks. The
+    index file lists the benchmark directory of each array task, one per line.
+    Each array task changes into its directory and runs the job script of the
+    benchmark.
+
+    Returns
+    -------
+    str
+        Path of the job script.
+    """
+    categories = benchmarks[0].categories
+    if "version" not in categories:
+        console.error(
+            "Job arrays are only supported for benchmarks generated with "
+            "MDBenchmark 3 or later."
+        )
+
+    host = categories["host"]
+    basename = os.path.join(directory, "{}_{:03d}".format(host, index))
+    index_file = os.path.abspath(basename + ".txt")
+    with open(index_file, "w") as fh:
+        fh.write("".join(b.abspath + "\n" for b in benchmarks))
+
+    kwargs = {
+        "template": retrieve_host_template(host),
+        "engine": detect_md_engine(categories["module"]),
+        "name": categories["name"],
+        "job_name": categories.get("job_name") or categories["name"],
+        "gpu": categories["gpu"],
+        "module": categories["module"],
+        "nodes": categories["nodes"],
+        "time": categories["time"],
+        "number_of_ranks": categories["ranks"],
+        "number_of_threads": categories["threads"],
+        "hyperthreading": categories["hyperthreading"],
+        "multidir": categories["multidir"],
+        "mdrun_options": categories.get("mdrun_options", ""),
+    }
+    array = {"size": len(benchmarks), "index_file": index_file}
+    script = render_job_script(array=array, **kwargs)
+
+    # Templates that do not use the `array` variable cannot run job arrays.
+    if script == render_job_script(**kwargs):
+        console.error(
+            "The host template {} does not support job arrays. Submit the "
+            "benchmarks without the {} option.",
+            host,
+            "--array",
+        )
+
+    with open(basename + ".job", "w") as fh:
+        fh.write(script)
+
+    return basename + ".job"
+
+
+def submit_script(scheduler, script, cwd, rate_limiter=None):
+    """Submit a job script and return whether it succeeded and its job ID."""
+    if rate_limiter is not None:
+        rate_limiter.wait()
+
+    return scheduler.submit(script, cwd)
+
+
+def mark_as_started(benchmark, job_id=None):
+    """Store the job ID and mark the benchmark as started."""
+    treant = benchmark.treant
+    treant.categories["started"] = True
+    if job_id is not None:
+        treant.categories["job_id"] = job_id
+
+
+def submit_benchmark(benchmark, scheduler, rate_limiter=None):
+    """Submit a single benchmark. Returns True if the submission succeeded."""
+    success, job_id = submit_script(
+        scheduler, "bench.job", cwd=benchmark.abspath, rate_limiter=rate_limiter
+    )
+    if success:
+        mark_as_started(benchmark, job_id)
+
+    return success
+
+
+def submit_jobs(benchmarks, scheduler, jobs=1, rate_limiter=None):
+    """Submit each benchmark as a separate job, `jobs` at a time.
+
+    Returns
+    -------
+    list
+        Benchmarks that could not be submitted.
+    """
+    console.info("Submitting a total of {} benchmarks.", len(benchmarks))
+
+    def submit(benchmark):
+        return submit_benchmark(benchmark, scheduler, rate_limiter=rate_limiter)
+
+    with parallel_map(jobs) as pmap:
+        results = list(pmap(submit, benchmarks))
+
+    return [b for b, success in zip(benchmarks, results) if not success]
+
+
+def submit_array_jobs(benchmarks, directory, scheduler, jobs=1, rate_limiter=None):
+    """Submit the benchmarks as job arrays, one array per group of benchmarks.
+
+    The job ID of each array task is stored in the categories of its benchmark.
+
+    Returns
+    -------
+    list
+        Benchmarks that could not be submitted.
+    """
+    if not scheduler.supports_arrays:
+        console.error("Job arrays are not supported with {}.", scheduler.name)
+
+    array_directory = os.path.join(
+        directory, ARRAY_DIRECTORY, dt.datetime.now().strftime("%Y-%m-%d_%H%M%S")
     )
+    os.makedirs(array_directory, exist_ok=True)
 
+    groups = group_array_jobs(benchmarks)
+    console.info(
+        "Submitting {} benchmarks as {} job arrays.", len(benchmarks), len(groups)
+    )
+    scripts = [
+        write_array_job(group, array_directory, index)
+        for index, group in enumerate(groups)
+    ]
+
+    def submit(script):
+        return submit_script(
+            scheduler,
+            os.path.basename(script),
+            cwd=array_directory,
+            rate_limiter=rate_limiter,
+        )
 
-def do_submit(directory, force_restart, yes):
+    with parallel_map(jobs) as pmap:
+        results = list(pmap(submit, scripts))
+
+    failed = []
+    for group, (success, job_id) in zip(groups, results):
+        if not success:
+            failed.extend(group)
+            continue
+
+        for task, benchmark in enumerate(group):
+            task_id = None
+            if job_id is not None:
+                task_id = scheduler.array_task_id(job_id, task)
+            mark_as_started(benchmark, task_id)
+
+    return failed
+
+
+def do_submit(
+    directory, force_restart, yes, jobs=1, array=False, rate_limit=None, local=False,
+):
     """Submit the benchmarks."""
-    bundle = dtr.discover(directory)
+    bundle = discover(directory, jobs=jobs)
 
     # Exit if no bundles were found in the current directory.
     if not bundle:
         console.error("No benchmarks found.")
 
-    grouped_bundles = bundle.categories.groupby("started")
+    grouped_bundles = bundle.groupby("started")
     try:
         bundles_not_yet_started = grouped_bundles[False]
     except KeyError:
@@ -86,6 +324,7 @@ def do_submit(directory, force_restart, yes):
         columns=benchmark_version.submit_categories,
         sort_values_by=benchmark_version.analyze_sort,
         discard_performance=True,
+        jobs=jobs,
     )
 
     # Reformat NaN values nicely into question marks.
@@ -99,11 +338,11 @@ def do_submit(directory, force_restart, yes):
     consolidated_df = consolidate_dataframe(
         df_to_print, columns=benchmark_version.consolidate_categories
     )
+    printing = printed_columns(consolidated_df, benchmark_version.generate_printing[1:])
     print_dataframe(
-        consolidated_df,
+        consolidated_df[printing],
         columns=map_columns(
-            map_dict=benchmark_version.category_mapping,
-            columns=benchmark_version.generate_printing[1:],
+            map_dict=benchmark_version.category_mapping, columns=printing,
         ),
     )
 
@@ -113,17 +352,48 @@ def do_submit(directory, force_restart, yes):
     elif not click.confirm("The above benchmarks will be submitted. Continue?"):
         console.error("Exiting. No benchmarks submitted.")
 
-    batch_cmd = get_batch_command()
-    console.info("Submitting a total of {} benchmarks.", len(bundles_to_start))
-    for sim in bundles_to_start:
-        # Remove files generated by previous mdbenchmark run
-        if force_restart:
-            engine = detect_md_engine(sim.categories["module"])
+    scheduler = get_scheduler(local=local)
+    if local:
+        check_local_resources(bundles_to_start, scheduler)
+
+    # Remove files generated by previous mdbenchmark run
+    if force_restart:
+        for benchmark in bundles_to_start:
+            engine = detect_md_engine(benchmark.categories["module"])
+            sim = benchmark.treant
             cleanup_before_restart(engine=engine, sim=sim)
-        sim.categories["started"] = True
-        os.chdir(sim.abspath)
-        subprocess.call([batch_cmd, "bench.job"])
-    console.info(
-        "Submitted all benchmarks. Run {} once they are finished to get the results.",
-        "mdbenchmark analyze",
-    )
+            sim.categories["started"] = False
+
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+    if array:
+        failed = submit_array_jobs(
+            bundles_to_start,
+            directory,
+            scheduler,
+            jobs=jobs,
+            rate_limiter=rate_limiter,
+        )
+    else:
+        failed = submit_jobs(
+            bundles_to_start, scheduler, jobs=jobs, rate_limiter=rate_limiter
+        )
+
+    if failed:
+        console.error(
+            "Could not submit {} of {} benchmarks:\n{}\n" "Run {} again to retry.",
+            len(failed),
+            len(bundles_to_start),
+            "\n".join(b.relpath for b in failed),
+            "mdbenchmark submit",
+        )
+
+    if local:
+        console.info(
+            "Finished running all benchmarks. Run {} to get the results.",
+            "mdbenchmark analyze",
+        )
+    else:
+        console.info(
+            "Submitted all benchmarks. Run {} once they are finished to get the results.",
+            "mdbenchmark analyze",
+        )
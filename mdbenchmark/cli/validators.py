@@ -18,9 +18,11 @@
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>
 import click
-import numpy as np
 
-from mdbenchmark import console, utils
+from mdbenchmark import console
+
+# Heavy dependencies (pandas, numpy, datreant, jinja2, ...) are only imported in
+# the callbacks that need them, so that `mdbenchmark --help` starts quickly.
 
 
 def validate_cores(ctx, param, *args, **kwargs):
@@ -80,9 +82,9 @@ def validate_number_of_simulations(nsims, min_nodes, max_nodes, nranks):
     number of nodes times number of ranks per node.
     """
     for nn in range(min_nodes, max_nodes + 1):
-        nranks = np.array([nn * ri for ri in nranks])
+        nranks = [nn * ri for ri in nranks]
         for nsim in nsims:
-            if np.any(nranks % nsim):
+            if any(ranks % nsim for ranks in nranks):
                 raise click.BadParameter(
                     "The total number of ranks must be an integer multiple of"
                     + " the number of simulations",
@@ -90,10 +92,60 @@ def validate_number_of_simulations(nsims, min_nodes, max_nodes, nranks):
                 )
 
 
+def validate_rate_limit(ctx, param, rate_limit=None):
+    """Validate that the rate limit is a positive number."""
+    if rate_limit is not None and rate_limit <= 0:
+        raise click.BadParameter(
+            "The rate limit must be a positive number.", param_hint='"--rate-limit"',
+        )
+
+    return rate_limit
+
+
+def validate_mdrun_options(ctx, param, options):
+    """Callback to split the options for mdrun into their names and values.
+
+    Every option is given as ``NAME=VALUE[,VALUE...]``, e.g., ``-npme=0,2,4``.
+    The leading dash of the name is optional.
+
+    Returns
+    -------
+    list
+        List of tuples with the name of each option and a list of its values.
+    """
+    parsed = []
+    for option in options:
+        name, sep, values = option.partition("=")
+        name = name.strip().lstrip("-")
+        values = [v.strip() for v in values.split(",")]
+        if (
+            not sep
+            or not name
+            or not all(c.isalnum() or c in "-_" for c in name)
+            or not all(values)
+        ):
+            raise click.BadParameter(
+                "Options must be given as NAME=VALUE[,VALUE...], "
+                "e.g., -npme=0,2,4. Got '{}'.".format(option),
+                param_hint='"--mdrun-option"',
+            )
+        if name in [n for n, _ in parsed]:
+            raise click.BadParameter(
+                "The option -{} was given more than once.".format(name),
+                param_hint='"--mdrun-option"',
+            )
+        parsed.append((name, values))
+
+    return parsed
+
+
 def print_known_hosts(ctx, param, value):
     """Callback to print all available hosts to the user."""
     if not value or ctx.resilient_parsing:
         return
+
+    from mdbenchmark import utils
+
     utils.print_possible_hosts()
     ctx.exit()
 
@@ -108,6 +160,8 @@ def validate_hosts(ctx, param, host=None):
     templates. If the hostname matches the template name, we continue by
     returning the hostname.
     """
+    from mdbenchmark import utils
+
     if host is None:
         host = utils.guess_host()
         if host is None:
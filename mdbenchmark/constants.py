@@ -0,0 +1,38 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+"""Constants shared by the command line interface and the analysis.
+
+`mdbenchmark.cli` imports this module on every start to set up the choices and
+defaults of its options. It must therefore not import any heavy dependencies.
+"""
+
+# Default parallel efficiency below which adding nodes is considered wasteful
+EFFICIENCY_THRESHOLD = 0.7
+
+# Columns to rank benchmarks by in `analyze` and whether lower values are better.
+RANK_BY = {
+    "waste": ("wasted_time", True),
+    "cost": ("node_hours_per_ns", True),
+    "throughput": ("performance", False),
+    "efficiency": ("efficiency", False),
+}
+
+# Ways to put the input files into the benchmark directories.
+LINK_METHODS = ["copy", "hard", "sym", "reflink"]
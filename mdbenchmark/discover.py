@@ -0,0 +1,147 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+
+from mdbenchmark import profiling
+from mdbenchmark.utils import parallel_map
+
+TREANT_DIRECTORY = ".datreant"
+CATEGORIES_FILENAME = "categories.json"
+# Directories that never contain benchmarks. Hidden directories are skipped as well.
+PRUNED_DIRECTORIES = {"__pycache__", "node_modules"}
+
+
+class Benchmark:
+    """Lightweight representation of a single benchmark.
+
+    Behaves like a read-only `datreant.Treant`, but only holds its path and
+    categories. Use `treant` to get the actual `datreant.Treant`, e.g., to
+    change its categories on disk.
+    """
+
+    __slots__ = ("abspath", "categories")
+
+    def __init__(self, abspath, categories):
+        self.abspath = abspath
+        self.categories = categories
+
+    @property
+    def relpath(self):
+        return os.path.relpath(self.abspath)
+
+    @property
+    def name(self):
+        return os.path.basename(self.abspath)
+
+    @property
+    def treant(self):
+        import datreant as dtr
+
+        return dtr.Treant(self.abspath)
+
+
+class BenchmarkList(list):
+    """List of `Benchmark` objects with the parts of `datreant.Bundle` that we need."""
+
+    @property
+    def categories(self):
+        """Return the category keys that are shared by all benchmarks."""
+        if not self:
+            return set()
+
+        return set.intersection(*[set(b.categories) for b in self])
+
+    def groupby(self, key):
+        """Group benchmarks by the value of category `key`."""
+        groups = {}
+        for benchmark in self:
+            value = benchmark.categories.get(key)
+            if value is None:
+                continue
+            groups.setdefault(value, BenchmarkList()).append(benchmark)
+
+        return groups
+
+
+def _is_pruned(name):
+    return name.startswith(".") or name in PRUNED_DIRECTORIES
+
+
+def find_treants(directory):
+    """Return the paths of all treants below `directory`.
+
+    Uses `os.scandir` to walk the directory tree. We do not descend into
+    treants (benchmarks never contain other benchmarks), hidden directories or
+    any of the `PRUNED_DIRECTORIES`. This way we never list the output files
+    or trajectories of the benchmarks themselves.
+    """
+    root = os.path.abspath(directory)
+    found = []
+    stack = [root]
+
+    while stack:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = [e for e in it if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            continue
+
+        if any(e.name == TREANT_DIRECTORY for e in entries):
+            found.append(path)
+            if path != root:
+                continue
+
+        stack.extend(e.path for e in entries if not _is_pruned(e.name))
+
+    return sorted(found)
+
+
+def read_categories(path):
+    """Read the categories of the treant at `path`."""
+    filename = os.path.join(path, TREANT_DIRECTORY, CATEGORIES_FILENAME)
+    try:
+        with open(filename) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def discover(directory=".", jobs=1):
+    """Find all benchmarks below `directory` and read their categories.
+
+    This is a faster replacement for `datreant.discover`. The categories of all
+    benchmarks are read at once, optionally on `jobs` threads.
+
+    Returns
+    -------
+    BenchmarkList
+        All benchmarks found, sorted by their path.
+    """
+    with profiling.phase("discover"):
+        paths = find_treants(directory)
+
+        with parallel_map(jobs) as pmap:
+            categories = list(pmap(read_categories, paths))
+
+    return BenchmarkList(
+        Benchmark(path, category) for path, category in zip(paths, categories)
+    )
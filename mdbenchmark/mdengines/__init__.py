@@ -21,7 +21,7 @@ import os
 from collections import defaultdict
 
 from mdbenchmark import console
-from mdbenchmark.mdengines import gromacs, namd
+from mdbenchmark.mdengines import gromacs, modulecache, namd
 
 SUPPORTED_ENGINES = {"gromacs": gromacs, "namd": namd}
 
@@ -67,9 +67,15 @@ def prepare_module_name(module, skip_validation=False):
     return basename, version
 
 
-def get_available_modules():
+def get_available_modules(refresh=False):
     """Return all available module versions for a given MD engine.
 
+    If Lmod keeps a spider cache on this host, the modules are read from it.
+    Otherwise the directories in `MODULEPATH` are scanned for modules. Both
+    results are cached and only read again once they are outdated. Use
+    `refresh` to ignore all caches and always scan. See `mdbenchmark.mdengines.lmod` and
+    `mdbenchmark.mdengines.modulecache` for details.
+
     Returns
     -------
     If we cannot access the `MODULEPATH` environment variable, we return `None`.
@@ -79,25 +85,20 @@ def get_available_modules():
     """
 
     MODULE_PATHS = os.environ.get("MODULEPATH", None)
-    available_modules = dict((mdengine, []) for mdengine in SUPPORTED_ENGINES)
 
     # Return `None` if the environment variable `MODULEPATH` does not exist.
     if not MODULE_PATHS:
         return None
 
-    # Go through the directory structure and grab all version of modules that we support.
-    for paths in MODULE_PATHS.split(":"):
-        for path, _, files in os.walk(paths):
-            for mdengine in SUPPORTED_ENGINES:
-                if mdengine in path:
-                    for name in files:
-                        if not name.startswith("."):
-                            available_modules[mdengine].append(name)
+    if not refresh:
+        available_modules = modulecache.cached_spider_cache(list(SUPPORTED_ENGINES))
+        if available_modules is not None:
+            return available_modules
 
-    return available_modules
+    return modulecache.cached_scan(MODULE_PATHS, list(SUPPORTED_ENGINES), refresh)
 
 
-def normalize_modules(modules, skip_validation):
+def normalize_modules(modules, skip_validation, refresh=False):
     """Validate that the provided module names are available.
 
     We first check whether the requested MD engine is supported by the package.
@@ -107,7 +108,8 @@ def normalize_modules(modules, skip_validation):
 
     If the user requested modules that were not found on the system, we inform
     the user and show all modules for that corresponding MD engine that were
-    found.
+    found. Use `refresh` to rescan the module directories instead of using the
+    cached list of modules.
     """
     # Check if modules are from supported md engines
     d = defaultdict(list)
@@ -128,7 +130,7 @@ def normalize_modules(modules, skip_validation):
         console.warn("Not performing module name validation.")
         return modules
 
-    available_modules = get_available_modules()
+    available_modules = get_available_modules(refresh=refresh)
     if available_modules is None:
         console.warn(
             "Cannot locate modules available on this host. Not performing module name validation."
@@ -17,19 +17,29 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import math
 import os
 import string
-from shutil import copyfile
 
 from mdbenchmark import console
+from mdbenchmark.mdengines.utils import link_file
 
 NAME = "gromacs"
 
 LOWERCASE_LETTERS = string.ascii_lowercase
 
+# Values of boolean mdrun options
+TRUE_VALUES = ["yes", "true", "on"]
+FALSE_VALUES = ["no", "false", "off"]
+
+# PME and PP ranks are considered balanced, if the PME mesh/force load is
+# within this distance of 1.
+PME_LOAD_TOLERANCE = 0.1
+
 
 def prepare_benchmark(name, relative_path, *args, **kwargs):
     benchmark = kwargs["benchmark"]
+    link = kwargs.get("link", "copy")
 
     full_filename = name + ".tpr"
     if name.endswith(".tpr"):
@@ -39,15 +49,38 @@ def prepare_benchmark(name, relative_path, *args, **kwargs):
     filepath = os.path.join(relative_path, full_filename)
 
     if kwargs["multidir"] == 1:
-        copyfile(filepath, benchmark[full_filename].relpath)
+        link_file(filepath, benchmark[full_filename].relpath, link)
     else:
         for i in range(kwargs["multidir"]):
             subdir = benchmark[LOWERCASE_LETTERS[i] + "/" + full_filename].make()
-            copyfile(filepath, subdir.relpath)
+            link_file(filepath, subdir.relpath, link)
 
     return name
 
 
+def format_mdrun_options(options):
+    """Format options for `gmx mdrun`, e.g., `-npme 2 -nb gpu`.
+
+    Boolean options are passed as `-name` or `-noname`, if their value is
+    `yes`, `true`, `on` or `no`, `false`, `off`, respectively.
+
+    Parameters
+    ----------
+    options : list
+        Tuples with the name and value of each option.
+    """
+    formatted = []
+    for name, value in options:
+        if value.lower() in TRUE_VALUES:
+            formatted.append("-{}".format(name))
+        elif value.lower() in FALSE_VALUES:
+            formatted.append("-no{}".format(name))
+        else:
+            formatted.append("-{} {}".format(name, value))
+
+    return " ".join(formatted)
+
+
 def prepare_multidir(multidir):
     multidir_string = ""
 
@@ -59,6 +92,26 @@ def prepare_multidir(multidir):
     return multidir_string
 
 
+def get_output_files(path, categories):
+    """Return the paths of the log files of a benchmark.
+
+    GROMACS is run with `-deffnm <name>`, so the log file is called
+    `<name>.log`. With `-multidir` there is one log file in each of the
+    subdirectories `a`, `b`, ... Returns an empty list if the name of the
+    benchmark is unknown.
+    """
+    if "name" not in categories:
+        return []
+
+    filename = categories["name"] + ".log"
+    multidir = categories["multidir"] if "multidir" in categories else 1
+
+    if multidir == 1:
+        return [os.path.join(path, filename)]
+
+    return [os.path.join(path, LOWERCASE_LETTERS[i], filename) for i in range(multidir)]
+
+
 def check_input_file_exists(name):
     """Check if the TPR file exists."""
     fn = name
@@ -72,3 +125,39 @@ def check_input_file_exists(name):
         )
 
     return True
+
+
+def suggest_npme(pme_load, npme, nranks):
+    """Suggest a number of separate PME ranks that balances the PME and PP load.
+
+    GROMACS reports the average PME mesh/force load, i.e., the ratio of the
+    time the PME ranks and the PP ranks need for each step. Assuming that both
+    parts scale linearly with the number of ranks, the work is balanced if the
+    `nranks` ranks are split according to the ratio of the total work.
+
+    Parameters
+    ----------
+    pme_load : float
+        Average PME mesh/force load of the run.
+    npme : int
+        Number of separate PME ranks of the run.
+    nranks : int
+        Total number of ranks of the run.
+
+    Returns
+    -------
+    int / float
+        Suggested value for `-npme`, `npme` if the load is balanced or NaN if
+        the run did not use separate PME ranks.
+    """
+    values = [pme_load, npme, nranks]
+    if any(v is None or math.isnan(v) for v in values) or npme < 1 or nranks <= npme:
+        return math.nan
+
+    npme = int(npme)
+    if abs(pme_load - 1) <= PME_LOAD_TOLERANCE:
+        return npme
+
+    work_ratio = pme_load * npme / (nranks - npme)
+    suggestion = int(round(nranks * work_ratio / (1 + work_ratio)))
+    return min(max(suggestion, 1), int(nranks) - 1)
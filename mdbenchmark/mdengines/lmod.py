@@ -0,0 +1,304 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+"""Read the available modules from the spider cache of Lmod.
+
+Sites using Lmod usually keep a precomputed cache of all modules, which is
+written by ``update_lmod_system_cache_files``. The cache directories are
+configured via ``scDescriptT`` in ``lmodrc.lua``. Users without a system cache
+get a personal cache in ``~/.cache/lmod`` after running ``module spider``.
+
+The cache files are plain Lua or JSON files. We only need the names of the
+modules, so the Lua parser below understands just enough of the language to
+read table constructors.
+"""
+import glob
+import json
+import os
+import re
+
+# Personal configuration and caches of the user, relative to the home directory.
+USER_LMODRC = [".lmodrc.lua"]
+USER_CACHE_DIRS = [os.path.join(".cache", "lmod"), os.path.join(".lmod.d", ".cache")]
+CACHE_PATTERNS = ["spiderT*.lua", "spiderT*.json", "moduleT*.lua", "moduleT*.json"]
+
+_TOKENS = re.compile(
+    r"""
+    (?P<space>\s+|--\[(?P<ceq>=*)\[.*?\](?P=ceq)\]|--[^\n]*)
+    |(?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    |(?P<longstring>\[(?P<seq>=*)\[.*?\](?P=seq)\])
+    |(?P<number>-?(?:0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?))
+    |(?P<name>[A-Za-z_]\w*)
+    |(?P<symbol>[{}\[\]=,;])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "a": "\a", "b": "\b", "f": "\f", "v": "\v"}
+_CONSTANTS = {"true": True, "false": False, "nil": None}
+
+
+def _unescape(value):
+    return re.sub(
+        r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), value, flags=re.S
+    )
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _TOKENS.match(text, position)
+        if match is None:
+            raise ValueError("Unexpected character at position {}.".format(position))
+        position = match.end()
+
+        kind = match.lastgroup
+        if kind == "space":
+            continue
+
+        value = match.group(kind)
+        if kind == "string":
+            value = _unescape(value[1:-1])
+        elif kind == "longstring":
+            value = value[len(match.group("seq")) + 2 : -len(match.group("seq")) - 2]
+            kind = "string"
+        elif kind == "number":
+            value = float.fromhex(value) if "x" in value.lower() else float(value)
+            value = int(value) if value.is_integer() else value
+        tokens.append((kind, value))
+
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self, offset=0):
+        try:
+            return self.tokens[self.position + offset]
+        except IndexError:
+            return (None, None)
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError("Unexpected end of file.")
+        self.position += 1
+        return token
+
+    def expect(self, symbol):
+        token = self.next()
+        if token != ("symbol", symbol):
+            raise ValueError("Expected '{}', got '{}'.".format(symbol, token[1]))
+
+    def value(self):
+        kind, value = self.next()
+        if kind in ("string", "number"):
+            return value
+        if kind == "name" and value in _CONSTANTS:
+            return _CONSTANTS[value]
+        if (kind, value) == ("symbol", "{"):
+            return self.table()
+        raise ValueError("Unsupported value '{}'.".format(value))
+
+    def table(self):
+        table = {}
+        index = 1
+        while self.peek() != ("symbol", "}"):
+            if self.peek() == ("symbol", "["):
+                self.next()
+                key = self.value()
+                self.expect("]")
+                self.expect("=")
+                table[key] = self.value()
+            elif self.peek()[0] == "name" and self.peek(1) == ("symbol", "="):
+                key = self.next()[1]
+                self.next()
+                table[key] = self.value()
+            else:
+                table[index] = self.value()
+                index += 1
+
+            if self.peek()[0] == "symbol" and self.peek()[1] in ",;":
+                self.next()
+            elif self.peek() != ("symbol", "}"):
+                raise ValueError(
+                    "Expected ',' or '}}', got '{}'.".format(self.peek()[1])
+                )
+        self.next()
+        return table
+
+    def chunk(self):
+        variables = {}
+        while self.peek()[0] is not None:
+            kind, name = self.next()
+            if (kind, name) == ("name", "local"):
+                kind, name = self.next()
+            if kind != "name":
+                raise ValueError("Expected a variable name, got '{}'.".format(name))
+            self.expect("=")
+            variables[name] = self.value()
+        return variables
+
+
+def parse_lua(text):
+    """Return the global variables assigned in a Lua file.
+
+    Only assignments of strings, numbers, booleans and (nested) tables are
+    supported. Tables are returned as dictionaries, positional entries are
+    stored with integer keys starting at 1.
+
+    Raises
+    ------
+    ValueError
+        If the text cannot be parsed.
+    """
+    return _Parser(text).chunk()
+
+
+def _read(filename):
+    with open(filename) as fh:
+        if filename.endswith(".json"):
+            return json.load(fh)
+        return parse_lua(fh.read())
+
+
+def lmodrc_files():
+    """Return all existing ``lmodrc.lua`` files in the order Lmod reads them."""
+    candidates = []
+    if os.environ.get("LMOD_PKG"):
+        candidates.append(os.path.join(os.environ["LMOD_PKG"], "init", "lmodrc.lua"))
+    candidates.append(
+        os.path.join(os.environ.get("LMOD_CONFIG_DIR", "/etc/lmod"), "lmodrc.lua")
+    )
+    candidates.append("/etc/lmodrc.lua")
+    candidates.extend(os.path.join(os.path.expanduser("~"), f) for f in USER_LMODRC)
+    if os.environ.get("LMOD_RC"):
+        candidates.extend(os.environ["LMOD_RC"].split(":"))
+
+    return [c for c in candidates if os.path.isfile(c)]
+
+
+def spider_cache_dirs():
+    """Return the directories that may contain a spider cache.
+
+    System caches from ``scDescriptT`` come first, followed by the personal
+    caches of the user.
+    """
+    directories = []
+    for filename in lmodrc_files():
+        try:
+            descriptions = _read(filename).get("scDescriptT", {})
+        except (OSError, ValueError, AttributeError):
+            continue
+        if not isinstance(descriptions, dict):
+            continue
+        for description in descriptions.values():
+            if isinstance(description, dict) and description.get("dir"):
+                directories.append(description["dir"])
+
+    home = os.path.expanduser("~")
+    directories.extend(os.path.join(home, d) for d in USER_CACHE_DIRS)
+
+    return directories
+
+
+def spider_cache_files():
+    """Return all spider cache files, newest first within each directory."""
+    files = []
+    for directory in spider_cache_dirs():
+        found = set()
+        for pattern in CACHE_PATTERNS:
+            found.update(glob.glob(os.path.join(directory, pattern)))
+        files.extend(sorted(found, key=os.path.getmtime, reverse=True))
+
+    return files
+
+
+def spider_cache_paths():
+    """Return all files and directories the spider cache depends on.
+
+    These are the ``lmodrc.lua`` files, the cache directories and all cache
+    files in them. The modules read from the spider cache are outdated as soon
+    as any of them changes.
+    """
+    return lmodrc_files() + spider_cache_dirs() + spider_cache_files()
+
+
+def _add_module(name, engines, available_modules):
+    parts = name.split("/")
+    if len(parts) != 2 or not all(parts):
+        return
+    for mdengine in engines:
+        if mdengine in parts[0]:
+            available_modules[mdengine].add(parts[1])
+
+
+def _collect_modules(data, engines, available_modules):
+    """Find all module names, i.e., ``name/version``, in a spider cache.
+
+    The full module names are used as keys of ``fileT`` in ``spiderT`` and
+    stored as ``fullName`` in older ``moduleT`` caches.
+    """
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+            continue
+        if not isinstance(item, dict):
+            continue
+        for key, value in item.items():
+            if isinstance(key, str):
+                _add_module(key, engines, available_modules)
+            if key == "fullName" and isinstance(value, str):
+                _add_module(value, engines, available_modules)
+            stack.append(value)
+
+
+def read_spider_cache(engines):
+    """Return the module versions of all engines from the Lmod spider cache.
+
+    The first readable cache file with modules of any of the given engines is
+    used.
+
+    Returns
+    -------
+    If no usable spider cache exists, we return `None`.
+
+    available_modules : dict
+        Dictionary containing all engines as keys and their versions as a list.
+    """
+    for filename in spider_cache_files():
+        try:
+            data = _read(filename)
+        except (OSError, ValueError, UnicodeDecodeError):
+            continue
+
+        if isinstance(data, dict):
+            data = [data[k] for k in ("spiderT", "moduleT") if k in data] or data
+
+        available_modules = dict((mdengine, set()) for mdengine in engines)
+        _collect_modules(data, engines, available_modules)
+        if any(available_modules.values()):
+            return dict((k, sorted(v)) for k, v in available_modules.items())
+
+    return None
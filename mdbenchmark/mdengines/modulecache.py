@@ -0,0 +1,197 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+import tempfile
+import time
+
+from mdbenchmark.mdengines import lmod
+
+MODULE_CACHE_FILENAME = "modules.json"
+# Increase this number whenever the layout of the cache file changes.
+MODULE_CACHE_VERSION = 1
+# Rescan `MODULEPATH` at least once a day, even if no directory changed.
+MODULE_CACHE_TTL = 24 * 60 * 60
+# Scans of `MODULEPATH` are keyed on its value, which never takes this form.
+SPIDER_CACHE_KEY = "lmod:spider"
+
+
+def module_cache_filename():
+    """Return the path of the module cache of the current user.
+
+    The cache is stored in ``$XDG_CACHE_HOME/MDBenchmark``, which defaults to
+    ``~/.cache/MDBenchmark``.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "MDBenchmark", MODULE_CACHE_FILENAME)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def scan_module_paths(module_paths, engines):
+    """Find all module versions of the given MD engines.
+
+    Every directory in `module_paths` is walked, but we only descend into
+    subdirectories that contain the name of an MD engine. All non-hidden files
+    below such a directory are considered to be module versions of that engine.
+
+    Returns
+    -------
+    available_modules : dict
+        Dictionary containing all engines as keys and their versions as a list.
+    mtimes : dict
+        Modification times of all scanned directories. Missing directories are
+        recorded with `None`.
+    """
+    available_modules = dict((mdengine, []) for mdengine in engines)
+    mtimes = {}
+
+    for root in module_paths.split(":"):
+        if not root:
+            continue
+        mtimes[root] = _mtime(root)
+
+        for path, dirs, files in os.walk(root):
+            mtimes[path] = _mtime(path)
+            matches = [mdengine for mdengine in engines if mdengine in path]
+
+            # Prune the walk to directories belonging to one of the engines.
+            if not matches:
+                dirs[:] = [d for d in dirs if any(m in d for m in engines)]
+
+            for mdengine in matches:
+                for name in files:
+                    if not name.startswith("."):
+                        available_modules[mdengine].append(name)
+
+    return available_modules, mtimes
+
+
+def _read_cache(filename):
+    try:
+        with open(filename) as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(data, dict) or data.get("version") != MODULE_CACHE_VERSION:
+        return {}
+
+    return data.get("entries", {})
+
+
+def _write_cache(filename, entries):
+    directory = os.path.dirname(filename)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first, so that concurrent runs never see
+        # a partially written cache.
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as fh:
+            json.dump({"version": MODULE_CACHE_VERSION, "entries": entries}, fh)
+        os.replace(tmp, filename)
+    except OSError:
+        # The cache is only an optimization. If we cannot write it, we simply
+        # scan again next time.
+        pass
+
+
+def is_valid(entry, engines, now=None, ttl=MODULE_CACHE_TTL):
+    """Check whether a cache entry can still be used.
+
+    An entry is outdated if it is older than `ttl` seconds, if it was created
+    for other MD engines or if any of the scanned directories changed.
+    """
+    if now is None:
+        now = time.time()
+
+    try:
+        if now - entry["time"] > ttl or sorted(entry["engines"]) != sorted(engines):
+            return False
+        return all(_mtime(path) == mtime for path, mtime in entry["mtimes"].items())
+    except (KeyError, TypeError):
+        return False
+
+
+def _cached(key, engines, scan, refresh=False):
+    """Return the cached modules stored under `key`.
+
+    If the entry is missing or outdated, `scan` is called to read the modules
+    and the modification times of the files they depend on. Its result is
+    stored in the cache before it is returned.
+    """
+    filename = module_cache_filename()
+    entries = _read_cache(filename)
+
+    entry = entries.get(key)
+    if not refresh and entry is not None and is_valid(entry, engines):
+        return entry["modules"]
+
+    available_modules, mtimes = scan()
+
+    now = time.time()
+    entries = {
+        key: value
+        for key, value in entries.items()
+        if isinstance(value, dict) and now - value.get("time", 0) <= MODULE_CACHE_TTL
+    }
+    entries[key] = {
+        "time": now,
+        "engines": list(engines),
+        "mtimes": mtimes,
+        "modules": available_modules,
+    }
+    _write_cache(filename, entries)
+
+    return available_modules
+
+
+def cached_scan(module_paths, engines, refresh=False):
+    """Return the module versions of all engines, using the cache if possible.
+
+    See `scan_module_paths` for the returned dictionary. Use `refresh` to
+    ignore the cache and rescan all directories.
+    """
+    return _cached(
+        module_paths, engines, lambda: scan_module_paths(module_paths, engines), refresh
+    )
+
+
+def cached_spider_cache(engines):
+    """Return the module versions from the Lmod spider cache, if possible cached.
+
+    Parsing a large spider cache takes about as long as scanning `MODULEPATH`,
+    so the result is cached as well. It is read again once one of the files
+    returned by `lmod.spider_cache_paths` changes. See `lmod.read_spider_cache`
+    for the returned dictionary.
+    """
+
+    def scan():
+        mtimes = dict((path, _mtime(path)) for path in lmod.spider_cache_paths())
+        return lmod.read_spider_cache(engines), mtimes
+
+    return _cached(SPIDER_CACHE_KEY, engines, scan)
@@ -18,15 +18,17 @@
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
 import os
-from shutil import copyfile
+from glob import glob
 
 from mdbenchmark import console
+from mdbenchmark.mdengines.utils import link_file
 
 NAME = "namd"
 
 
 def prepare_benchmark(name, relative_path, *args, **kwargs):
     benchmark = kwargs["benchmark"]
+    link = kwargs.get("link", "copy")
 
     if not kwargs["multidir"] == 1:
         console.error("The NAMD-engine currently only supports '--multidir 1'")
@@ -46,9 +48,9 @@ def prepare_benchmark(name, relative_path, *args, **kwargs):
         analyze_namd_file(fh)
         fh.seek(0)
 
-    copyfile(namd_relpath, benchmark[namd].relpath)
-    copyfile(psf_relpath, benchmark[psf].relpath)
-    copyfile(pdb_relpath, benchmark[pdb].relpath)
+    link_file(namd_relpath, benchmark[namd].relpath, link)
+    link_file(psf_relpath, benchmark[psf].relpath, link)
+    link_file(pdb_relpath, benchmark[pdb].relpath, link)
 
     return name
 
@@ -57,6 +59,16 @@ def prepare_multidir(multidir):
     return None
 
 
+def get_output_files(path, categories):
+    """Return the paths of the output files of a benchmark.
+
+    NAMD writes to the standard output, which is redirected to a file named
+    by the queuing system (e.g., `<job_name>.out.<job_id>`). We therefore only
+    look at the files directly inside the benchmark directory.
+    """
+    return sorted(glob(os.path.join(path, "*out*")))
+
+
 def analyze_namd_file(fh):
     """ Check whether the NAMD config file has any relative imports or variables
     """
@@ -17,25 +17,253 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import errno
+import mmap
 import os
 import re
+import shutil
+import sys
+from datetime import datetime, timezone
 from glob import glob
 
 import datreant as dtr
 import numpy as np
 
+from mdbenchmark import profiling
+from mdbenchmark.timeseries import load_throughput, steady_state
+
 FILES_TO_KEEP = {
     "gromacs": [".*/bench.job", ".*.tpr", ".*.mdp"],
     "namd": [".*/bench.job", ".*.namd", ".*.psf", ".*.pdb"],
 }
 
+# Every method in `LINK_METHODS` falls back to the next one in `LINK_FALLBACKS`
+# if it is not supported.
+LINK_FALLBACKS = {"hard": "reflink", "reflink": "copy", "sym": "copy"}
+# ioctl request to clone a file on Linux (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+# Marks the start of the table with the timings of all tasks in GROMACS logs.
+CYCLE_ACCOUNTING = "R E A L   C Y C L E   A N D   T I M E   A C C O U N T I N G"
+# A row of the table: the name of the task, followed by numbers only.
+CYCLE_ACCOUNTING_ROW = re.compile(r"^\s*(?P<name>\S.*?)\s{2,}(?P<numbers>[\d.\s]+)$")
+
+# Lines of GROMACS log files used to reconstruct the performance over time.
+# Checkpoints are searched in the raw bytes of the file.
+GROMACS_DATE_FORMAT = "%a %b %d %H:%M:%S %Y"
+THROUGHPUT_PATTERNS = {
+    "dt": re.compile(r"^\s+(dt|delta[-_]t)\s+="),
+    "init_step": re.compile(r"^\s+init[-_]step\s+="),
+    "started": re.compile(r"Started mdrun on rank 0 (.*)$"),
+    "checkpoint": re.compile(rb"Writing checkpoint, step (\d+) at ([^\r\n]*)"),
+    "energies": re.compile(r"^\s+Step\s+Time\s*$"),
+    "finished": re.compile(r"Finished mdrun on rank 0 (.*)$"),
+}
+
+
+def _timing_column(name):
+    """Turn the name of a task, e.g., `Domain decomp.`, into a column name."""
+    return "timing_" + re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def parse_cycle_accounting(lines):
+    """Parse the cycle and time accounting table of a GROMACS log file.
+
+    Parameters
+    ----------
+    lines : list
+        Lines of the log file, starting with the title of the table.
+
+    Returns
+    -------
+    dict
+        Share of the total wall time in percent for each task. The keys are the
+        names of the tasks prefixed with `timing_`, e.g., `timing_pme_mesh`.
+    """
+    timings = {}
+    in_table = False
+
+    for line in lines[1:]:
+        if line.strip().startswith("---"):
+            # Rows are enclosed by two lines of dashes, followed by the total.
+            if in_table:
+                break
+            in_table = True
+            continue
+
+        match = CYCLE_ACCOUNTING_ROW.match(line.rstrip())
+        if not in_table or match is None:
+            continue
+
+        column = _timing_column(match.group("name"))
+        share = float(match.group("numbers").split()[-1])
+        timings[column] = timings.get(column, 0) + share
+
+    return timings
+
+
+def parse_notes(lines):
+    """Collect the notes printed at the end of a GROMACS log file.
+
+    A note starts with `NOTE:` and ends at the next empty line.
+
+    Returns
+    -------
+    dict
+        All notes joined by newlines as `notes` or an empty dictionary.
+    """
+    notes = []
+    in_note = False
+
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("NOTE:"):
+            notes.append(stripped[5:].strip())
+            in_note = True
+        elif in_note and stripped:
+            notes[-1] += " " + stripped
+        else:
+            in_note = False
+
+    if not notes:
+        return {}
+
+    return {"notes": "\n".join(notes)}
+
+
+def _parse_date(text):
+    """Return the seconds since the epoch of a date printed by GROMACS, e.g.,
+    `Mon Dec 11 09:29:46 2017`, or None if the date cannot be read."""
+    try:
+        date = datetime.strptime(" ".join(text.split()), GROMACS_DATE_FORMAT)
+    except ValueError:
+        return None
+    return date.replace(tzinfo=timezone.utc).timestamp()
+
+
+def parse_throughput(filename):
+    """Reconstruct the performance over the course of a GROMACS run.
+
+    GROMACS prints the wall clock time when mdrun starts, whenever a
+    checkpoint is written and when mdrun finishes. Together with the step
+    numbers of these lines and the time step, the performance between two
+    consecutive lines is known. The finish is assigned to the last step in the
+    energy output. Checkpoints are written every 15 minutes by default, use
+    the mdrun option `-cpt` to get more samples.
+
+    The time step and the start are read from the header. The checkpoints are
+    searched in the raw bytes of the rest of the file, without decoding it
+    line by line, and the finish is read backwards from the end of the file.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the GROMACS log file to read
+
+    Returns
+    -------
+    numpy.ndarray
+        Array with one row per interval. The columns are the wall clock time
+        at the end of the interval in minutes since the start and the
+        performance during the interval in ns/day. The array is empty if the
+        log file has less than two samples.
+    """
+    dt = np.nan
+    init_step = 0
+    samples = []
+
+    with open(filename, "rb") as fh:
+        # The time step and the first step are printed before mdrun starts
+        for raw_line in fh:
+            line = raw_line.decode(errors="replace")
+            if THROUGHPUT_PATTERNS["dt"].match(line):
+                dt = float(line.split("=")[1])
+            elif THROUGHPUT_PATTERNS["init_step"].match(line):
+                init_step = int(line.split("=")[1])
+
+            match = THROUGHPUT_PATTERNS["started"].search(line)
+            if match is not None:
+                samples.append((init_step, _parse_date(match.group(1))))
+                break
+        header_end = fh.tell()
+
+        if not samples or np.isnan(dt):
+            return np.empty((0, 2))
+
+        if os.fstat(fh.fileno()).st_size > header_end:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for match in THROUGHPUT_PATTERNS["checkpoint"].finditer(
+                    data, header_end
+                ):
+                    seconds = _parse_date(match.group(2).decode(errors="replace"))
+                    samples.append((int(match.group(1)), seconds))
+
+        # The finish is printed after the last energies. The step number is
+        # printed in the line below their header.
+        finished = None
+        following = ""
+        for line in _read_lines_backward(fh, stop=header_end):
+            match = THROUGHPUT_PATTERNS["finished"].search(line)
+            if finished is None and match is not None:
+                finished = _parse_date(match.group(1))
+            if THROUGHPUT_PATTERNS["energies"].match(line):
+                fields = following.split()
+                if finished is not None and fields and fields[0].isdigit():
+                    samples.append((int(fields[0]), finished))
+                break
+            following = line
+
+    samples = [(step, seconds) for step, seconds in samples if seconds is not None]
+
+    intervals = []
+    if samples:
+        start = previous = samples[0]
+        for step, seconds in samples[1:]:
+            # Skip samples without progress, e.g., the finish right after the
+            # last checkpoint.
+            if step <= previous[0] or seconds <= previous[1]:
+                continue
+            # The time step is given in ps
+            ns_per_day = (step - previous[0]) * dt / 1000 / (seconds - previous[1])
+            intervals.append(((seconds - start[1]) / 60, ns_per_day * 86400))
+            previous = (step, seconds)
+
+    return np.array(intervals, dtype=float).reshape(-1, 2)
+
+
+def _number_after_colon(line):
+    """Return the first number after the colon of a line, e.g., `3.4` for `x: 3.4%.`"""
+    return float(re.search(r":\s*([-+]?\d+(?:\.\d+)?)", line).group(1))
+
+
 PARSE_ENGINE = {
     "gromacs": {
         "performance": "Performance",
         "performance_return": lambda line: float(line.split()[1]),
         "ncores": "Running on",
         "ncores_return": lambda line: int(line.split()[6]),
+        "npme": "separate PME ranks",
+        "npme_return": lambda line: int(line.split()[1]),
+        "load_imbalance": "Average load imbalance:",
+        "load_imbalance_return": _number_after_colon,
+        "imbalance_wait": "waiting due to load imbalance:",
+        "imbalance_wait_return": _number_after_colon,
+        "pme_load": "Average PME mesh/force load:",
+        "pme_load_return": _number_after_colon,
+        "pme_wait": "waiting due to PP/PME imbalance:",
+        "pme_wait_return": _number_after_colon,
         "analyze": "**/[!#]*log*",
+        "header": ["ncores", "npme"],
+        "header_end": "Started mdrun",
+        "footer": ["performance"],
+        "summary": ["load_imbalance", "imbalance_wait", "pme_load", "pme_wait"],
+        "summary_start": "M E G A - F L O P S   A C C O U N T I N G",
+        "tables": {
+            "timings": (CYCLE_ACCOUNTING, parse_cycle_accounting),
+            "notes": (None, parse_notes),
+        },
+        "details": ["npme", "load_imbalance", "imbalance_wait", "pme_load", "pme_wait"],
+        "throughput": parse_throughput,
     },
     "namd": {
         "performance": "Benchmark time",
@@ -43,9 +271,23 @@ PARSE_ENGINE = {
         "ncores": "Benchmark time",
         "ncores_return": lambda line: int(line.split()[3]),
         "analyze": "*out*",
+        "header": ["performance", "ncores"],
+        "header_end": None,
+        "footer": [],
+        "summary": [],
+        "summary_start": None,
+        "tables": {},
+        "details": [],
+        "throughput": None,
     },
 }
 
+# Size of the blocks that are read when scanning a log file backwards from its end.
+TAIL_BLOCKSIZE = 8192
+# Maximum number of lines at the end of a log file that are searched for the
+# summary of the run, i.e., the `summary` metrics and `tables` of `PARSE_ENGINE`.
+SUMMARY_LINES = 1000
+
 
 def parse_ns_day(engine, fh):
     """Parse the performance (ns/day) from any MD engine log file.
@@ -91,9 +333,165 @@ def parse_ncores(engine, fh):
     return np.nan
 
 
-def analyze_benchmark(engine, benchmark):
+def _read_lines_backward(fh, stop=0, blocksize=TAIL_BLOCKSIZE):
+    """Yield the lines of a binary file handle in reverse order.
+
+    The file is read in blocks of `blocksize` bytes, starting at its end. We
+    never read anything before the byte offset `stop`.
+    """
+    fh.seek(0, os.SEEK_END)
+    position = fh.tell()
+    remainder = b""
+
+    while position > stop:
+        size = min(blocksize, position - stop)
+        position -= size
+        fh.seek(position)
+        lines = (fh.read(size) + remainder).split(b"\n")
+        # The first line may be incomplete, keep it for the next block.
+        remainder = lines.pop(0)
+        for line in reversed(lines):
+            yield line.decode(errors="replace")
+
+    if remainder:
+        yield remainder.decode(errors="replace")
+
+
+def parse_log(engine, filename):
+    """Parse all metrics from any MD engine log file in a single pass.
+
+    Metrics listed in the `header` of `PARSE_ENGINE` are searched from the
+    start of the file, until all of them were found or the `header_end` line
+    was reached. Metrics listed in the `footer` are searched backwards from the
+    end of the file, without reading the part that was already scanned. For
+    finished runs this means that only the first and last few kilobytes of a
+    log file are read.
+
+    The summary of a run is searched in the last `SUMMARY_LINES` lines of the
+    file, but not before the `summary_start` line. It consists of the
+    `summary` metrics, which are optional, and the `tables`. Each table is
+    parsed by its own function, starting from the line containing its title.
+    Tables without a title are parsed from the whole summary.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the log file to read
+
+    Returns
+    -------
+    dict
+        Dictionary with the metric names as keys. Missing values are NaN,
+        missing tables are empty dictionaries.
+    """
+    patterns = PARSE_ENGINE[engine.NAME]
+    header_end = patterns["header_end"]
+    summary_start = patterns["summary_start"]
+    summary = patterns["summary"]
+    tables = {
+        key: value for key, value in patterns["tables"].items() if value[0] is not None
+    }
+    results = {}
+
+    def match(keys, line):
+        for key in keys:
+            if key not in results and patterns[key] in line:
+                results[key] = patterns["{}_return".format(key)](line)
+
+    with open(filename, "rb") as fh:
+        # Read the header forward. The summary is always read from the end of
+        # the file, so we stop in front of it.
+        wanted = patterns["header"] + patterns["footer"] + summary
+        titles = [title for title, _ in tables.values()]
+        if summary_start is not None:
+            titles.append(summary_start)
+        while True:
+            start = fh.tell()
+            raw_line = fh.readline()
+            if not raw_line:
+                break
+            line = raw_line.decode(errors="replace")
+            if any(title in line for title in titles):
+                fh.seek(start)
+                break
+            match(wanted, line)
+            if all(key in results for key in patterns["header"]):
+                break
+            if header_end is not None and header_end in line:
+                break
+
+        # Read the footer and summary backward, stopping where the header scan ended
+        footer = [key for key in patterns["footer"] if key not in results]
+        tail = []
+        in_summary = bool(summary or patterns["tables"])
+        if footer or in_summary:
+            for line in _read_lines_backward(fh, stop=fh.tell()):
+                match(footer, line)
+
+                if in_summary:
+                    tail.append(line)
+                    match(summary, line)
+                    for key, (title, parse_table) in list(tables.items()):
+                        if title in line:
+                            results[key] = parse_table(tail[::-1])
+                            del tables[key]
+                    if len(tail) >= SUMMARY_LINES or (
+                        summary_start is not None and summary_start in line
+                    ):
+                        in_summary = False
+
+                if not in_summary and all(key in results for key in footer):
+                    break
+
+    for key, (title, parse_table) in patterns["tables"].items():
+        if title is None:
+            results[key] = parse_table(tail[::-1])
+
+    for key in patterns["header"] + patterns["footer"] + summary:
+        results.setdefault(key, np.nan)
+    for key in patterns["tables"]:
+        results.setdefault(key, {})
+
+    return results
+
+
+def _average_details(details):
+    """Average the details of several simulations.
+
+    Numbers are averaged ignoring NaN, other values are joined by newlines.
+    """
+    values = {}
+    for detail in details:
+        for key, value in detail.items():
+            values.setdefault(key, []).append(value)
+
+    averages = {}
+    for key, value in values.items():
+        if all(isinstance(v, str) for v in value):
+            averages[key] = "\n".join(sorted(set(value), key=value.index))
+            continue
+        numbers = [v for v in value if not isinstance(v, str) and not np.isnan(v)]
+        averages[key] = np.mean(numbers) if numbers else np.nan
+
+    return averages
+
+
+def analyze_benchmark(engine, benchmark, cache=None, details=False, time_series=False):
     """
     Analyze performance data from a simulation run with any MD engine.
+
+    If a `mdbenchmark.cache.ResultsCache` is given, log files that did not
+    change since the last analysis are not parsed again.
+
+    With `details`, a dictionary with additional columns is returned as well.
+    It contains the `details` metrics of `PARSE_ENGINE` and the columns of all
+    tables, e.g., the load imbalance and timings of GROMACS. Values of
+    simulations run with `-multidir` are averaged.
+
+    With `time_series`, the performance over the course of each run is
+    reconstructed for engines that support it. Its drift and noise are added
+    to the details as `throughput_drift` and `throughput_noise`, see
+    `mdbenchmark.timeseries.steady_state`.
     """
     performance = np.nan
     ncores = np.nan
@@ -102,22 +500,44 @@ def analyze_benchmark(engine, benchmark):
     hyperthreading = np.nan
     module = None
     multidir = np.nan
-
-    # search all output files
-    output_files = glob(
-        os.path.join(benchmark.relpath, PARSE_ENGINE[engine.NAME]["analyze"]),
-        recursive=True,
-    )
+    mdrun_options = ""
+
+    # Look up the output files at their known location. Only search the
+    # whole benchmark directory if they are not there.
+    output_files = [
+        f
+        for f in engine.get_output_files(benchmark.relpath, benchmark.categories)
+        if os.path.isfile(f)
+    ]
+    if not output_files:
+        output_files = glob(
+            os.path.join(benchmark.relpath, PARSE_ENGINE[engine.NAME]["analyze"]),
+            recursive=True,
+        )
+    extra_columns = {}
     if output_files:
         performance = []
         ncores = []
+        parsed_details = []
         for f in output_files:
-            with open(f) as fh:
-                performance.append(parse_ns_day(engine, fh))
-                fh.seek(0)
-                ncores.append(parse_ncores(engine, fh))
+            if cache is not None:
+                metrics = cache.parse_log(engine, f)
+            else:
+                metrics = parse_log(engine, f)
+            performance.append(metrics["performance"])
+            ncores.append(metrics["ncores"])
+
+            detail = {key: metrics[key] for key in PARSE_ENGINE[engine.NAME]["details"]}
+            for key in PARSE_ENGINE[engine.NAME]["tables"]:
+                detail.update(metrics[key])
+            parse = PARSE_ENGINE[engine.NAME]["throughput"]
+            if time_series and parse is not None:
+                drift, noise = steady_state(load_throughput(parse, f))
+                detail.update(throughput_drift=drift, throughput_noise=noise)
+            parsed_details.append(detail)
         performance = np.sum(performance)
         ncores = ncores[0]
+        extra_columns = _average_details(parsed_details)
 
     if "time" not in benchmark.categories:
         benchmark.categories["time"] = 0
@@ -142,8 +562,10 @@ def analyze_benchmark(engine, benchmark):
         ranks = benchmark.categories["ranks"]
         threads = benchmark.categories["threads"]
         hyperthreading = benchmark.categories["hyperthreading"]
+        if "mdrun_options" in benchmark.categories:
+            mdrun_options = benchmark.categories["mdrun_options"]
 
-    return [
+    row = [
         module,
         benchmark.categories["nodes"],
         performance,
@@ -155,8 +577,62 @@ def analyze_benchmark(engine, benchmark):
         threads,
         hyperthreading,
         multidir,
+        mdrun_options,
     ]
 
+    if details:
+        return row, extra_columns
+
+    return row
+
+
+def _reflink(src, dst):
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are only supported on Linux", dst)
+
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+
+
+def link_file(src, dst, method="copy"):
+    """Put the file `src` at `dst` using one of the `LINK_METHODS`.
+
+    Hard links do not work across file systems and reflinks are only supported
+    by some file systems. If a method fails, the next one in `LINK_FALLBACKS`
+    is tried, down to a plain copy.
+
+    Returns
+    -------
+    str
+        The method that was used.
+    """
+    # Never write through an existing link into the original file
+    if os.path.lexists(dst):
+        os.remove(dst)
+
+    while True:
+        try:
+            if method == "hard":
+                os.link(src, dst)
+            elif method == "sym":
+                os.symlink(os.path.abspath(src), dst)
+            elif method == "reflink":
+                _reflink(src, dst)
+            else:
+                shutil.copyfile(src, dst)
+            return method
+        except OSError:
+            if method not in LINK_FALLBACKS:
+                raise
+            method = LINK_FALLBACKS[method]
+
 
 def cleanup_before_restart(engine, sim):
     whitelist = FILES_TO_KEEP[engine.NAME]
@@ -178,6 +654,39 @@ def cleanup_before_restart(engine, sim):
         os.remove(fn)
 
 
+def benchmark_dirname(
+    nodes,
+    number_of_ranks,
+    number_of_threads,
+    hyperthreading,
+    multidir,
+    mdrun_options="",
+    repeat=0,
+):
+    """Return the name of the folder of a single benchmark.
+
+    Options for mdrun are appended to the name, e.g., `-npme 2 -nb gpu` as
+    `_npme2_nbgpu`. Replicates of a benchmark end with their number, e.g.,
+    `_rep2`. A `repeat` of zero means that there are no replicates.
+    """
+    hyperthreading_string = "wht" if hyperthreading else "woht"
+    dirname = "n{nodes:03d}_r{ranks:02d}_t{threads:02d}_{ht}_nsim{nsim:01d}".format(
+        nodes=nodes,
+        ranks=number_of_ranks,
+        threads=number_of_threads,
+        ht=hyperthreading_string,
+        nsim=multidir,
+    )
+    for option in re.split(r"(?:^|\s)-(?=[A-Za-z])", mdrun_options or ""):
+        option = re.sub(r"[^A-Za-z0-9.+-]", "", option)
+        if option:
+            dirname += "_" + option
+    if repeat:
+        dirname += "_rep{}".format(repeat)
+
+    return dirname
+
+
 def write_benchmark(
     engine,
     base_directory,
@@ -194,30 +703,44 @@ def write_benchmark(
     number_of_threads,
     hyperthreading,
     multidir,
+    link="copy",
+    mdrun_options="",
+    repeat=0,
 ):
-    """Generate a benchmark folder with the respective Benchmark object."""
-    # Create the `dtr.Treant` object
-    hyperthreading_string = "wht" if hyperthreading else "woht"
-    directory = base_directory[
-        "n{nodes:03d}_r{ranks:02d}_t{threads:02d}_{ht}_nsim{nsim:01d}/".format(
-            nodes=nodes,
-            ranks=number_of_ranks,
-            threads=number_of_threads,
-            ht=hyperthreading_string,
-            nsim=multidir,
-        )
-    ]
-    benchmark = dtr.Treant(directory)
+    """Generate a benchmark folder with the respective Benchmark object.
 
-    # Do MD engine specific things. Here we also format the name.
-    name = engine.prepare_benchmark(
-        name=name, relative_path=relative_path, benchmark=benchmark, multidir=multidir
+    The input files are put into the benchmark folder with `link_file`, using
+    the method `link`. Additional options for mdrun are stored as the category
+    `mdrun_options` and passed on to the job template. The number of the
+    replicate is stored as the category `repeat`.
+    """
+    # Create the `dtr.Treant` object
+    dirname = benchmark_dirname(
+        nodes,
+        number_of_ranks,
+        number_of_threads,
+        hyperthreading,
+        multidir,
+        mdrun_options,
+        repeat,
     )
+    directory = base_directory[dirname + "/"]
+    with profiling.phase("write"):
+        benchmark = dtr.Treant(directory)
+
+        # Do MD engine specific things. Here we also format the name.
+        name = engine.prepare_benchmark(
+            name=name,
+            relative_path=relative_path,
+            benchmark=benchmark,
+            multidir=multidir,
+            link=link,
+        )
     if job_name is None:
         job_name = name
 
     # Add categories as metadata
-    benchmark.categories = {
+    categories = {
         "module": module,
         "gpu": gpu,
         "nodes": nodes,
@@ -230,31 +753,81 @@ def write_benchmark(
         "hyperthreading": hyperthreading,
         "version": 3,
         "multidir": multidir,
+        "job_name": job_name,
+        "mdrun_options": mdrun_options,
+        "repeat": repeat,
     }
-
-    # Add some time buffer to the requested time. Otherwise the queuing system
-    # kills the job before the benchmark is finished
-    formatted_time = "{:02d}:{:02d}:00".format(*divmod(time + 5, 60))
-
-    # get engine specific multidir template replacement
-    multidir_string = engine.prepare_multidir(multidir)
+    with profiling.phase("write"):
+        benchmark.categories = categories
 
     # Create benchmark job script
-    script = template.render(
+    script = render_job_script(
+        template=template,
+        engine=engine,
         name=name,
         job_name=job_name,
         gpu=gpu,
         module=module,
-        mdengine=engine.NAME,
-        n_nodes=nodes,
+        nodes=nodes,
         time=time,
-        formatted_time=formatted_time,
         number_of_ranks=number_of_ranks,
         number_of_threads=number_of_threads,
         hyperthreading=hyperthreading,
-        multidir=multidir_string,
+        multidir=multidir,
+        mdrun_options=mdrun_options,
     )
 
     # Write the actual job script that is going to be submitted to the cluster
-    with open(benchmark["bench.job"].relpath, "w") as fh:
+    with profiling.phase("write"), open(benchmark["bench.job"].relpath, "w") as fh:
         fh.write(script)
+
+
+def render_job_script(
+    template,
+    engine,
+    name,
+    job_name,
+    gpu,
+    module,
+    nodes,
+    time,
+    number_of_ranks,
+    number_of_threads,
+    hyperthreading,
+    multidir,
+    mdrun_options="",
+    array=None,
+):
+    """Render the job script of a benchmark from its host template.
+
+    `mdrun_options` are additional options for mdrun, e.g., `-npme 2`. They are
+    passed to the template as they are.
+
+    `array` is only set when submitting a job array. It is a dictionary with
+    the number of array tasks (`size`) and the path to the file listing the
+    benchmark directory of each task (`index_file`).
+    """
+    # Add some time buffer to the requested time. Otherwise the queuing system
+    # kills the job before the benchmark is finished
+    formatted_time = "{:02d}:{:02d}:00".format(*divmod(time + 5, 60))
+
+    # get engine specific multidir template replacement
+    multidir_string = engine.prepare_multidir(multidir)
+
+    with profiling.phase("render"):
+        return template.render(
+            name=name,
+            job_name=job_name,
+            gpu=gpu,
+            module=module,
+            mdengine=engine.NAME,
+            n_nodes=nodes,
+            time=time,
+            formatted_time=formatted_time,
+            number_of_ranks=number_of_ranks,
+            number_of_threads=number_of_threads,
+            hyperthreading=hyperthreading,
+            multidir=multidir_string,
+            mdrun_options=mdrun_options,
+            array=array,
+        )
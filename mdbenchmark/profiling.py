@@ -0,0 +1,125 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import datetime as dt
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from mdbenchmark import console
+
+PROFILERS = ["timings", "cprofile"]
+# Phases of the subcommands, in the order they are reported
+PHASES = ["import", "discover", "parse", "aggregate", "render", "write"]
+
+_lock = threading.Lock()
+_state = {"profiler": None, "start": None, "command": None}
+_durations = defaultdict(float)
+_calls = defaultdict(int)
+
+
+def is_enabled():
+    return _state["profiler"] is not None
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent inside the block to the phase `name`.
+
+    Does nothing unless timings are being recorded. Phases that run on several
+    threads add up the time of all threads.
+    """
+    if _state["profiler"] != "timings":
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        with _lock:
+            _durations[name] += duration
+            _calls[name] += 1
+
+
+def start(profiler, command=None):
+    """Start profiling the subcommand `command` with `profiler`."""
+    _durations.clear()
+    _calls.clear()
+    _state.update(profiler=profiler, command=command, start=time.perf_counter())
+
+    if profiler == "cprofile":
+        import cProfile
+
+        _state["cprofile"] = cProfile.Profile()
+        _state["cprofile"].enable()
+
+
+def profile_filename(command):
+    date_time = dt.datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    return "mdbenchmark-{}-{}.prof".format(command or "cli", date_time)
+
+
+def stop():
+    """Stop profiling and report the results."""
+    profiler = _state["profiler"]
+    if profiler is None:
+        return
+
+    total = time.perf_counter() - _state["start"]
+    _state["profiler"] = None
+
+    if profiler == "cprofile":
+        profile = _state.pop("cprofile")
+        profile.disable()
+        filename = profile_filename(_state["command"])
+        profile.dump_stats(filename)
+        console.info(
+            "Profile written to {}. Inspect it with {}.",
+            filename,
+            "python -m pstats {}".format(filename),
+        )
+        return
+
+    console.info(format_timings(total))
+
+
+def format_timings(total):
+    """Return a table with the time spent in each phase."""
+    from tabulate import tabulate
+
+    rows = [
+        [name, _calls[name], _durations[name]]
+        for name in PHASES + sorted(set(_durations) - set(PHASES))
+        if name in _durations
+    ]
+    rows.append(["total (wall clock)", None, total])
+
+    return "Timings of {}:\n{}".format(
+        _state["command"] or "mdbenchmark",
+        tabulate(
+            rows,
+            headers=["Phase", "Calls", "Time (s)"],
+            tablefmt="psql",
+            floatfmt=".3f",
+            missingval="",
+        ),
+    )
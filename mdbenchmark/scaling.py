@@ -0,0 +1,246 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+"""Analysis of the scaling of benchmarks over the number of nodes."""
+import itertools
+import math
+
+import numpy as np
+
+from mdbenchmark.constants import EFFICIENCY_THRESHOLD
+
+# Largest number of nodes for which scaling models are evaluated
+MAX_PREDICTED_NODES = 100000
+
+# Scaling models for the time per simulated nanosecond T(n) on n nodes. Each
+# model is a linear combination of the given terms with non-negative
+# coefficients:
+#   amdahl:        T(n) = a + b / n
+#   communication: T(n) = a + b / n + c * log2(n)
+# The constant term is the serial part and the logarithmic term models
+# collective communication, which gets more expensive with more nodes.
+MODELS = {
+    "amdahl": [np.ones_like, np.reciprocal],
+    "communication": [np.ones_like, np.reciprocal, np.log2],
+}
+
+
+def geometric_nodes(min_nodes, max_nodes):
+    """Return the node counts `min_nodes`, `2 * min_nodes`, `4 * min_nodes`, ...
+    up to `max_nodes`."""
+    nodes = []
+    n = min_nodes
+    while n <= max_nodes:
+        nodes.append(n)
+        n *= 2
+
+    return nodes
+
+
+def parallel_efficiency(nodes, performance):
+    """Return the parallel efficiency of each benchmark.
+
+    The efficiency is the performance per node relative to the performance per
+    node of the benchmark with the smallest number of nodes.
+
+    Parameters
+    ----------
+    nodes : list
+        Number of nodes of each benchmark.
+    performance : list
+        Performance of each benchmark, e.g., in ns/day.
+
+    Returns
+    -------
+    list
+        Efficiency of each benchmark in the order of `nodes`. Benchmarks
+        without a performance value have an efficiency of NaN.
+    """
+    measured = [
+        (n, p)
+        for n, p in zip(nodes, performance)
+        if p is not None and not math.isnan(p)
+    ]
+    if not measured:
+        return [math.nan for _ in nodes]
+
+    base_nodes, base_performance = min(measured)
+    if base_performance <= 0:
+        return [math.nan for _ in nodes]
+    base = base_performance / base_nodes
+
+    return [
+        math.nan if p is None or math.isnan(p) else p / n / base
+        for n, p in zip(nodes, performance)
+    ]
+
+
+def _bracket(performance, threshold):
+    """Return the largest node count that is still efficient and the smallest
+    node count that is not. The latter is `None`, if all are efficient."""
+    nodes = sorted(performance)
+    efficiencies = parallel_efficiency(nodes, [performance[n] for n in nodes])
+
+    efficient = nodes[0]
+    for n, efficiency in zip(nodes, efficiencies):
+        if efficiency < threshold:
+            return efficient, n
+        efficient = n
+
+    return efficient, None
+
+
+def efficient_nodes(performance, threshold=EFFICIENCY_THRESHOLD):
+    """Return the largest number of nodes that runs at least with the parallel
+    efficiency `threshold`.
+
+    Parameters
+    ----------
+    performance : dict
+        Performance of the finished benchmarks by their number of nodes.
+    """
+    return _bracket(performance, threshold)[0]
+
+
+def next_nodes(performance, min_nodes, max_nodes, threshold=EFFICIENCY_THRESHOLD):
+    """Return the node counts to benchmark next in an adaptive search.
+
+    Without any results, a geometric subset of the node counts is benchmarked,
+    see `geometric_nodes`. Afterwards, the interval between the largest
+    efficient and the smallest inefficient node count is bisected, until both
+    are adjacent. If all benchmarks are efficient, the largest node count is
+    doubled up to `max_nodes`.
+
+    Parameters
+    ----------
+    performance : dict
+        Performance of the finished benchmarks by their number of nodes.
+
+    Returns
+    -------
+    list
+        Node counts to benchmark next. The search is complete, if it is empty.
+    """
+    if not performance:
+        return geometric_nodes(min_nodes, max_nodes)
+
+    efficient, inefficient = _bracket(performance, threshold)
+    if inefficient is None:
+        if efficient >= max_nodes:
+            return []
+        return [min(2 * efficient, max_nodes)]
+
+    middle = (efficient + inefficient) // 2
+    if middle == efficient:
+        return []
+
+    return [middle]
+
+
+def _design_matrix(model, nodes):
+    nodes = np.asarray(nodes, dtype=float)
+    return np.column_stack([term(nodes) for term in MODELS[model]])
+
+
+def fit_model(nodes, performance, model):
+    """Fit a scaling model to the performance of benchmarks.
+
+    The model is fitted to the time per simulated nanosecond by least squares,
+    with all coefficients constrained to be non-negative, see `MODELS`.
+
+    Parameters
+    ----------
+    nodes : list
+        Number of nodes of each benchmark.
+    performance : list
+        Performance of each benchmark in ns/day. Missing values are ignored.
+    model : str
+        One of the keys of `MODELS`.
+
+    Returns
+    -------
+    numpy.ndarray
+        Coefficients of the model, or `None` if there are fewer benchmarks than
+        coefficients.
+    """
+    nodes = np.asarray(nodes, dtype=float)
+    performance = np.asarray(performance, dtype=float)
+    valid = np.isfinite(performance) & (performance > 0)
+    n_terms = len(MODELS[model])
+    if np.unique(nodes[valid]).size < n_terms:
+        return None
+
+    X = _design_matrix(model, nodes[valid])
+    y = 1 / performance[valid]
+
+    # Solve the non-negative least squares problem by trying all subsets of
+    # terms. Models have few terms, so this is cheap and needs no solver.
+    best, best_residual = None, np.inf
+    for mask in itertools.product([True, False], repeat=n_terms):
+        mask = np.array(mask)
+        if not mask.any():
+            continue
+        solution = np.linalg.lstsq(X[:, mask], y, rcond=None)[0]
+        if (solution < 0).any():
+            continue
+        coefficients = np.zeros(n_terms)
+        coefficients[mask] = solution
+        residual = np.sum((X @ coefficients - y) ** 2)
+        if residual < best_residual:
+            best, best_residual = coefficients, residual
+
+    return best
+
+
+def predict(coefficients, model, nodes):
+    """Return the performance in ns/day predicted by a fitted model."""
+    with np.errstate(divide="ignore"):
+        return 1 / (_design_matrix(model, nodes) @ coefficients)
+
+
+def serial_fraction(coefficients):
+    """Return the share of the run time on a single node that does not get
+    faster with more nodes."""
+    total = coefficients[0] + coefficients[1]
+    if total <= 0:
+        return math.nan
+
+    return coefficients[0] / total
+
+
+def predicted_efficient_nodes(
+    coefficients, model, min_nodes, threshold=EFFICIENCY_THRESHOLD
+):
+    """Return the largest number of nodes with a predicted parallel efficiency
+    of at least `threshold`, relative to `min_nodes`.
+
+    Returns `MAX_PREDICTED_NODES`, if the efficiency does not drop below the
+    threshold before.
+    """
+    nodes = np.arange(min_nodes, MAX_PREDICTED_NODES + 1)
+    performance = predict(coefficients, model, nodes)
+    efficiency = performance / nodes / (performance[0] / min_nodes)
+
+    below = np.flatnonzero(~(efficiency >= threshold))
+    if below.size == 0:
+        return MAX_PREDICTED_NODES
+    if below[0] == 0:
+        return min_nodes
+
+    return int(nodes[below[0] - 1])
@@ -0,0 +1,362 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import getpass
+import itertools
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+
+from mdbenchmark.discover import read_categories
+
+PENDING = "pending"
+RUNNING = "running"
+FINISHED = "finished"
+
+
+def _run(args, cwd=None):
+    """Run a command and return its return code and standard output."""
+    try:
+        result = subprocess.run(
+            args, cwd=cwd, stdout=subprocess.PIPE, universal_newlines=True
+        )
+    except OSError:
+        return None, ""
+
+    return result.returncode, result.stdout
+
+
+class Scheduler:
+    """Interface to a queuing system.
+
+    Subclasses define the commands of the queuing system and how to parse
+    their output.
+    """
+
+    name = NotImplemented
+    submit_command = NotImplemented
+    status_command = NotImplemented
+    cancel_command = NotImplemented
+    job_id_pattern = NotImplemented
+    supports_arrays = False
+
+    @classmethod
+    def is_available(cls):
+        """Return True if the submit command of the queuing system is on the PATH."""
+        return shutil.which(cls.submit_command) is not None
+
+    def parse_job_id(self, output):
+        """Return the job ID from the output of the submit command or `None`."""
+        match = self.job_id_pattern.search(output)
+        if match:
+            return match.group(1)
+
+        return None
+
+    def submit(self, script, cwd):
+        """Submit a job script from inside `cwd`.
+
+        Returns
+        -------
+        tuple
+            Whether the submission succeeded and the job ID. The job ID is `None`
+            if it cannot be found in the output of the submit command.
+        """
+        returncode, output = _run([self.submit_command, script], cwd=cwd)
+        return returncode == 0, self.parse_job_id(output)
+
+    def array_task_id(self, job_id, index):
+        """Return the job ID of the task `index` of a job array."""
+        raise NotImplementedError
+
+    def parse_status(self, output):
+        """Return a dictionary mapping job IDs in the queue to their state."""
+        raise NotImplementedError
+
+    def status(self, job_ids):
+        """Return the state of each job with a single query of the queuing system.
+
+        Jobs that are not in the queue anymore are considered finished.
+
+        Returns
+        -------
+        dict
+            Dictionary mapping each job ID to `PENDING`, `RUNNING` or `FINISHED`.
+            `None` if the queuing system could not be queried.
+        """
+        returncode, output = _run(self.status_command + ["-u", getpass.getuser()])
+        if returncode != 0:
+            return None
+
+        queue = self.parse_status(output)
+        return {job_id: queue.get(job_id, FINISHED) for job_id in job_ids}
+
+    def cancel(self, job_ids):
+        """Cancel all given jobs. Returns True if the command succeeded."""
+        if not job_ids:
+            return True
+
+        returncode, _ = _run([self.cancel_command] + list(job_ids))
+        return returncode == 0
+
+
+class SlurmScheduler(Scheduler):
+    name = "slurm"
+    submit_command = "sbatch"
+    status_command = ["squeue", "--noheader", "--array", "--format=%i %T"]
+    cancel_command = "scancel"
+    job_id_pattern = re.compile(r"Submitted batch job (\d+)")
+    supports_arrays = True
+    pending_states = {"PENDING", "CONFIGURING", "REQUEUED", "RESV_DEL_HOLD"}
+
+    def array_task_id(self, job_id, index):
+        return "{}_{}".format(job_id, index)
+
+    def parse_status(self, output):
+        queue = {}
+        for line in output.splitlines():
+            fields = line.split()
+            if len(fields) < 2:
+                continue
+            job_id, state = fields[:2]
+            queue[job_id] = PENDING if state in self.pending_states else RUNNING
+
+        return queue
+
+
+class SGEScheduler(Scheduler):
+    name = "sge"
+    submit_command = "qsub"
+    status_command = ["qstat"]
+    cancel_command = "qdel"
+    job_id_pattern = re.compile(r"Your job(?:-array)? (\d+)")
+    supports_arrays = True
+
+    def array_task_id(self, job_id, index):
+        # SGE counts array tasks starting from 1
+        return "{}.{}".format(job_id, index + 1)
+
+    @staticmethod
+    def _expand_tasks(tasks):
+        """Expand task ranges like `1-4:1` or `1,3` into single task IDs."""
+        for task in tasks.split(","):
+            match = re.match(r"(\d+)-(\d+)(?::(\d+))?$", task)
+            if match:
+                first, last, step = match.groups()
+                yield from range(int(first), int(last) + 1, int(step or 1))
+            elif task.isdigit():
+                yield int(task)
+
+    def parse_status(self, output):
+        queue = {}
+        # Skip the header and the separator line
+        for line in output.splitlines()[2:]:
+            fields = line.split()
+            if len(fields) < 5:
+                continue
+            job_id, state = fields[0], fields[4]
+            state = PENDING if "q" in state or "h" in state else RUNNING
+            queue[job_id] = state
+
+            # The last column lists the tasks of job arrays
+            if len(fields) > (8 if state == PENDING else 9):
+                for task in self._expand_tasks(fields[-1]):
+                    queue["{}.{}".format(job_id, task)] = state
+
+        return queue
+
+
+class LoadLevelerScheduler(Scheduler):
+    name = "loadleveler"
+    submit_command = "llsubmit"
+    status_command = ["llq"]
+    cancel_command = "llcancel"
+    job_id_pattern = re.compile(r'The job "([^"]+)" has been submitted')
+    pending_states = {"I", "NQ", "H", "S", "HS", "D"}
+    step_pattern = re.compile(r"\S+\.\d+\.\d+$")
+
+    def parse_status(self, output):
+        queue = {}
+        for line in output.splitlines():
+            fields = line.split()
+            # Job steps are listed as `<job ID>.<step>`, followed by the owner,
+            # the submission date and time and the state.
+            if len(fields) < 5 or not self.step_pattern.match(fields[0]):
+                continue
+            job_id = fields[0].rsplit(".", 1)[0]
+            queue[job_id] = PENDING if fields[4] in self.pending_states else RUNNING
+
+        return queue
+
+
+def available_cpus():
+    """Return the IDs of all CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+
+    return list(range(os.cpu_count() or 1))
+
+
+# Pin the process to a set of CPUs and replace it with the job script. This is
+# safer than `preexec_fn`, which may deadlock when used from several threads.
+_PIN_AND_EXEC = "import os, sys; os.sched_setaffinity(0, {cpus}); os.execvp(sys.argv[1], sys.argv[1:])"
+
+
+class LocalScheduler(Scheduler):
+    """Run job scripts directly on this machine.
+
+    `submit` blocks until the job script finished. Each job is pinned to its
+    own set of CPUs, so concurrent jobs never share a CPU. If not enough CPUs
+    are free, `submit` waits until other jobs finished.
+    """
+
+    name = "local"
+    submit_command = "bash"
+
+    def __init__(self, cpus=None):
+        self.cpus = available_cpus() if cpus is None else sorted(cpus)
+        self._free_cpus = list(self.cpus)
+        self._condition = threading.Condition()
+        self._job_ids = itertools.count(1)
+
+    @classmethod
+    def is_available(cls):
+        # Only used when requested explicitly
+        return False
+
+    @staticmethod
+    def cpus_required(categories):
+        """Return the number of CPUs needed to run a benchmark."""
+        if "ranks" not in categories or "threads" not in categories:
+            return None
+
+        return categories["nodes"] * categories["ranks"] * categories["threads"]
+
+    def _reserve(self, count):
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._free_cpus) >= count)
+            cpus = self._free_cpus[:count]
+            del self._free_cpus[:count]
+            return cpus
+
+    def _release(self, cpus):
+        with self._condition:
+            self._free_cpus = sorted(self._free_cpus + cpus)
+            self._condition.notify_all()
+
+    def submit(self, script, cwd):
+        categories = read_categories(cwd)
+        count = self.cpus_required(categories) or len(self.cpus)
+        if count > len(self.cpus):
+            return False, None
+
+        with self._condition:
+            job_id = str(next(self._job_ids))
+        job_name = categories.get("job_name") or categories.get("name", "bench")
+
+        env = dict(os.environ)
+        if "threads" in categories:
+            env["OMP_NUM_THREADS"] = str(categories["threads"])
+
+        cpus = self._reserve(count)
+        args = [self.submit_command, script]
+        if hasattr(os, "sched_setaffinity"):
+            args = [sys.executable, "-c", _PIN_AND_EXEC.format(cpus=cpus)] + args
+
+        try:
+            with open(
+                os.path.join(cwd, "{}.out.{}".format(job_name, job_id)), "w"
+            ) as out, open(
+                os.path.join(cwd, "{}.err.{}".format(job_name, job_id)), "w"
+            ) as err:
+                returncode = subprocess.call(
+                    args, cwd=cwd, env=env, stdout=out, stderr=err
+                )
+        except OSError:
+            returncode = None
+        finally:
+            self._release(cpus)
+
+        return returncode == 0, job_id
+
+    def status(self, job_ids):
+        # Jobs are finished once `submit` returns
+        return {job_id: FINISHED for job_id in job_ids}
+
+    def cancel(self, job_ids):
+        return not job_ids
+
+
+class FakeScheduler(Scheduler):
+    """Queuing system that only keeps track of jobs in memory.
+
+    Used for testing. Submissions for which `fail(script, cwd)` returns True
+    are rejected.
+    """
+
+    name = "fake"
+    submit_command = None
+    supports_arrays = True
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.jobs = {}
+        self.submitted = []
+        self._job_ids = itertools.count(1)
+
+    @classmethod
+    def is_available(cls):
+        return False
+
+    def submit(self, script, cwd):
+        self.submitted.append((script, cwd))
+        if self.fail is not None and self.fail(script, cwd):
+            return False, None
+
+        job_id = str(next(self._job_ids))
+        self.jobs[job_id] = PENDING
+        return True, job_id
+
+    def array_task_id(self, job_id, index):
+        task_id = "{}_{}".format(job_id, index)
+        self.jobs[task_id] = self.jobs[job_id]
+        return task_id
+
+    def status(self, job_ids):
+        return {job_id: self.jobs.get(job_id, FINISHED) for job_id in job_ids}
+
+    def cancel(self, job_ids):
+        for job_id in job_ids:
+            self.jobs.pop(job_id, None)
+        return True
+
+
+SCHEDULERS = [SlurmScheduler, SGEScheduler, LoadLevelerScheduler]
+
+
+def detect_scheduler():
+    """Return the first queuing system that is available on this host or `None`."""
+    for scheduler in SCHEDULERS:
+        if scheduler.is_available():
+            return scheduler()
+
+    return None
@@ -0,0 +1,211 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+"""Fixtures for the benchmarks of MDBenchmark itself.
+
+The benchmarks need the `pytest-benchmark` plugin and are skipped without it.
+Set ``MDBENCHMARK_BENCHMARK_SIZES`` to a comma-separated list of tree sizes,
+e.g., ``100,1000,10000``. Only trees with 100 benchmarks are used by default.
+"""
+import json
+import os
+
+import pytest
+
+from mdbenchmark.mdengines.utils import benchmark_dirname, link_file
+
+SIZES = [
+    int(size)
+    for size in os.getenv("MDBENCHMARK_BENCHMARK_SIZES", "100").split(",")
+    if size
+]
+ENGINES = ["gromacs", "namd"]
+# Number of energy blocks in the synthetic GROMACS logs. Real logs of a 15
+# minute benchmark have a few hundred kB.
+GROMACS_ENERGY_BLOCKS = 400
+NAMD_TIMESTEPS = 400
+
+GROMACS_HEADER = """\
+Log file opened on Mon Dec 11 09:14:55 2017
+Host: dra0479  pid: 13403  rank ID: 0  number of ranks:  {ranks}
+                      :-) GROMACS - gmx mdrun, 2018.3 (-:
+
+GROMACS:      gmx mdrun, version 2018.3
+Executable:   /mpcdf/soft/SLES122/HSW/gromacs/2018.3/bin/gmx_mpi
+Command line:
+  gmx_mpi mdrun -v -ntomp 2 -maxh 0.25 -resethway -deffnm protein -noconfout
+
+GROMACS version:    2018.3
+Precision:          single
+MPI library:        MPI
+OpenMP support:     enabled (GMX_OPENMP_MAX_THREADS = 64)
+SIMD instructions:  AVX2_256
+
+Running on {nodes} nodes with total {cores} cores, {logical} logical cores
+Hardware detected on host dra0479 (the node of MPI rank 0):
+  CPU info:
+    Vendor: Intel
+    Brand:  Intel(R) Xeon(R) CPU E5-2698 v3 @ 2.30GHz
+
+Input Parameters:
+   integrator                     = md
+   nsteps                         = 500000
+   nstlog                         = 1000
+"""
+
+GROMACS_ENERGIES = """\
+           Step           Time
+         {step:6d}     {time:10.5f}
+
+   Energies (kJ/mol)
+          Angle    Proper Dih.  Ryckaert-Bell.          LJ-14     Coulomb-14
+    9.74139e+03    4.34956e+02    2.38170e+03    3.32985e+03    2.50236e+04
+        LJ (SR)  Disper. corr.   Coulomb (SR)   Coul. recip.      Potential
+    1.31446e+05   -5.25232e+03   -1.52290e+06    6.58467e+03   -1.34941e+06
+    Kinetic En.   Total Energy  Conserved En.    Temperature Pres. DC (bar)
+    2.52843e+05   -1.09657e+06   -1.09624e+06    3.00298e+02   -2.15625e+02
+ Pressure (bar)   Constr. rmsd
+   -1.22478e+01    2.67891e-06
+
+"""
+
+GROMACS_FOOTER = """\
+ Computing:          Num   Num      Call    Wall time         Giga-Cycles
+                     Ranks Threads  Count      (s)         total sum    %
+-----------------------------------------------------------------------------
+ Domain decomp.        {ranks:3d}    2        500       1.891        543.202   1.8
+ Force                 {ranks:3d}    2      50001      53.174      15273.442  52.1
+ PME mesh              {ranks:3d}    2      50001      21.320       6123.938  20.9
+-----------------------------------------------------------------------------
+ Total                                            102.061      29315.778 100.0
+
+               Core t (s)   Wall t (s)        (%)
+       Time:    {core_time:9.3f}      891.050     6400.0
+                 (ns/day)    (hour/ns)
+Performance:      {performance:7.3f}        0.245
+Finished mdrun on rank 0 Mon Dec 11 09:29:46 2017
+"""
+
+NAMD_HEADER = """\
+Charm++> Running on {nodes} unique compute nodes ({cores}-way SMP).
+Info: NAMD 2.12 for Linux-x86_64-ibverbs-smp
+Info: Running on {cores} processors, {nodes} nodes, {nodes} physical nodes.
+Info: Benchmark time: {cores} CPUs 0.0154 s/step {days_per_ns:.5f} days/ns 2727.91 MB memory
+"""
+
+NAMD_TIMESTEP = (
+    "ENERGY: {step:7d}   7433.0135   9563.9221   5393.0478    238.1064"
+    "        -2036373.1208    165813.3049         0.0000         0.0000"
+    "    394049.9098       -1467643.8066       300.1345  -1466817.6781\n"
+)
+
+NAMD_FOOTER = """\
+WallClock: 569.593445  CPUTime: 569.593445  Memory: 2727.914062 MB
+"""
+
+
+def gromacs_log(nodes, ranks, threads):
+    cores = nodes * ranks * threads
+    text = GROMACS_HEADER.format(
+        nodes=nodes, ranks=ranks, cores=cores, logical=2 * cores
+    )
+    text += "Started mdrun on rank 0 Mon Dec 11 09:14:55 2017\n"
+    text += "".join(
+        GROMACS_ENERGIES.format(step=i * 1000, time=i * 2.0)
+        for i in range(GROMACS_ENERGY_BLOCKS)
+    )
+    text += GROMACS_FOOTER.format(
+        ranks=nodes * ranks, core_time=891.05 * cores, performance=10.0 * nodes
+    )
+    return text
+
+
+def namd_log(nodes, ranks, threads):
+    cores = nodes * ranks * threads
+    text = NAMD_HEADER.format(nodes=nodes, cores=cores, days_per_ns=1.0 / nodes)
+    text += "".join(NAMD_TIMESTEP.format(step=i * 100) for i in range(NAMD_TIMESTEPS))
+    text += NAMD_FOOTER
+    return text
+
+
+def synthesize_tree(directory, engine, size):
+    """Write a tree of `size` finished benchmarks of `engine` below `directory`.
+
+    Each module is benchmarked on up to 100 nodes. All benchmarks on the same
+    number of nodes share their log file via hard links to save disk space.
+    """
+    logs = os.path.join(directory, ".logs")
+    os.makedirs(logs)
+
+    for i in range(size):
+        module = "{}/2018.{}".format(engine, i // 100)
+        nodes = i % 100 + 1
+        categories = {
+            "module": module,
+            "gpu": False,
+            "nodes": nodes,
+            "host": "draco",
+            "time": 15,
+            "name": "protein",
+            "started": True,
+            "ranks": 16,
+            "threads": 2,
+            "hyperthreading": False,
+            "version": 3,
+            "multidir": 1,
+            "job_name": "protein",
+        }
+        path = os.path.join(
+            directory,
+            "draco_{}".format(module.replace("/", "_")),
+            benchmark_dirname(nodes, 16, 2, False, 1),
+        )
+        os.makedirs(os.path.join(path, ".datreant"))
+        with open(os.path.join(path, ".datreant", "categories.json"), "w") as fh:
+            json.dump(categories, fh)
+
+        log = os.path.join(logs, "{}_{}".format(engine, nodes))
+        if not os.path.exists(log):
+            with open(log, "w") as fh:
+                fh.write(
+                    gromacs_log(nodes, 16, 2)
+                    if engine == "gromacs"
+                    else namd_log(nodes, 16, 2)
+                )
+        filename = "protein.log" if engine == "gromacs" else "protein.out.1234"
+        link_file(log, os.path.join(path, filename), "hard")
+
+    return directory
+
+
+@pytest.fixture(scope="session")
+def trees(tmp_path_factory):
+    """Return a function that returns the path to a synthesized tree.
+
+    Trees are only written once per session.
+    """
+    cache = {}
+
+    def get_tree(engine, size):
+        if (engine, size) not in cache:
+            directory = str(tmp_path_factory.mktemp("{}_{}".format(engine, size)))
+            cache[engine, size] = synthesize_tree(directory, engine, size)
+        return cache[engine, size]
+
+    return get_tree
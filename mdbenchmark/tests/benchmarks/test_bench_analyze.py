@@ -0,0 +1,80 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import pytest
+
+from mdbenchmark.cache import ResultsCache
+from mdbenchmark.discover import discover
+from mdbenchmark.tests.benchmarks.conftest import ENGINES, SIZES
+from mdbenchmark.utils import consolidate_dataframe, parse_bundle
+from mdbenchmark.versions import Version3Categories
+
+pytest.importorskip("pytest_benchmark")
+
+VERSION = Version3Categories()
+
+
+def analyze(bundle, jobs=1, cache=None):
+    return parse_bundle(
+        bundle,
+        columns=VERSION.analyze_categories,
+        sort_values_by=VERSION.analyze_sort,
+        jobs=jobs,
+        cache=cache,
+    )
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_discover(benchmark, trees, size):
+    directory = trees("gromacs", size)
+    bundle = benchmark(discover, directory)
+    assert len(bundle) == size
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("size", SIZES)
+def test_parse_bundle(benchmark, trees, size, engine, jobs):
+    bundle = discover(trees(engine, size))
+    df = benchmark(analyze, bundle, jobs=jobs)
+    assert len(df) == size
+    assert not df["performance"].isnull().any()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("size", SIZES)
+def test_parse_bundle_cached(benchmark, trees, size, engine):
+    """Analyze a tree whose log files are all in the results cache."""
+    directory = trees(engine, size)
+    bundle = discover(directory)
+    cache = ResultsCache(directory, rebuild=True)
+    analyze(bundle, cache=cache)
+    cache.save()
+
+    df = benchmark(lambda: analyze(bundle, cache=ResultsCache(directory)))
+    assert len(df) == size
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_consolidate_dataframe(benchmark, trees, size):
+    df = analyze(discover(trees("gromacs", size)))
+    consolidated = benchmark(
+        consolidate_dataframe, df, columns=VERSION.consolidate_categories
+    )
+    assert len(consolidated) == -(-size // 100)
@@ -0,0 +1,87 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+
+import pytest
+
+from mdbenchmark.mdengines.utils import write_benchmark
+from mdbenchmark.models import Processor
+from mdbenchmark.tests.benchmarks.conftest import SIZES
+from mdbenchmark.utils import construct_generate_data, retrieve_host_template
+from mdbenchmark.versions import Version3Categories
+
+pytest.importorskip("pytest_benchmark")
+
+VERSION = Version3Categories()
+RANKS = (4, 8, 16, 32)
+
+
+def construct(size):
+    """Return the data of `size` benchmarks, 100 nodes per module."""
+    modules = ["gromacs/2018.{}".format(i) for i in range(-(-size // 100))]
+    return construct_generate_data(
+        name="protein",
+        job_name=None,
+        modules=modules,
+        host="draco",
+        template=retrieve_host_template("draco"),
+        cpu=True,
+        gpu=False,
+        time=15,
+        min_nodes=1,
+        max_nodes=25,
+        processor=Processor(physical_cores=32, logical_cores=64),
+        number_of_ranks=RANKS,
+        enable_hyperthreading=False,
+        multidir=(1,),
+    )
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_construct_generate_data(benchmark, tmpdir, size):
+    with tmpdir.as_cwd():
+        data = benchmark(construct, size)
+    assert len(data) == -(-size // 100) * 100
+
+
+def write_all(data):
+    columns = list(VERSION.generate_mapping)
+    for row in data:
+        row = dict(zip(VERSION.generate_categories, row))
+        kwargs = {VERSION.generate_mapping[key]: row[key] for key in columns}
+        write_benchmark(name="protein", relative_path="..", link="hard", **kwargs)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_write_benchmark(benchmark, tmpdir, size):
+    """Write all benchmarks of a sweep into a fresh directory."""
+    open(str(tmpdir.join("protein.tpr")), "a").close()
+    rounds = iter(range(1000))
+
+    def setup():
+        directory = tmpdir.mkdir("round{}".format(next(rounds)))
+        os.chdir(str(directory))
+        return (construct(size),), {}
+
+    cwd = os.getcwd()
+    try:
+        benchmark.pedantic(write_all, setup=setup, rounds=3)
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,59 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import pytest
+
+from mdbenchmark.cli.plot import do_plot
+from mdbenchmark.discover import discover
+from mdbenchmark.tests.benchmarks.conftest import SIZES
+from mdbenchmark.utils import parse_bundle
+from mdbenchmark.versions import Version3Categories
+
+pytest.importorskip("pytest_benchmark")
+
+VERSION = Version3Categories()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_do_plot(benchmark, trees, tmpdir, size):
+    df = parse_bundle(
+        discover(trees("gromacs", size)),
+        columns=VERSION.analyze_categories,
+        sort_values_by=VERSION.analyze_sort,
+    )
+    csv = str(tmpdir.join("results.csv"))
+    df.drop(columns=["version"]).to_csv(csv, index=False)
+
+    benchmark(
+        do_plot,
+        csv=(csv,),
+        output_name=str(tmpdir.join("results")),
+        output_format="png",
+        template=(),
+        module=(),
+        gpu=True,
+        cpu=True,
+        plot_cores=False,
+        fit=False,
+        font_size=16,
+        dpi=100,
+        xtick_step=None,
+        watermark=True,
+    )
+    assert tmpdir.join("results.png").check()
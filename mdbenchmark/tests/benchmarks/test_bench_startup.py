@@ -0,0 +1,47 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["mdbenchmark.cli", "mdbenchmark.cli.analyze", "mdbenchmark.cli.generate"],
+)
+def test_import(benchmark, module):
+    """Time the import of the CLI and of the subcommands in a fresh interpreter."""
+    benchmark.pedantic(
+        subprocess.check_call,
+        args=([sys.executable, "-c", "import {}".format(module)],),
+        rounds=5,
+    )
+
+
+def test_help(benchmark):
+    benchmark.pedantic(
+        subprocess.check_call,
+        args=([sys.executable, "-m", "mdbenchmark", "--help"],),
+        kwargs={"stdout": subprocess.DEVNULL},
+        rounds=5,
+    )
@@ -17,11 +17,13 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import shutil
 from os.path import exists, isfile, join as pjoin
 
 import pytest
 
 from mdbenchmark.ext.click_test import cli_runner  # noqa: F401
+from mdbenchmark.mdengines import lmod
 
 
 class TestDataDir(object):
@@ -49,6 +51,18 @@ class TestDataDir(object):
             )
 
 
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path_factory, monkeypatch):
+    """Keep the tests independent of any caches in the home directory."""
+    directory = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(directory))
+    monkeypatch.setattr(lmod, "USER_LMODRC", [])
+    monkeypatch.setattr(lmod, "USER_CACHE_DIRS", [])
+    for variable in ["LMOD_RC", "LMOD_PKG", "LMOD_CONFIG_DIR"]:
+        monkeypatch.delenv(variable, raising=False)
+    return directory
+
+
 @pytest.fixture
 def datafiles(request):
     """access test directory in a pytest. This works independent of where tests are
@@ -57,7 +71,13 @@ def datafiles(request):
 
 
 @pytest.fixture
-def data(request):
+def data(request, tmp_path_factory):
     """access test directory in a pytest. This works independent of where tests are
-    started"""
-    return TestDataDir(request.fspath.dirname, "data")
+    started
+
+    The directory is a copy of the test data, so that files written by the
+    tests, e.g., the results cache of analyze, do not end up in the source tree.
+    """
+    folder = tmp_path_factory.mktemp("data")
+    shutil.copytree(pjoin(request.fspath.dirname, "data"), str(folder / "data"))
+    return TestDataDir(str(folder), "data")
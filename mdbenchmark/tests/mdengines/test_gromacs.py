@@ -17,6 +17,7 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
 from io import StringIO
 
 import datreant as dtr
@@ -58,6 +59,226 @@ def test_parse_empty_log(empty_log, parse):
     assert np.isnan(parse(gromacs, empty_log))
 
 
+def test_parse_log(tmpdir):
+    """Test that the footer is found backwards from the end of the file."""
+    log = tmpdir.join("md.log")
+    log.write(
+        "Running on 2 nodes with total 64 cores, 128 logical cores\n"
+        "Started mdrun on rank 0\n"
+        + "Step Time\n" * 10000
+        + "Performance:           123.45           0.123\n"
+        "Finished mdrun on rank 0\n"
+    )
+    metrics = utils.parse_log(gromacs, str(log))
+    assert metrics["ncores"] == 64
+    assert metrics["performance"] == 123.45
+    assert metrics["timings"] == {}
+    assert np.isnan(metrics["npme"])
+
+
+@pytest.mark.parametrize(
+    "content, ncores, performance",
+    [
+        ("not the log you are looking for\n", np.nan, np.nan),
+        (
+            "Running on 5 nodes with total 160 cores, 320 logical cores\n"
+            "Started mdrun on rank 0\n",
+            160,
+            np.nan,
+        ),
+        ("Performance:      254.266        0.094\n", np.nan, 254.266),
+    ],
+)
+def test_parse_log_incomplete(tmpdir, content, ncores, performance):
+    log = tmpdir.join("md.log")
+    log.write(content)
+    metrics = utils.parse_log(gromacs, str(log))
+    np.testing.assert_equal(metrics["ncores"], ncores)
+    np.testing.assert_equal(metrics["performance"], performance)
+
+
+CYCLE_ACCOUNTING = """\
+     R E A L   C Y C L E   A N D   T I M E   A C C O U N T I N G
+
+On 4 MPI ranks, each using 8 OpenMP threads
+
+ Computing:          Num   Num      Call    Wall time         Giga-Cycles
+                     Ranks Threads  Count      (s)         total sum    %
+-----------------------------------------------------------------------------
+ Domain decomp.         4    8        250       2.067        218.348   4.4
+ Neighbor search        4    8        251       1.125        118.832   2.4
+ Comm. coord.           4    8       9750       3.412        360.413   7.3
+ Force                  4    8      10001      25.398       2682.803  54.2
+ PME mesh               4    8      10001       9.985       1054.699  21.3
+ NB X/F buffer ops.     4    8      19751       0.561         59.259   1.2
+ Comm. energies         4    8        501       0.733         77.426   1.6
+ Rest                                           3.581        378.264   7.6
+-----------------------------------------------------------------------------
+ Total                                         46.862       4950.044 100.0
+-----------------------------------------------------------------------------
+ Breakdown of PME mesh computation
+-----------------------------------------------------------------------------
+ PME 3D-FFT             4    8      20002       3.236        341.818   6.9
+-----------------------------------------------------------------------------
+
+               Core t (s)   Wall t (s)        (%)
+       Time:     1499.584       46.862     3200.0
+                 (ns/day)    (hour/ns)
+Performance:       36.872        0.651
+Finished mdrun on rank 0
+"""
+
+TIMINGS = {
+    "timing_domain_decomp": 4.4,
+    "timing_neighbor_search": 2.4,
+    "timing_comm_coord": 7.3,
+    "timing_force": 54.2,
+    "timing_pme_mesh": 21.3,
+    "timing_nb_x_f_buffer_ops": 1.2,
+    "timing_comm_energies": 1.6,
+    "timing_rest": 7.6,
+}
+
+
+def test_parse_cycle_accounting():
+    """Test that only the rows of the main table are parsed."""
+    lines = CYCLE_ACCOUNTING.splitlines()
+    assert utils.parse_cycle_accounting(lines) == TIMINGS
+    assert utils.parse_cycle_accounting(lines[:1]) == {}
+
+
+def test_parse_log_timings(tmpdir):
+    """Test that the cycle accounting table is parsed from the end of the file."""
+    log = tmpdir.join("md.log")
+    log.write(
+        "Running on 1 node with total 32 cores, 32 logical cores\n"
+        "Started mdrun on rank 0\n" + "Step Time\n" * 10000 + CYCLE_ACCOUNTING
+    )
+    metrics = utils.parse_log(gromacs, str(log))
+    assert metrics["performance"] == 36.872
+    assert metrics["timings"] == TIMINGS
+
+
+def test_parse_log_timings_too_far(tmpdir, monkeypatch):
+    """Test that we stop searching for tables after `SUMMARY_LINES`."""
+    monkeypatch.setattr(utils, "SUMMARY_LINES", 10)
+    log = tmpdir.join("md.log")
+    log.write(CYCLE_ACCOUNTING)
+    metrics = utils.parse_log(gromacs, str(log))
+    assert metrics["performance"] == 36.872
+    assert metrics["timings"] == {}
+
+
+LOAD_BALANCING = """\
+ M E G A - F L O P S   A C C O U N T I N G
+
+ NB=Group-cutoff nonbonded kernels    NxN=N-by-N cluster Verlet kernels
+ Total                                 3210271.474    23114.0   100.0
+-----------------------------------------------------------------------------
+
+
+     D O M A I N   D E C O M P O S I T I O N   S T A T I S T I C S
+
+ av. #atoms communicated per step for force:  2 x 123456.0
+
+
+ Dynamic load balancing report:
+ DLB was turned on during the run due to measured imbalance.
+ Average load imbalance: 12.3%.
+ The balanceable part of the MD step is 78%, load imbalance is computed from this.
+ Part of the total run time spent waiting due to load imbalance: 9.6%.
+ Average PME mesh/force load: 1.420
+ Part of the total run time spent waiting due to PP/PME imbalance: 8.1 %
+
+NOTE: 9.6 % of the available CPU time was lost due to load imbalance
+      in the domain decomposition.
+NOTE: 8.1 % performance was lost because the PME ranks
+      had more work to do than the PP ranks.
+
+"""
+
+
+def test_parse_log_load_balancing(tmpdir):
+    """Test that the load balancing report and notes are parsed."""
+    log = tmpdir.join("md.log")
+    log.write(
+        "Running on 1 node with total 32 cores, 32 logical cores\n"
+        "Using 4 separate PME ranks, as guessed by mdrun\n"
+        "Started mdrun on rank 0\n"
+        "NOTE: This note was printed during the run.\n"
+        "Average load imbalance: 99.9%.\n"
+        + "Step Time\n" * 100
+        + LOAD_BALANCING
+        + CYCLE_ACCOUNTING
+    )
+    metrics = utils.parse_log(gromacs, str(log))
+    assert metrics["npme"] == 4
+    assert metrics["load_imbalance"] == 12.3
+    assert metrics["imbalance_wait"] == 9.6
+    assert metrics["pme_load"] == 1.42
+    assert metrics["pme_wait"] == 8.1
+    assert metrics["timings"] == TIMINGS
+    assert metrics["notes"] == {
+        "notes": "9.6 % of the available CPU time was lost due to load imbalance "
+        "in the domain decomposition.\n"
+        "8.1 % performance was lost because the PME ranks had more work to do "
+        "than the PP ranks."
+    }
+
+
+def test_parse_log_without_load_balancing(tmpdir):
+    """Test that the summary metrics are optional."""
+    log = tmpdir.join("md.log")
+    log.write("Started mdrun on rank 0\n" + CYCLE_ACCOUNTING)
+    metrics = utils.parse_log(gromacs, str(log))
+    assert metrics["performance"] == 36.872
+    for key in ["npme", "load_imbalance", "imbalance_wait", "pme_load", "pme_wait"]:
+        assert np.isnan(metrics[key])
+    assert metrics["notes"] == {}
+
+
+@pytest.mark.parametrize(
+    "pme_load, npme, nranks, suggestion",
+    [
+        (1.42, 4, 16, 5),
+        (0.5, 4, 16, 2),
+        (1.05, 4, 16, 4),
+        (100, 1, 2, 1),
+        (0.01, 3, 4, 1),
+        (np.nan, np.nan, 16, np.nan),
+        (1.42, 4, np.nan, np.nan),
+        (1.42, 0, 16, np.nan),
+    ],
+)
+def test_suggest_npme(pme_load, npme, nranks, suggestion):
+    np.testing.assert_equal(gromacs.suggest_npme(pme_load, npme, nranks), suggestion)
+
+
+@pytest.mark.parametrize(
+    "options, formatted",
+    [
+        ([("npme", "2")], "-npme 2"),
+        ([("npme", "2"), ("nb", "gpu")], "-npme 2 -nb gpu"),
+        ([("tunepme", "yes"), ("dlb", "no")], "-tunepme -nodlb"),
+        ([("tunepme", "Off")], "-notunepme"),
+    ],
+)
+def test_format_mdrun_options(options, formatted):
+    assert gromacs.format_mdrun_options(options) == formatted
+
+
+@pytest.mark.parametrize("blocksize", (1, 7, 8192))
+def test_read_lines_backward(tmpdir, blocksize):
+    log = tmpdir.join("md.log")
+    log.write("first\nsecond\nthird\n")
+    with open(str(log), "rb") as fh:
+        lines = list(utils._read_lines_backward(fh, blocksize=blocksize))
+        assert lines == ["", "third", "second", "first"]
+
+        lines = list(utils._read_lines_backward(fh, stop=6, blocksize=blocksize))
+        assert lines == ["", "third", "second"]
+
+
 @pytest.fixture
 def sim(tmpdir_factory):
     folder = tmpdir_factory.mktemp("simulation")
@@ -103,6 +324,60 @@ def test_analyze_benchmark_backward_compatibility(sim_old):
     assert np.isnan(res[6])  # ncores
 
 
+@pytest.mark.parametrize(
+    "categories, output_files",
+    [
+        ({}, []),
+        ({"name": "md"}, ["sim/md.log"]),
+        ({"name": "md", "multidir": 1}, ["sim/md.log"]),
+        (
+            {"name": "md", "multidir": 3},
+            ["sim/a/md.log", "sim/b/md.log", "sim/c/md.log"],
+        ),
+    ],
+)
+def test_get_output_files(categories, output_files):
+    assert gromacs.get_output_files("sim", categories) == output_files
+
+
+def test_analyze_benchmark_output_files(sim):
+    """Test that only the log file written by GROMACS is parsed."""
+    sim.categories["name"] = "md"
+    log = "Running on 1 node with total {} cores\nPerformance: {} 0.123\n"
+    with open(sim["md.log"].abspath, "w") as fh:
+        fh.write(log.format(32, 100))
+    with open(sim["md.xtc.log"].abspath, "w") as fh:
+        fh.write(log.format(64, 50))
+
+    res = utils.analyze_benchmark(gromacs, sim)
+    assert res[2] == 100  # ns_day
+    assert res[6] == 32  # ncores
+
+    # Fall back to searching the benchmark directory
+    sim.categories["name"] = "bench"
+    res = utils.analyze_benchmark(gromacs, sim)
+    assert res[2] == 150  # ns_day
+
+
+def test_analyze_benchmark_details(sim):
+    """Test that the timings of all simulations of a benchmark are averaged."""
+    sim.categories["name"] = "md"
+    sim.categories["multidir"] = 2
+    for subdir, pme in [("a", "21.3"), ("b", "31.3")]:
+        with open(sim[subdir + "/md.log"].make().abspath, "w") as fh:
+            fh.write(CYCLE_ACCOUNTING.replace("21.3", pme))
+
+    res, timings = utils.analyze_benchmark(gromacs, sim, details=True)
+    assert res[2] == 2 * 36.872  # ns_day
+    assert timings["timing_pme_mesh"] == pytest.approx(26.3)
+    assert timings["timing_force"] == pytest.approx(54.2)
+
+    # No log files, no timings
+    for subdir in "ab":
+        os.remove(sim[subdir + "/md.log"].abspath)
+    assert utils.analyze_benchmark(gromacs, sim, details=True)[1] == {}
+
+
 @pytest.mark.parametrize("input_name", ["md", "md.tpr"])
 @pytest.mark.skip()
 def test_check_file_extension(capsys, input_name, tmpdir):
@@ -121,3 +396,86 @@ def test_check_file_extension(capsys, input_name, tmpdir):
             fh.write("dummy file")
 
         assert gromacs.check_input_file_exists(input_name)
+
+
+def throughput_log(rates, finish_delay=1):
+    """Return a GROMACS log with a checkpoint every minute.
+
+    The simulation advances by `rates[i]` steps per second during minute `i`.
+    """
+    lines = [
+        "Input Parameters:\n",
+        "   dt                             = 0.002\n",
+        "   init-step                      = 0\n",
+        "Started mdrun on rank 0 Mon Dec 11 09:00:00 2017\n",
+    ]
+    step = 0
+    for minute, rate in enumerate(rates, 1):
+        step += rate * 60
+        lines += [
+            "           Step           Time\n",
+            "         {:6d}     {:10.5f}\n".format(step, step * 0.002),
+            "Writing checkpoint, step {} at Mon Dec 11 09:{:02d}:00 2017\n".format(
+                step, minute
+            ),
+        ]
+    lines.append(
+        "Finished mdrun on rank 0 Mon Dec 11 09:{:02d}:{:02d} 2017\n".format(
+            len(rates), finish_delay
+        )
+    )
+    return "".join(lines)
+
+
+def test_parse_throughput(tmpdir):
+    """Test that the performance between checkpoints is reconstructed."""
+    log = tmpdir.join("md.log")
+    log.write(throughput_log([1000, 500, 1000]))
+
+    throughput = utils.parse_throughput(str(log))
+
+    # 1000 steps per second with a time step of 2 fs are 172.8 ns/day
+    np.testing.assert_allclose(throughput, [[1, 172.8], [2, 86.4], [3, 172.8]])
+
+
+def test_parse_throughput_finish(tmpdir):
+    """Test that the finish is used if it is later than the last checkpoint."""
+    log = tmpdir.join("md.log")
+    log.write(
+        throughput_log([1000]) + "           Step           Time\n"
+        "          90000      180.00000\n"
+        "Finished mdrun on rank 0 Mon Dec 11 09:01:30 2017\n"
+    )
+
+    throughput = utils.parse_throughput(str(log))
+
+    np.testing.assert_allclose(throughput, [[1, 172.8], [1.5, 172.8]])
+
+
+def test_parse_throughput_running(tmpdir):
+    """Test that the checkpoints of runs that did not finish yet are used."""
+    log = tmpdir.join("md.log")
+    content = throughput_log([1000, 500])
+    log.write(content[: content.index("Finished")])
+
+    throughput = utils.parse_throughput(str(log))
+
+    np.testing.assert_allclose(throughput, [[1, 172.8], [2, 86.4]])
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "",
+        "Started mdrun on rank 0\nFinished mdrun on rank 0\n",
+        # The time step is missing
+        throughput_log([1000, 1000]).replace("   dt ", "   xx "),
+        # Unreadable dates are skipped
+        "   dt = 0.002\nStarted mdrun on rank 0 Mon Dec 11 09:00:00 2017\n"
+        "Writing checkpoint, step 60000 at yesterday\n",
+    ],
+)
+def test_parse_throughput_incomplete(tmpdir, content):
+    log = tmpdir.join("md.log")
+    log.write(content)
+    assert utils.parse_throughput(str(log)).shape == (0, 2)
@@ -0,0 +1,200 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+
+import pytest
+
+from mdbenchmark.mdengines import get_available_modules, lmod, modulecache
+
+ENGINES = ["gromacs", "namd"]
+
+SPIDER_T = """\
+timestampFn = {
+  false,
+}
+spiderT = {
+  ["/apps/modulefiles/Core"] = {
+    gromacs = {
+      defaultA = {
+        {
+          barefn = "2018.1",
+          fullName = "gromacs/2018.1",
+        },
+      },
+      fileT = {
+        ["gromacs/2016.4"] = {
+          Version = "2016.4",
+          canonical = "2016.4",
+          fn = "/apps/modulefiles/Core/gromacs/2016.4.lua",
+        },
+        ["gromacs/2018.1"] = {
+          Version = "2018.1",
+          canonical = "2018.1",
+          fn = [[/apps/modulefiles/Core/gromacs/2018.1.lua]],
+        },
+      },
+    },
+    -- NAMD is only available as a single version
+    namd = {
+      fileT = {
+        ['namd/2.12'] = {
+          Version = "2.12",
+          pV = "000000002.000000012.*zfinal",
+        },
+      },
+    },
+    vmd = {
+      fileT = {
+        ["vmd/1.9.3"] = {},
+      },
+    },
+  },
+}
+mpathMapT = {}
+"""
+
+MODULE_T = {
+    "/apps/modulefiles": {
+        "/apps/modulefiles/gromacs/2019.lua": {"fullName": "gromacs/2019"},
+        "/apps/modulefiles/namd/2.13.lua": {"fullName": "namd/2.13"},
+    }
+}
+
+
+def test_parse_lua():
+    """Test that we can parse the subset of Lua used by spider caches."""
+    text = """
+    -- A comment
+    --[==[ A long
+    comment ]==]
+    local a = 1
+    b = { 1, -2.5, 0x10, 1e3, "x", true, nil; c = 'it\\'s', ["d e"] = { } }
+    c = [[long
+    string]]
+    """
+    assert lmod.parse_lua(text) == {
+        "a": 1,
+        "b": {
+            1: 1,
+            2: -2.5,
+            3: 16,
+            4: 1000,
+            5: "x",
+            6: True,
+            7: None,
+            "c": "it's",
+            "d e": {},
+        },
+        "c": "long\n    string",
+    }
+
+
+@pytest.mark.parametrize(
+    "text", ["a = ", "a = {", "a = { 1 2 }", "a = b", "{ 1 }", "a = $"]
+)
+def test_parse_lua_errors(text):
+    """Test that malformed files raise a ValueError."""
+    with pytest.raises(ValueError):
+        lmod.parse_lua(text)
+
+
+def test_spider_cache_dirs(monkeypatch, tmpdir):
+    """Test that we find the cache directories from lmodrc.lua."""
+    lmodrc = tmpdir.join("lmodrc.lua")
+    lmodrc.write(
+        'scDescriptT = {\n  {\n    ["dir"] = "/apps/lmod/cache",\n'
+        '    ["timestamp"] = "/apps/lmod/cache/timestamp",\n  },\n}\n'
+    )
+    monkeypatch.setenv("LMOD_RC", str(lmodrc))
+    monkeypatch.setenv("HOME", str(tmpdir))
+    monkeypatch.setattr(lmod, "USER_CACHE_DIRS", [".cache/lmod"])
+
+    assert lmod.spider_cache_dirs() == [
+        "/apps/lmod/cache",
+        os.path.join(str(tmpdir), ".cache/lmod"),
+    ]
+
+    # Broken files are ignored
+    lmodrc.write("scDescriptT = {")
+    assert lmod.spider_cache_dirs() == [os.path.join(str(tmpdir), ".cache/lmod")]
+
+
+def test_read_spider_cache(monkeypatch, tmpdir):
+    """Test that we read module versions from spiderT.lua and moduleT.json."""
+    monkeypatch.setattr(lmod, "spider_cache_dirs", lambda: [str(tmpdir)])
+    assert lmod.read_spider_cache(ENGINES) is None
+
+    tmpdir.join("moduleT.json").write(json.dumps(MODULE_T))
+    assert lmod.read_spider_cache(ENGINES) == {
+        "gromacs": ["2019"],
+        "namd": ["2.13"],
+    }
+
+    # Prefer the newest cache file
+    tmpdir.join("spiderT.lua").write(SPIDER_T)
+    os.utime(str(tmpdir.join("moduleT.json")), (0, 0))
+    assert lmod.read_spider_cache(ENGINES) == {
+        "gromacs": ["2016.4", "2018.1"],
+        "namd": ["2.12"],
+    }
+
+    # Broken cache files are skipped
+    tmpdir.join("spiderT.lua").write("spiderT = {")
+    assert lmod.read_spider_cache(ENGINES)["gromacs"] == ["2019"]
+
+
+def test_get_available_modules_lmod(monkeypatch, tmpdir):
+    """Test that the spider cache is preferred over scanning MODULEPATH."""
+    monkeypatch.setenv("MODULEPATH", str(tmpdir.mkdir("modules")))
+    tmpdir.mkdir("modules", "gromacs").join("5.1").write("")
+
+    cache = tmpdir.mkdir("cache")
+    cache.join("spiderT.lua").write(SPIDER_T)
+    monkeypatch.setattr(lmod, "spider_cache_dirs", lambda: [str(cache)])
+
+    assert get_available_modules()["gromacs"] == ["2016.4", "2018.1"]
+    assert get_available_modules(refresh=True)["gromacs"] == ["5.1"]
+
+
+def test_cached_spider_cache(monkeypatch, tmpdir):
+    """Test that the spider cache is only parsed again once it changes."""
+    monkeypatch.setattr(lmod, "spider_cache_dirs", lambda: [str(tmpdir)])
+    spider = tmpdir.join("spiderT.lua")
+    spider.write(SPIDER_T)
+
+    calls = []
+    read = lmod.read_spider_cache
+
+    def counting_read(engines):
+        calls.append(engines)
+        return read(engines)
+
+    monkeypatch.setattr(lmod, "read_spider_cache", counting_read)
+
+    modules = modulecache.cached_spider_cache(ENGINES)
+    assert modules["gromacs"] == ["2016.4", "2018.1"]
+    assert modulecache.cached_spider_cache(ENGINES) == modules
+    assert len(calls) == 1
+
+    spider.write(SPIDER_T.replace("2016.4", "2020"))
+    os.utime(str(spider), ns=(0, 0))
+    assert modulecache.cached_spider_cache(ENGINES)["gromacs"] == ["2018.1", "2020"]
+    assert len(calls) == 2
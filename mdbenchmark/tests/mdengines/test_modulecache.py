@@ -0,0 +1,167 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+
+from mdbenchmark.mdengines import get_available_modules, modulecache
+
+ENGINES = ["gromacs", "namd"]
+
+
+def make_modules(root):
+    """Create a small module tree below `root` and return its MODULEPATH."""
+    structure = {
+        "applications": {"gromacs": ["2016.4", "2018.1", ".hidden"], "namd": ["123"]},
+        "visualization": {"vmd": ["1.9.3"]},
+    }
+    for k, v in structure.items():
+        for k2, v2 in v.items():
+            os.makedirs(os.path.join(str(root), k, k2))
+            for v3 in v2:
+                open(os.path.join(str(root), k, k2, v3), "a").close()
+
+    return ":".join(os.path.join(str(root), k) for k in sorted(structure))
+
+
+def test_module_cache_filename(monkeypatch, tmpdir):
+    """Test that the cache is stored below XDG_CACHE_HOME."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+    assert modulecache.module_cache_filename() == os.path.join(
+        str(tmpdir), "MDBenchmark", "modules.json"
+    )
+
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    monkeypatch.setenv("HOME", str(tmpdir))
+    assert modulecache.module_cache_filename() == os.path.join(
+        str(tmpdir), ".cache", "MDBenchmark", "modules.json"
+    )
+
+
+def test_scan_module_paths(tmpdir):
+    """Test that we only descend into directories of supported engines."""
+    module_paths = make_modules(tmpdir)
+    modules, mtimes = modulecache.scan_module_paths(module_paths, ENGINES)
+
+    assert sorted(modules["gromacs"]) == ["2016.4", "2018.1"]
+    assert modules["namd"] == ["123"]
+    assert os.path.join(str(tmpdir), "applications", "gromacs") in mtimes
+    assert os.path.join(str(tmpdir), "visualization", "vmd") not in mtimes
+
+    # Missing directories are recorded, so that we notice when they appear.
+    missing = os.path.join(str(tmpdir), "missing")
+    _, mtimes = modulecache.scan_module_paths(missing, ENGINES)
+    assert mtimes == {missing: None}
+
+
+def test_cached_scan(monkeypatch, tmpdir):
+    """Test that the scan is only repeated if the cache is outdated."""
+    module_paths = make_modules(tmpdir.mkdir("modules"))
+    calls = []
+    scan = modulecache.scan_module_paths
+
+    def counting_scan(*args):
+        calls.append(args)
+        return scan(*args)
+
+    monkeypatch.setattr(modulecache, "scan_module_paths", counting_scan)
+
+    modules = modulecache.cached_scan(module_paths, ENGINES)
+    assert sorted(modules["gromacs"]) == ["2016.4", "2018.1"]
+    assert len(calls) == 1
+    assert os.path.exists(modulecache.module_cache_filename())
+
+    # Second call is answered from the cache
+    assert modulecache.cached_scan(module_paths, ENGINES) == modules
+    assert len(calls) == 1
+
+    # A forced refresh always scans
+    modulecache.cached_scan(module_paths, ENGINES, refresh=True)
+    assert len(calls) == 2
+
+    # New versions change the mtime of the engine directory
+    gromacs = tmpdir.join("modules", "applications", "gromacs")
+    gromacs.join("2020").write("")
+    os.utime(str(gromacs), ns=(0, 0))
+    modules = modulecache.cached_scan(module_paths, ENGINES)
+    assert sorted(modules["gromacs"]) == ["2016.4", "2018.1", "2020"]
+    assert len(calls) == 3
+
+    # Entries older than the TTL are rescanned
+    filename = modulecache.module_cache_filename()
+    with open(filename) as fh:
+        data = json.load(fh)
+    data["entries"][module_paths]["time"] -= modulecache.MODULE_CACHE_TTL + 1
+    with open(filename, "w") as fh:
+        json.dump(data, fh)
+    modulecache.cached_scan(module_paths, ENGINES)
+    assert len(calls) == 4
+
+
+def test_is_valid(tmpdir):
+    """Test the invalidation of cache entries."""
+    entry = {
+        "time": 1000,
+        "engines": ENGINES,
+        "mtimes": {str(tmpdir): os.stat(str(tmpdir)).st_mtime_ns},
+        "modules": {},
+    }
+    assert modulecache.is_valid(entry, ENGINES, now=1000)
+    assert not modulecache.is_valid(entry, ENGINES, now=1000 + 25 * 60 * 60)
+    assert not modulecache.is_valid(entry, ["gromacs"], now=1000)
+
+    tmpdir.join("new").write("")
+    os.utime(str(tmpdir), ns=(0, 0))
+    assert not modulecache.is_valid(entry, ENGINES, now=1000)
+
+    assert not modulecache.is_valid({}, ENGINES)
+
+
+def test_corrupt_cache(monkeypatch, tmpdir):
+    """Test that unreadable or outdated cache files are ignored."""
+    module_paths = make_modules(tmpdir.mkdir("modules"))
+    filename = modulecache.module_cache_filename()
+    os.makedirs(os.path.dirname(filename))
+
+    with open(filename, "w") as fh:
+        fh.write("not json")
+    modules = modulecache.cached_scan(module_paths, ENGINES)
+    assert modules["namd"] == ["123"]
+
+    with open(filename) as fh:
+        assert json.load(fh)["version"] == modulecache.MODULE_CACHE_VERSION
+
+    with open(filename, "w") as fh:
+        json.dump({"version": 0, "entries": {module_paths: {}}}, fh)
+    assert modulecache.cached_scan(module_paths, ENGINES)["namd"] == ["123"]
+
+
+def test_get_available_modules_refresh(monkeypatch, tmpdir):
+    """Test that `refresh` is passed on to the cache."""
+    monkeypatch.setenv("MODULEPATH", make_modules(tmpdir))
+    assert sorted(get_available_modules()["gromacs"]) == ["2016.4", "2018.1"]
+
+    # Remove a version without changing any mtime
+    gromacs = tmpdir.join("applications", "gromacs")
+    mtime = os.stat(str(gromacs)).st_mtime_ns
+    gromacs.join("2018.1").remove()
+    os.utime(str(gromacs), ns=(mtime, mtime))
+
+    assert sorted(get_available_modules()["gromacs"]) == ["2016.4", "2018.1"]
+    assert get_available_modules(refresh=True)["gromacs"] == ["2016.4"]
@@ -57,6 +57,13 @@ def test_parse_empty_log(empty_log, parse):
     assert np.isnan(parse(namd, empty_log))
 
 
+def test_parse_log(log, tmpdir):
+    out = tmpdir.join("benchmark.out")
+    out.write(log.getvalue())
+    metrics = utils.parse_log(namd, str(out))
+    assert metrics == {"ncores": 1, "performance": 1 / 13.1013}
+
+
 @pytest.fixture
 def sim(tmpdir_factory):
     folder = tmpdir_factory.mktemp("simulation")
@@ -77,6 +84,18 @@ def test_analyze_benchmark(sim):
     assert np.isnan(res[6])  # ncores
 
 
+def test_get_output_files(tmpdir):
+    for fn in ["bench.job", "md.namd", "md.out.1234", "md.err.1234", "md.out.1233"]:
+        tmpdir.join(fn).write("")
+    tmpdir.join("a", "md.out.1235").write("", ensure=True)
+
+    output_files = namd.get_output_files(str(tmpdir), {"name": "md"})
+    assert output_files == [
+        str(tmpdir.join("md.out.1233")),
+        str(tmpdir.join("md.out.1234")),
+    ]
+
+
 @pytest.mark.parametrize("input_file", ("md", "md.namd"))
 def test_check_file_extension(capsys, input_file, tmpdir):
     """Test that we check for all files needed to run NAMD benchmarks."""
@@ -23,6 +23,7 @@ from glob import glob
 import datreant as dtr
 import pytest
 
+from mdbenchmark.constants import LINK_METHODS
 from mdbenchmark.mdengines import gromacs, namd, utils
 from mdbenchmark.utils import retrieve_host_template
 
@@ -178,3 +179,104 @@ def test_cleanup_before_restart(engine, files_to_delete, files_to_keep, tmpdir):
 
     # Get rid of the `tmp` path and only compare the actual filenames
     assert files_to_keep == [x[len(str(tmp)) + 1 :] for x in files_found]
+
+
+@pytest.mark.parametrize("method", LINK_METHODS)
+def test_link_file(method, tmpdir):
+    """Test that all link methods produce a file with the same content."""
+    with tmpdir.as_cwd():
+        with open("md.tpr", "w") as fh:
+            fh.write("topology")
+
+        used = utils.link_file("md.tpr", "linked.tpr", method)
+
+        with open("linked.tpr") as fh:
+            assert fh.read() == "topology"
+        if method == "reflink":
+            assert used in ("reflink", "copy")
+        else:
+            assert used == method
+        assert os.path.islink("linked.tpr") is (method == "sym")
+        assert os.path.samefile("md.tpr", "linked.tpr") is (method in ("hard", "sym"))
+
+
+def test_link_file_fallback(monkeypatch, tmpdir):
+    """Test that hard links fall back to copies across file systems."""
+
+    def link(src, dst):
+        raise OSError(18, "Invalid cross-device link")
+
+    monkeypatch.setattr(utils.os, "link", link)
+    monkeypatch.setattr(utils, "_reflink", link)
+    with tmpdir.as_cwd():
+        open("md.tpr", "w").close()
+        assert utils.link_file("md.tpr", "linked.tpr", "hard") == "copy"
+        assert not os.path.samefile("md.tpr", "linked.tpr")
+
+
+def test_link_file_replaces_existing_link(tmpdir):
+    """Test that we never write into the original file through an old link."""
+    with tmpdir.as_cwd():
+        with open("md.tpr", "w") as fh:
+            fh.write("topology")
+        os.link("md.tpr", "linked.tpr")
+
+        utils.link_file("md.tpr", "linked.tpr", "copy")
+
+        with open("md.tpr") as fh:
+            assert fh.read() == "topology"
+        assert not os.path.samefile("md.tpr", "linked.tpr")
+
+
+def test_prepare_benchmark_link(tmpdir):
+    """Test that the input files of all multidir simulations are linked."""
+    with tmpdir.as_cwd():
+        open("md.tpr", "a").close()
+        sim = dtr.Treant("./gromacs")
+        gromacs.prepare_benchmark(
+            name="md", relative_path="", benchmark=sim, multidir=2, link="hard"
+        )
+
+        assert os.path.samefile("md.tpr", "gromacs/a/md.tpr")
+        assert os.path.samefile("md.tpr", "gromacs/b/md.tpr")
+
+
+@pytest.mark.parametrize(
+    "mdrun_options, dirname",
+    [
+        ("", "n002_r08_t05_woht_nsim1"),
+        ("-npme 2", "n002_r08_t05_woht_nsim1_npme2"),
+        ("-npme 2 -nb gpu -notunepme", "n002_r08_t05_woht_nsim1_npme2_nbgpu_notunepme"),
+        ("-dd 2 2 1 -rdd 1.5", "n002_r08_t05_woht_nsim1_dd221_rdd1.5"),
+        ("-gpu_id 0/1", "n002_r08_t05_woht_nsim1_gpuid01"),
+    ],
+)
+def test_benchmark_dirname(mdrun_options, dirname):
+    """Test that mdrun options are appended to the folder name."""
+    assert (
+        utils.benchmark_dirname(
+            nodes=2,
+            number_of_ranks=8,
+            number_of_threads=5,
+            hyperthreading=False,
+            multidir=1,
+            mdrun_options=mdrun_options,
+        )
+        == dirname
+    )
+
+
+def test_benchmark_dirname_repeat():
+    """Test that the replicate is appended to the folder name."""
+    settings = dict(
+        nodes=2,
+        number_of_ranks=8,
+        number_of_threads=5,
+        hyperthreading=False,
+        multidir=1,
+    )
+    assert utils.benchmark_dirname(**settings, repeat=0) == "n002_r08_t05_woht_nsim1"
+    assert (
+        utils.benchmark_dirname(**settings, mdrun_options="-npme 2", repeat=3)
+        == "n002_r08_t05_woht_nsim1_npme2_rep3"
+    )
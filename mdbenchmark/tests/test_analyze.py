@@ -17,9 +17,12 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import shutil
+
 import datreant as dtr
 import numpy as np
 import pandas as pd
+import pytest
 
 from mdbenchmark import cli
 from mdbenchmark.utils import map_columns, parse_bundle, print_dataframe
@@ -48,6 +51,17 @@ def test_analyze_gromacs(cli_runner, tmpdir, capsys, data):
         assert result.output == "\n".join(out.split("\n"))
 
 
+def test_analyze_jobs(cli_runner, tmpdir, data):
+    """Test that the output does not change when analyzing in parallel."""
+    with tmpdir.as_cwd():
+        directory = "--directory={}".format(data["analyze-files-w-errors"])
+        serial = cli_runner.invoke(cli, ["analyze", directory])
+        parallel = cli_runner.invoke(cli, ["analyze", directory, "--jobs=4"])
+
+        assert parallel.exit_code == 0
+        assert parallel.output == serial.output
+
+
 def test_analyze_namd(cli_runner, tmpdir, capsys, data):
     with tmpdir.as_cwd():
         result = cli_runner.invoke(
@@ -108,3 +122,372 @@ def test_analyze_console_messages(cli_runner, tmpdir):
         output = "Setting up...\nERROR There is no data for the given path.\n"
         assert result.exit_code == 1
         assert result.output == output
+
+
+def test_analyze_save_csv_timings(cli_runner, tmpdir, data):
+    """Test that the timings of GROMACS are only written to the CSV file."""
+    table = (
+        "     R E A L   C Y C L E   A N D   T I M E   A C C O U N T I N G\n\n"
+        " Computing:          Num   Num      Call    Wall time         Giga-Cycles\n"
+        "                     Ranks Threads  Count      (s)         total sum    %\n"
+        "-----------------------------------------------------------------------\n"
+        " Force                  4    8      10001      25.398       2682.803  80.0\n"
+        " PME mesh               4    8      10001       9.985       1054.699  20.0\n"
+        "-----------------------------------------------------------------------\n"
+        " Total                                         35.383       3737.502 100.0\n"
+        "-----------------------------------------------------------------------\n"
+    )
+    directory = tmpdir.join("benchmarks")
+    shutil.copytree(data["analyze-files-gromacs"], str(directory))
+    log = directory.join("1", "bench.log")
+    log.write(log.read().replace("               Core t (s)", table + "  Core t (s)"))
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            ["analyze", "--directory={}".format(directory), "--save-csv=results.csv"],
+        )
+        assert result.exit_code == 0
+        assert "timing" not in result.output
+
+        df = pd.read_csv("results.csv")
+        row = df[df["nodes"] == 1].iloc[0]
+        assert row["timing_force"] == 80.0
+        assert row["timing_pme_mesh"] == 20.0
+        assert df["timing_force"].isnull().sum() == len(df) - 1
+
+
+def test_analyze_rank_by_waste(cli_runner, tmpdir, data):
+    """Test ranking by wasted time and the suggestion of -npme."""
+    report = (
+        " M E G A - F L O P S   A C C O U N T I N G\n\n"
+        " Average load imbalance: {}%.\n"
+        " Part of the total run time spent waiting due to load imbalance: {}%.\n"
+        " Average PME mesh/force load: {}\n"
+        " Part of the total run time spent waiting due to PP/PME imbalance: 1.0 %\n\n"
+    )
+    directory = tmpdir.join("benchmarks")
+    shutil.copytree(data["analyze-files-gromacs"], str(directory))
+    for treant in dtr.discover(str(directory)):
+        treant.categories.add(
+            version=3, ranks=16, threads=2, hyperthreading=False, multidir=1
+        )
+    for nodes, imbalance, pme_load in [(1, 20.0, 1.5), (2, 2.0, 1.0)]:
+        log = directory.join(str(nodes), "bench.log")
+        content = log.read().replace(
+            "Running on", "Using 4 separate PME ranks\nRunning on", 1
+        )
+        content = content.replace(
+            "               Core t (s)",
+            report.format(imbalance, imbalance, pme_load) + "  Core t (s)",
+        )
+        log.write(content)
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli, ["analyze", "--directory={}".format(directory), "--rank-by=waste"],
+        )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    header = [line for line in lines if "Wasted time (%)" in line]
+    assert len(header) == 1
+    rows = lines[lines.index(header[0]) + 2 :]
+    assert rows[0].split("|")[2].strip() == "2"
+    assert rows[1].split("|")[2].strip() == "1"
+    assert (
+        "The load of the PME and PP ranks is not balanced in 1 benchmarks. "
+        "Consider to change the number of PME ranks with -npme:"
+    ) in result.output
+    assert "Suggested -npme" in result.output
+
+
+def test_analyze_rank_by_waste_namd(cli_runner, tmpdir, data):
+    """Test that we cannot rank NAMD benchmarks by wasted time."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "analyze",
+                "--directory={}".format(data["analyze-files-namd"]),
+                "--rank-by=waste",
+            ],
+        )
+    assert result.exit_code == 1
+    assert "Cannot rank the benchmarks by waste." in result.output
+
+
+def test_analyze_mdrun_options(cli_runner, tmpdir, data):
+    """Test that the mdrun options are only printed, if they were swept."""
+    directory = tmpdir.join("benchmarks")
+    shutil.copytree(data["analyze-files-gromacs"], str(directory))
+    for treant in dtr.discover(str(directory)):
+        treant.categories.add(
+            version=3, ranks=16, threads=2, hyperthreading=False, multidir=1
+        )
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli, ["analyze", "--directory={}".format(directory)])
+    assert result.exit_code == 0
+    assert "mdrun options" not in result.output
+
+    for treant in dtr.discover(str(directory)):
+        treant.categories["mdrun_options"] = "-npme {}".format(
+            treant.categories["nodes"]
+        )
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli, ["analyze", "--directory={}".format(directory)])
+    assert result.exit_code == 0
+    assert "mdrun options" in result.output
+    assert "-npme 2" in result.output
+
+
+def test_analyze_rank_by_cost(cli_runner, tmpdir, data):
+    """Test that the cheapest benchmark reaching a performance is printed first."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "analyze",
+                "--directory={}".format(data["analyze-files-gromacs"]),
+                "--rank-by=cost",
+                "--min-throughput=200",
+            ],
+        )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    header = [line for line in lines if "Node-hours/ns" in line]
+    assert len(header) == 1
+    rows = lines[lines.index(header[0]) + 2 : -2]
+    assert [row.split("|")[2].strip() for row in rows] == ["3", "4", "5"]
+
+
+def test_analyze_min_throughput_not_reached(cli_runner, tmpdir, data):
+    """Test the error if no benchmark reaches the requested performance."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "analyze",
+                "--directory={}".format(data["analyze-files-gromacs"]),
+                "--min-throughput=1000",
+            ],
+        )
+    assert result.exit_code == 1
+    assert "ERROR None of the benchmarks reaches 1000.0 ns/day.\n" in result.output
+
+
+def test_analyze_save_csv_efficiency(cli_runner, tmpdir, data):
+    """Test that speedup, efficiency and cost are written to the CSV file."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "analyze",
+                "--directory={}".format(data["analyze-files-gromacs"]),
+                "--save-csv=results.csv",
+            ],
+        )
+        assert result.exit_code == 0
+
+        df = pd.read_csv("results.csv")
+    assert df["speedup"].iloc[0] == 1
+    assert df["efficiency"].iloc[0] == 1
+    np.testing.assert_allclose(df["speedup"], df["ns/day"] / df["ns/day"].iloc[0])
+    np.testing.assert_allclose(df["efficiency"], df["speedup"] / df["nodes"])
+    np.testing.assert_allclose(
+        df["core_hours_per_ns"], 24 * df["ncores"] / df["ns/day"]
+    )
+    np.testing.assert_allclose(df["node_hours_per_ns"], 24 * df["nodes"] / df["ns/day"])
+
+
+def test_analyze_fit(cli_runner, tmpdir, data):
+    """Test that scaling models are fitted with `--fit`."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "analyze",
+                "--directory={}".format(data["analyze-files-gromacs"]),
+                "--fit",
+                "--predict=10",
+                "--predict=20",
+                "--efficiency-threshold=0.5",
+            ],
+        )
+    assert result.exit_code == 0
+    assert (
+        "Scaling models fitted to the time per nanosecond. The efficient nodes are "
+        "the largest number of nodes with a parallel efficiency of at least 50%."
+    ) in result.output
+    lines = result.output.splitlines()
+    header = [line for line in lines if "Serial fraction" in line]
+    assert len(header) == 1
+    assert "ns/day on 10 nodes" in header[0]
+    assert "ns/day on 20 nodes" in header[0]
+    rows = lines[lines.index(header[0]) + 2 : lines.index(header[0]) + 4]
+    assert [row.split("|")[4].strip() for row in rows] == ["amdahl", "communication"]
+
+
+def test_analyze_save_csv_fit(cli_runner, tmpdir, data):
+    """Test that the scaling models are printed when saving a CSV file, too."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "analyze",
+                "--directory={}".format(data["analyze-files-gromacs"]),
+                "--save-csv=results.csv",
+                "--fit",
+            ],
+        )
+        assert result.exit_code == 0
+        assert tmpdir.join("results.csv").check()
+    assert "Successfully saved benchmark data to results.csv." in result.output
+    assert "Performances (ns/day)" in result.output
+    assert "Serial fraction" in result.output
+
+
+def test_analyze_fit_too_few_benchmarks(cli_runner, tmpdir, data):
+    """Test the warning if there are not enough benchmarks to fit a model."""
+    directory = tmpdir.join("benchmarks")
+    shutil.copytree(data["analyze-files-gromacs"], str(directory))
+    for treant in dtr.discover(str(directory)):
+        if treant.categories["nodes"] != 1:
+            shutil.rmtree(treant.abspath)
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli, ["analyze", "--directory={}".format(directory), "--fit"]
+        )
+    assert result.exit_code == 0
+    assert (
+        "WARNING Not enough finished benchmarks to fit a scaling model. At least 2 "
+        "different node counts are needed."
+    ) in result.output
+
+
+def test_analyze_repeats(cli_runner, tmpdir, data):
+    """Test that replicates are aggregated into a single row."""
+    directory = tmpdir.join("benchmarks")
+    shutil.copytree(data["analyze-files-gromacs"], str(directory))
+    for nodes in range(1, 6):
+        for repeat in [1, 2]:
+            path = str(directory.join("{}_rep{}".format(nodes, repeat)))
+            shutil.copytree(str(directory.join(str(nodes))), path)
+            dtr.Treant(path).categories["repeat"] = repeat
+        shutil.rmtree(str(directory.join(str(nodes))))
+    log = directory.join("1_rep2", "bench.log")
+    log.write(log.read().replace("98.147", "102.147"))
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli, ["analyze", "--directory={}".format(directory), "--save-csv=out.csv"],
+        )
+        assert result.exit_code == 0
+        df = pd.read_csv("out.csv")
+
+        result = cli_runner.invoke(cli, ["analyze", "--directory={}".format(directory)])
+    assert result.exit_code == 0
+    assert "Repeats" in result.output
+    assert "95% CI (ns/day)" in result.output
+
+    assert df["nodes"].tolist() == [1, 2, 3, 4, 5]
+    assert df["repeats"].tolist() == [2] * 5
+    # Categories are not averaged and stay integers in the CSV file
+    assert df["time"].dtype == np.int64
+    assert df["ncores"].dtype == np.int64
+    row = df.iloc[0]
+    assert row["ns/day"] == pytest.approx(100.147)
+    assert row["performance_min"] == pytest.approx(98.147)
+    assert row["performance_std"] == pytest.approx(2 * np.sqrt(2))
+    assert row["performance_ci"] == pytest.approx(12.706 * 2)
+    assert (df["performance_std"].iloc[1:] == 0).all()
+
+
+def test_analyze_independent_sweeps(cli_runner, tmpdir, data):
+    """Test that sweeps with the same categories are not taken as replicates."""
+    for sweep in ["a", "b"]:
+        shutil.copytree(data["analyze-files-gromacs"], str(tmpdir.join(sweep)))
+    for treant in dtr.discover(str(tmpdir.join("b"))):
+        treant.categories["name"] = "other"
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli, ["analyze", "--save-csv=out.csv"])
+        assert result.exit_code == 0
+        df = pd.read_csv("out.csv")
+    assert len(df) == 10
+    assert "repeats" not in df.columns
+    assert "Repeats" not in result.output
+
+
+def test_analyze_without_repeats(cli_runner, tmpdir, data):
+    """Test that the replicate columns are hidden without replicates."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli, ["analyze", "--directory={}".format(data["analyze-files-gromacs"])]
+        )
+    assert result.exit_code == 0
+    assert "Repeats" not in result.output
+
+
+def test_analyze_time_series(cli_runner, tmpdir, data):
+    """Test that benchmarks whose performance drifted are printed."""
+    directory = tmpdir.join("benchmarks")
+    shutil.copytree(data["analyze-files-gromacs"], str(directory))
+    log = directory.join("5", "bench.log")
+    content = (
+        "   dt                             = 0.002\n"
+        "Started mdrun on rank 0 Mon Dec 11 09:00:00 2017\n"
+    )
+    # The performance drops by 10% per minute after five minutes
+    step = 0
+    for minute in range(1, 9):
+        step += int(1000 * 0.9 ** max(minute - 5, 0)) * 60
+        content += "Writing checkpoint, step {} at Mon Dec 11 09:{:02d}:00 2017\n".format(
+            step, minute
+        )
+    log.write(content + log.read())
+
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "analyze",
+                "--directory={}".format(directory),
+                "--time-series",
+                "--save-csv=out.csv",
+            ],
+        )
+        assert result.exit_code == 0
+        df = pd.read_csv("out.csv")
+
+        result = cli_runner.invoke(
+            cli, ["analyze", "--directory={}".format(directory), "--time-series"]
+        )
+    assert result.exit_code == 0
+    assert directory.join("5", ".bench.throughput.npy").check()
+
+    assert df["throughput_drift"].isnull().sum() == 4
+    assert df["throughput_drift"].iloc[-1] < -0.1
+
+    assert "The performance of 1 benchmarks drifted or varied by more than 10%." in (
+        result.output.replace("\n", " ")
+    )
+    lines = result.output.splitlines()
+    header = [line for line in lines if "Drift" in line]
+    assert len(header) == 1
+    row = lines[lines.index(header[0]) + 2].split("|")
+    assert row[3].strip() == "5"
+
+
+def test_analyze_time_series_without_samples(cli_runner, tmpdir, data):
+    """Test the warning if no benchmark has enough samples."""
+    directory = tmpdir.join("benchmarks")
+    shutil.copytree(data["analyze-files-gromacs"], str(directory))
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli, ["analyze", "--directory={}".format(directory), "--time-series"]
+        )
+    assert result.exit_code == 0
+    assert "Not enough samples to judge the performance over time" in result.output
@@ -0,0 +1,144 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sqlite3
+
+import numpy as np
+
+from mdbenchmark import cache as results_cache, cli
+from mdbenchmark.cache import CACHE_FILENAME, ResultsCache
+from mdbenchmark.mdengines import gromacs
+
+LOG = (
+    "Running on 1 node with total 32 cores, 64 logical cores, 0 compatible GPUs\n"
+    "Performance:           {}           0.123\n"
+)
+
+
+def write_log(directory, performance):
+    log = directory.join("bench", "md.log")
+    log.write(LOG.format(performance), ensure=True)
+    return str(log)
+
+
+def test_cache_roundtrip(tmpdir, monkeypatch):
+    """Test that unchanged log files are served from the cache."""
+    log = write_log(tmpdir, 123.45)
+
+    cache = ResultsCache(str(tmpdir))
+    metrics = cache.parse_log(gromacs, log)
+    assert (metrics["ncores"], metrics["performance"]) == (32, 123.45)
+    cache.save()
+    assert tmpdir.join(CACHE_FILENAME).check()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Log file was parsed again.")
+
+    monkeypatch.setattr(results_cache, "parse_log", fail)
+    cache = ResultsCache(str(tmpdir))
+    np.testing.assert_equal(cache.parse_log(gromacs, log), metrics)
+
+
+def test_cache_changed_log(tmpdir):
+    """Test that changed log files are parsed again."""
+    log = write_log(tmpdir, 123.45)
+    cache = ResultsCache(str(tmpdir))
+    cache.parse_log(gromacs, log)
+    cache.save()
+
+    write_log(tmpdir, 1234.5)
+    stat = os.stat(log)
+    os.utime(log, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    cache = ResultsCache(str(tmpdir))
+    assert cache.parse_log(gromacs, log)["performance"] == 1234.5
+
+
+def test_cache_nan(tmpdir):
+    log = tmpdir.join("md.log")
+    log.write("not the log you are looking for\n")
+    cache = ResultsCache(str(tmpdir))
+    cache.parse_log(gromacs, str(log))
+    cache.save()
+
+    metrics = ResultsCache(str(tmpdir)).parse_log(gromacs, str(log))
+    assert metrics["ncores"] != metrics["ncores"]
+    assert metrics["performance"] != metrics["performance"]
+
+
+def test_cache_rebuild(tmpdir):
+    """Test that old entries are dropped when rebuilding the cache."""
+    log = write_log(tmpdir, 123.45)
+    cache = ResultsCache(str(tmpdir))
+    cache.parse_log(gromacs, log)
+    cache.save()
+
+    cache = ResultsCache(str(tmpdir), rebuild=True)
+    assert not cache._entries
+    cache.save()
+    assert not ResultsCache(str(tmpdir))._entries
+
+
+def test_cache_version_mismatch(tmpdir, monkeypatch):
+    log = write_log(tmpdir, 123.45)
+    cache = ResultsCache(str(tmpdir))
+    cache.parse_log(gromacs, log)
+    cache.save()
+
+    monkeypatch.setattr(results_cache, "CACHE_VERSION", results_cache.CACHE_VERSION + 1)
+    cache = ResultsCache(str(tmpdir))
+    assert cache.rebuild
+    assert not cache._entries
+
+
+def test_cache_corrupt_file(tmpdir):
+    tmpdir.join(CACHE_FILENAME).write("this is not a database")
+    cache = ResultsCache(str(tmpdir))
+    assert cache.rebuild
+
+    cache.parse_log(gromacs, write_log(tmpdir, 123.45))
+    cache.save()
+    with sqlite3.connect(str(tmpdir.join(CACHE_FILENAME))) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM logs").fetchone() == (1,)
+
+
+def test_analyze_no_cache(cli_runner, tmpdir, data):
+    """Test that `--no-cache` does not write a cache file."""
+    with tmpdir.as_cwd():
+        directory = tmpdir.join("benchmarks")
+        directory.mkdir()
+        for f in ("1", "2"):
+            src = os.path.join(data["analyze-files-gromacs"], f)
+            directory.join(f).mkdir()
+            for root, _, files in os.walk(src):
+                for fn in files:
+                    target = directory.join(f, os.path.relpath(root, src), fn)
+                    target.write(open(os.path.join(root, fn)).read(), ensure=True)
+
+        result = cli_runner.invoke(
+            cli, ["analyze", "--directory={}".format(directory), "--no-cache"]
+        )
+        assert result.exit_code == 0
+        assert not directory.join(CACHE_FILENAME).check()
+
+        cached = cli_runner.invoke(cli, ["analyze", "--directory={}".format(directory)])
+        assert cached.exit_code == 0
+        assert directory.join(CACHE_FILENAME).check()
+        assert cached.output == result.output
@@ -17,9 +17,21 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import subprocess
+import sys
 
 from mdbenchmark import cli
 
+# Dependencies that must only be imported by the subcommands that need them
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "datreant", "jinja2", "xdg"]
+
+IMPORT_SCRIPT = """
+import json, sys
+import mdbenchmark.cli
+print(json.dumps(sorted(sys.modules)))
+"""
+
 
 def test_aliasedgroup_unknown_command(cli_runner):
     """Test that we return an error, when invoking an unknown command."""
@@ -37,3 +49,12 @@ def test_aliasedgroup_known_alias(cli_runner):
     """Test that we can use all defined aliases."""
     result = cli_runner.invoke(cli, ["start"])
     assert result.exit_code == 1
+
+
+def test_import_time():
+    """Test that importing the CLI does not import any heavy dependencies."""
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT])
+    modules = json.loads(output.decode())
+
+    imported = [module for module in modules if module.split(".")[0] in HEAVY_MODULES]
+    assert imported == []
@@ -0,0 +1,90 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+
+import datreant as dtr
+import pytest
+
+from mdbenchmark import discover
+from mdbenchmark.versions import VersionFactory
+
+
+@pytest.mark.parametrize(
+    "folder", ["analyze-files-gromacs", "analyze-files-namd", "analyze-files-w-errors"]
+)
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_discover_same_as_datreant(data, folder, jobs):
+    """Test that we find the same benchmarks and categories as datreant."""
+    bundle = dtr.discover(data[folder])
+    benchmarks = discover.discover(data[folder], jobs=jobs)
+
+    expected = sorted((t.abspath.rstrip("/"), dict(t.categories)) for t in bundle)
+    found = [(b.abspath, b.categories) for b in benchmarks]
+    assert found == expected
+
+
+def test_discover_pruning(tmpdir):
+    """Test that we do not descend into treants or hidden directories."""
+    dtr.Treant(str(tmpdir.join("sweep", "n001")), categories={"nodes": 1})
+    dtr.Treant(str(tmpdir.join("sweep", "n001", "a")), categories={"nodes": 2})
+    dtr.Treant(str(tmpdir.join(".git", "n003")), categories={"nodes": 3})
+    dtr.Treant(str(tmpdir.join("__pycache__", "n004")), categories={"nodes": 4})
+
+    benchmarks = discover.discover(str(tmpdir))
+    assert [b.categories["nodes"] for b in benchmarks] == [1]
+
+    # The root directory itself is always searched
+    benchmarks = discover.discover(str(tmpdir.join("sweep", "n001")))
+    assert [b.categories["nodes"] for b in benchmarks] == [1, 2]
+
+
+def test_discover_missing_directory(tmpdir):
+    benchmarks = discover.discover(str(tmpdir.join("look_here")))
+    assert not benchmarks
+    assert benchmarks.categories == set()
+    assert VersionFactory(categories=benchmarks.categories).version == "3"
+
+
+def test_benchmark_list():
+    benchmarks = discover.BenchmarkList(
+        [
+            discover.Benchmark("/a", {"module": "gromacs", "started": True}),
+            discover.Benchmark("/b", {"module": "gromacs", "started": False}),
+            discover.Benchmark("/c", {"module": "gromacs", "version": 3}),
+        ]
+    )
+    assert benchmarks.categories == {"module"}
+
+    groups = benchmarks.groupby("started")
+    assert sorted(groups) == [False, True]
+    assert [b.abspath for b in groups[False]] == ["/b"]
+    assert isinstance(groups[True], discover.BenchmarkList)
+
+
+def test_benchmark_treant(tmpdir):
+    """Test that changes through `Benchmark.treant` are written to disk."""
+    dtr.Treant(str(tmpdir.join("n001")), categories={"started": False})
+    (benchmark,) = discover.discover(str(tmpdir))
+    assert benchmark.name == "n001"
+    assert benchmark.relpath == os.path.relpath(str(tmpdir.join("n001")))
+
+    benchmark.treant.categories["started"] = True
+    (benchmark,) = discover.discover(str(tmpdir))
+    assert benchmark.categories["started"]
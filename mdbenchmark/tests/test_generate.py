@@ -29,6 +29,7 @@ from mdbenchmark.cli.validators import (
     print_known_hosts,
     validate_cpu_gpu_flags,
     validate_hosts,
+    validate_mdrun_options,
     validate_module,
     validate_name,
     validate_number_of_nodes,
@@ -184,7 +185,7 @@ def test_generate_with_validation(cli_runner, module, monkeypatch, extensions, t
         # monkeypatch the output of the available modules
         monkeypatch.setattr(
             "mdbenchmark.mdengines.get_available_modules",
-            lambda: {"gromacs": ["2016"], "namd": ["11"]},
+            lambda refresh=False: {"gromacs": ["2016"], "namd": ["11"]},
         )
 
         result = cli_runner.invoke(
@@ -244,7 +245,7 @@ def test_generate_skip_validation(cli_runner, module, extensions, monkeypatch, t
         # monkeypatch the output of the available modules
         monkeypatch.setattr(
             "mdbenchmark.mdengines.get_available_modules",
-            lambda: {"gromacs": ["2016"], "namd": ["11"]},
+            lambda refresh=False: {"gromacs": ["2016"], "namd": ["11"]},
         )
 
         result = cli_runner.invoke(
@@ -333,7 +334,8 @@ def test_generate_console_messages(cli_runner, monkeypatch, tmpdir):
     with tmpdir.as_cwd():
         # monkeypatch the output of the available modules
         monkeypatch.setattr(
-            "mdbenchmark.mdengines.get_available_modules", lambda: {"gromacs": ["2016"]}
+            "mdbenchmark.mdengines.get_available_modules",
+            lambda refresh=False: {"gromacs": ["2016"]},
         )
 
         # Test that we get an error when not supplying a file name
@@ -398,6 +400,7 @@ def test_generate_console_messages(cli_runner, monkeypatch, tmpdir):
             "cobra\n"
             "draco\n"
             "hydra\n"
+            "local\n"
         )
         assert result.exit_code == 0
         assert result.output == output
@@ -423,7 +426,8 @@ def test_generate_namd_experimental_warning(cli_runner, monkeypatch, tmpdir):
 
         # monkeypatch the output of the available modules
         monkeypatch.setattr(
-            "mdbenchmark.mdengines.get_available_modules", lambda: {"namd": ["123"]}
+            "mdbenchmark.mdengines.get_available_modules",
+            lambda refresh=False: {"namd": ["123"]},
         )
 
         result = cli_runner.invoke(
@@ -459,7 +463,7 @@ def test_print_known_hosts(ctx_mock, capsys):
     print_known_hosts(ctx_mock, None, True)
     out, _ = capsys.readouterr()
 
-    assert out == "Available host templates:\ncobra\ndraco\nhydra\n"
+    assert out == "Available host templates:\ncobra\ndraco\nhydra\nlocal\n"
 
 
 def test_validate_generate_name(ctx_mock):
@@ -541,6 +545,32 @@ def test_validate_generate_host(ctx_mock):
     assert validate_hosts(ctx_mock, None, host="draco") == "draco"
 
 
+def test_validate_mdrun_options(ctx_mock):
+    """Test that mdrun options are split into their names and values."""
+    assert validate_mdrun_options(ctx_mock, None, ()) == []
+    assert validate_mdrun_options(
+        ctx_mock, None, ("-npme=0,2,4", "nb=cpu, gpu", "-tunepme=no")
+    ) == [("npme", ["0", "2", "4"]), ("nb", ["cpu", "gpu"]), ("tunepme", ["no"])]
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        (("-npme",), "Options must be given as NAME=VALUE[,VALUE...]"),
+        (("-npme=0,,2",), "Options must be given as NAME=VALUE[,VALUE...]"),
+        (("=0",), "Options must be given as NAME=VALUE[,VALUE...]"),
+        (("-n pme=0",), "Options must be given as NAME=VALUE[,VALUE...]"),
+        (("-npme=0", "npme=2"), "The option -npme was given more than once."),
+    ],
+)
+def test_validate_mdrun_options_errors(ctx_mock, options, message):
+    """Test that malformed mdrun options are rejected."""
+    with pytest.raises(exceptions.BadParameter) as error:
+        validate_mdrun_options(ctx_mock, None, options)
+
+    assert str(error.value).startswith(message)
+
+
 def test_generate_prompt_yes(cli_runner, tmpdir):
     """Test whether promt answer yes works."""
     with tmpdir.as_cwd():
@@ -603,3 +633,305 @@ def test_generate_test_prompt_no(cli_runner, tmpdir):
         bundle = dtr.discover()
         assert result.exit_code == 1
         assert len(bundle) == 0
+
+
+def test_generate_link(cli_runner, tmpdir):
+    """Test that input files are hard linked with `--link=hard`."""
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+
+        result = cli_runner.invoke(
+            cli,
+            [
+                "generate",
+                "--module=gromacs/2016",
+                "--host=draco",
+                "--max-nodes=2",
+                "--multidir=2",
+                "--name=protein",
+                "--skip-validation",
+                "--link=hard",
+                "--yes",
+            ],
+        )
+        assert result.exit_code == 0
+
+        bundle = dtr.discover()
+        assert len(bundle) == 2
+        for treant in bundle:
+            for subdir in ["a", "b"]:
+                path = os.path.join(treant.abspath, subdir, "protein.tpr")
+                assert os.path.samefile("protein.tpr", path)
+
+
+def generate_files(cli_runner, *args):
+    return cli_runner.invoke(
+        cli,
+        [
+            "generate",
+            "--module=gromacs/2016",
+            "--host=draco",
+            "--max-nodes=4",
+            "--ranks=20",
+            "--ranks=40",
+            "--multidir=1",
+            "--multidir=2",
+            "--name=protein",
+            "--skip-validation",
+            "--yes",
+        ]
+        + list(args),
+    )
+
+
+def test_generate_jobs(cli_runner, tmpdir):
+    """Test that generating in parallel gives the same benchmarks."""
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+
+        trees = []
+        for jobs in ["1", "4"]:
+            os.mkdir(jobs)
+            with tmpdir.join(jobs).as_cwd():
+                result = generate_files(cli_runner, "--name=../protein", "--jobs", jobs)
+                assert result.exit_code == 0
+
+                tree = {}
+                for treant in dtr.discover():
+                    with open(os.path.join(treant.abspath, "bench.job")) as fh:
+                        tree[treant.relpath] = (dict(treant.categories), fh.read())
+                trees.append(tree)
+
+        assert len(trees[0]) == 16
+        assert trees[0] == trees[1]
+
+
+def test_generate_jobs_errors(cli_runner, tmpdir, monkeypatch):
+    """Test that all failed benchmarks are reported at the end."""
+    from mdbenchmark.cli import generate
+
+    write_benchmark = generate.write_benchmark
+
+    def fail(**kwargs):
+        if kwargs["nodes"] == 2 and kwargs["multidir"] == 2:
+            raise OSError("Disk quota exceeded")
+        write_benchmark(**kwargs)
+
+    monkeypatch.setattr(generate, "write_benchmark", fail)
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+        result = generate_files(cli_runner, "--jobs=4")
+
+        assert result.exit_code == 1
+        assert result.output.splitlines()[-3:] == [
+            "ERROR Could not generate 2 of 16 benchmarks:",
+            "draco_gromacs/2016/n002_r20_t02_woht_nsim2: Disk quota exceeded",
+            "draco_gromacs/2016/n002_r40_t01_woht_nsim2: Disk quota exceeded",
+        ]
+        assert len(dtr.discover()) == 14
+
+
+def test_generate_mdrun_options(cli_runner, tmpdir):
+    """Test that a benchmark is generated for each combination of mdrun options."""
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+
+        result = cli_runner.invoke(
+            cli,
+            [
+                "generate",
+                "--module=gromacs/2016",
+                "--host=draco",
+                "--max-nodes=2",
+                "--ranks=40",
+                "--name=protein",
+                "--skip-validation",
+                "--mdrun-option",
+                "-npme=0,2",
+                "--mdrun-option=-tunepme=yes,no",
+                "--yes",
+            ],
+        )
+        assert result.exit_code == 0
+        assert "mdrun options" in result.output
+        assert "-npme 2 -notunepme" in result.output
+
+        bundle = dtr.discover()
+        assert len(bundle) == 8
+        treant = dtr.Treant(
+            "draco_gromacs/2016/n002_r40_t01_woht_nsim1_npme2_notunepme"
+        )
+        assert treant.categories["mdrun_options"] == "-npme 2 -notunepme"
+        with open(os.path.join(treant.abspath, "bench.job")) as fh:
+            assert fh.read().endswith("-noconfout -npme 2 -notunepme")
+
+
+def test_generate_without_mdrun_options(cli_runner, tmpdir):
+    """Test that the mdrun options are hidden, if none were given."""
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+        result = generate_files(cli_runner)
+
+        assert result.exit_code == 0
+        assert "mdrun options" not in result.output
+        for treant in dtr.discover():
+            assert treant.categories["mdrun_options"] == ""
+            with open(os.path.join(treant.abspath, "bench.job")) as fh:
+                assert fh.read().endswith("-noconfout")
+
+
+def test_generate_mdrun_options_module_case(cli_runner, tmpdir):
+    """Test that the MD engine of a module is detected independent of its case."""
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+        result = cli_runner.invoke(
+            cli,
+            [
+                "generate",
+                "--module=GROMACS/2020",
+                "--host=draco",
+                "--max-nodes=1",
+                "--name=protein",
+                "--skip-validation",
+                "--mdrun-option=-npme=0,2",
+                "--yes",
+            ],
+        )
+        assert result.exit_code == 0
+        assert len(dtr.discover()) == 2
+
+
+def test_generate_mdrun_options_namd(cli_runner, tmpdir):
+    """Test that mdrun options cannot be used with NAMD."""
+    with tmpdir.as_cwd():
+        for extension in ["namd", "pdb", "psf"]:
+            open("protein.{}".format(extension), "a").close()
+
+        result = cli_runner.invoke(
+            cli,
+            [
+                "generate",
+                "--module=namd/11",
+                "--host=draco",
+                "--name=protein",
+                "--skip-validation",
+                "--mdrun-option=-npme=0,2",
+                "--yes",
+            ],
+        )
+        assert result.exit_code == 1
+        assert "--mdrun-option is only supported for GROMACS modules." in result.output
+
+
+def test_generate_adaptive(cli_runner, tmpdir, data):
+    """Test that the node counts are searched adaptively."""
+    with open(os.path.join(data["analyze-files-gromacs"], "1", "bench.log")) as fh:
+        log = fh.read()
+
+    def finish(nodes, performance):
+        path = "draco_gromacs/2016/n{:03d}_r40_t01_woht_nsim1".format(nodes)
+        with open(os.path.join(path, "protein.log"), "w") as fh:
+            fh.write(log.replace("98.147", str(performance)))
+
+    def adaptive():
+        return cli_runner.invoke(
+            cli,
+            [
+                "generate",
+                "--module=gromacs/2016",
+                "--host=draco",
+                "--max-nodes=10",
+                "--ranks=40",
+                "--name=protein",
+                "--skip-validation",
+                "--adaptive",
+                "--yes",
+            ],
+        )
+
+    def nodes():
+        return sorted(treant.categories["nodes"] for treant in dtr.discover())
+
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+
+        result = adaptive()
+        assert result.exit_code == 0
+        assert nodes() == [1, 2, 4, 8]
+
+        # Nothing is generated while benchmarks are still running
+        finish(1, 100)
+        result = adaptive()
+        assert result.exit_code == 0
+        assert "3 benchmarks did not finish yet." in result.output
+        assert "No further benchmarks are needed." in result.output
+        assert nodes() == [1, 2, 4, 8]
+
+        for n, performance in [(2, 190), (4, 360), (8, 400)]:
+            finish(n, performance)
+        result = adaptive()
+        assert result.exit_code == 0
+        assert nodes() == [1, 2, 4, 6, 8]
+
+        finish(6, 380)
+        result = adaptive()
+        assert result.exit_code == 0
+        assert nodes() == [1, 2, 4, 5, 6, 8]
+
+        finish(5, 380)
+        result = adaptive()
+        assert result.exit_code == 0
+        assert (
+            "Finished the search for draco_gromacs/2016/r40_t01_woht_nsim1: "
+            "efficient up to 5 nodes."
+        ) in result.output
+        assert nodes() == [1, 2, 4, 5, 6, 8]
+
+
+def test_generate_repeats(cli_runner, tmpdir):
+    """Test that each benchmark is generated once per replicate."""
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+
+        result = cli_runner.invoke(
+            cli,
+            [
+                "generate",
+                "--module=gromacs/2016",
+                "--host=draco",
+                "--max-nodes=2",
+                "--ranks=40",
+                "--name=protein",
+                "--skip-validation",
+                "--repeats=3",
+                "--yes",
+            ],
+        )
+        assert result.exit_code == 0
+        assert "| 1-2     |" in result.output
+
+        bundle = dtr.discover()
+        assert len(bundle) == 6
+        assert sorted(treant.categories["repeat"] for treant in bundle) == [
+            1,
+            1,
+            2,
+            2,
+            3,
+            3,
+        ]
+        treant = dtr.Treant("draco_gromacs/2016/n002_r40_t01_woht_nsim1_rep3")
+        assert treant.categories["repeat"] == 3
+        assert treant.categories["nodes"] == 2
+
+
+def test_generate_without_repeats(cli_runner, tmpdir):
+    """Test that no replicates are created by default."""
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+        result = generate_files(cli_runner)
+
+        assert result.exit_code == 0
+        for treant in dtr.discover():
+            assert treant.categories["repeat"] == 0
+            assert "_rep" not in treant.name
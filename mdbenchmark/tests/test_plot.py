@@ -19,6 +19,7 @@
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
 import os
 
+import numpy as np
 import pandas as pd
 import pytest
 from pandas.testing import assert_frame_equal
@@ -279,3 +280,60 @@ def test_plot_filter_empty_dataframe_error(cli_runner, capsys, tmpdir, data):
         assert out == expected_output
         assert error.type == SystemExit
         assert error.value.code == 1
+
+
+def test_plot_over_group_mdrun_options(tmpdir):
+    """Test that each combination of mdrun options is plotted separately."""
+    from matplotlib.figure import Figure
+
+    df = pd.DataFrame(
+        {
+            "module": ["gromacs/2018"] * 4,
+            "nodes": [1, 2, 1, 2],
+            "performance": [10.0, 18.0, 12.0, 20.0],
+            "use_gpu": [False] * 4,
+            "host": ["draco"] * 4,
+            "ncores": [32, 64, 32, 64],
+            "number_of_ranks": [32] * 4,
+            "number_of_threads": [1] * 4,
+            "hyperthreading": [False] * 4,
+            "multidir": [1] * 4,
+            "mdrun_options": [np.nan, np.nan, "-npme 2", "-npme 2"],
+        }
+    )
+    ax = Figure().add_subplot(111)
+    plot.plot_over_group(
+        df, plot_cores=False, fit=False, performance_column="performance", ax=ax
+    )
+
+    _, labels = ax.get_legend_handles_labels()
+    assert labels == [
+        "draco - gromacs/2018, CPU-only (ranks: 32, threads: 1, nsims: 1)",
+        "draco - gromacs/2018, CPU-only (ranks: 32, threads: 1, nsims: 1) -npme 2",
+    ]
+
+
+def test_plot_line_error_bars():
+    """Test that error bars are drawn for replicated benchmarks."""
+    from matplotlib.figure import Figure
+
+    df = pd.DataFrame(
+        {
+            "nodes": [1, 2, 4],
+            "performance": [10.0, 18.0, np.nan],
+            "performance_std": [0.5, np.nan, np.nan],
+        }
+    )
+    ax = Figure().add_subplot(111)
+    plot.plot_line(df, "nodes", label="test", fit=False, ax=ax)
+
+    assert len(ax.containers) == 1
+    _, _, (bars,) = ax.containers[0]
+    segments = bars.get_segments()
+    assert len(segments) == 2
+    np.testing.assert_allclose(segments[0], [[1, 9.5], [1, 10.5]])
+    np.testing.assert_allclose(segments[1], [[2, 18.0], [2, 18.0]])
+
+    ax = Figure().add_subplot(111)
+    plot.plot_line(df.drop(columns="performance_std"), "nodes", "test", False, ax=ax)
+    assert not ax.containers
@@ -0,0 +1,104 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import pstats
+
+import pytest
+
+from mdbenchmark import cli, profiling
+
+
+def test_phase_disabled():
+    """Test that nothing is recorded without profiling."""
+    with profiling.phase("parse"):
+        pass
+
+    assert not profiling.is_enabled()
+    assert "parse" not in profiling._durations
+
+
+def test_phase_timings():
+    profiling.start("timings", command="analyze")
+    try:
+        for _ in range(3):
+            with profiling.phase("parse"):
+                pass
+        with profiling.phase("custom"):
+            pass
+        assert profiling._calls == {"parse": 3, "custom": 1}
+
+        table = profiling.format_timings(1.5)
+    finally:
+        profiling.stop()
+
+    lines = table.splitlines()
+    assert lines[0] == "Timings of analyze:"
+    assert lines[4].split()[1:3] == ["parse", "|"]
+    assert lines[5].split()[1] == "custom"
+    assert "| total (wall clock) |" in lines[6] and "1.500" in lines[6]
+    assert not profiling.is_enabled()
+
+
+@pytest.mark.parametrize(
+    "args", [["--profile"], ["--profile=timings"], ["--profile", "timings"]]
+)
+def test_profile_timings(cli_runner, tmpdir, data, args):
+    """Test that the phases of a subcommand are printed at exit."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            args + ["analyze", "--directory={}".format(data["analyze-files-gromacs"])],
+        )
+
+        assert result.exit_code == 0
+        output = result.output[result.output.index("Timings of analyze:") :]
+        for phase in ["import", "discover", "parse", "aggregate", "total"]:
+            assert "| {}".format(phase) in output
+        assert not profiling.is_enabled()
+
+
+def test_profile_cprofile(cli_runner, tmpdir, data):
+    """Test that a cProfile file is written."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "--profile=cprofile",
+                "analyze",
+                "--directory={}".format(data["analyze-files-gromacs"]),
+            ],
+        )
+
+        assert result.exit_code == 0
+        filenames = [f for f in os.listdir(".") if f.endswith(".prof")]
+        assert len(filenames) == 1
+        assert filenames[0].startswith("mdbenchmark-analyze-")
+        assert "Profile written to {}.".format(filenames[0]) in result.output
+        assert pstats.Stats(filenames[0]).total_calls > 0
+
+
+def test_profile_on_error(cli_runner, tmpdir):
+    """Test that timings are printed even if the subcommand fails."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli, ["--profile", "submit"])
+
+        assert result.exit_code == 1
+        assert "ERROR No benchmarks found." in result.output
+        assert "Timings of submit:" in result.output
@@ -0,0 +1,164 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import shutil
+
+import datreant as dtr
+import numpy as np
+import pandas as pd
+import pytest
+
+from mdbenchmark import cli
+from mdbenchmark.cli.recommend import format_job_settings
+
+
+@pytest.mark.parametrize(
+    "row, lines",
+    [
+        (
+            {"module": "gromacs/2018", "nodes": 2.0, "number_of_ranks": np.nan},
+            ["#SBATCH --nodes=2", "srun gmx_mpi mdrun"],
+        ),
+        (
+            {"module": "GROMACS/2020", "nodes": 1, "number_of_ranks": np.nan},
+            ["#SBATCH --nodes=1", "srun gmx_mpi mdrun"],
+        ),
+        (
+            {
+                "module": "gromacs/2018",
+                "nodes": 4,
+                "number_of_ranks": 20,
+                "number_of_threads": 4,
+                "hyperthreading": True,
+                "multidir": 2,
+                "mdrun_options": "-npme 2",
+            },
+            [
+                "#SBATCH --nodes=4",
+                "#SBATCH --ntasks-per-node=20",
+                "#SBATCH --cpus-per-task=4",
+                "#SBATCH --ntasks-per-core=2",
+                "export OMP_NUM_THREADS=4",
+                "srun gmx_mpi mdrun -ntomp $OMP_NUM_THREADS -multidir a b -npme 2",
+            ],
+        ),
+        (
+            {
+                "module": "namd/2.12",
+                "nodes": 1,
+                "number_of_ranks": 40,
+                "number_of_threads": 1,
+                "hyperthreading": False,
+                "multidir": 1,
+                "mdrun_options": np.nan,
+            },
+            [
+                "#SBATCH --nodes=1",
+                "#SBATCH --ntasks-per-node=40",
+                "#SBATCH --cpus-per-task=1",
+                "export OMP_NUM_THREADS=1",
+            ],
+        ),
+    ],
+)
+def test_format_job_settings(row, lines):
+    assert format_job_settings(pd.Series(row)) == lines
+
+
+@pytest.fixture
+def benchmarks(tmpdir, data):
+    """Version 3 benchmarks of GROMACS on 1 to 5 nodes."""
+    directory = tmpdir.join("benchmarks")
+    shutil.copytree(data["analyze-files-gromacs"], str(directory))
+    for treant in dtr.discover(str(directory)):
+        treant.categories.add(
+            version=3, ranks=16, threads=2, hyperthreading=False, multidir=1
+        )
+    return directory
+
+
+def test_recommend(cli_runner, tmpdir, benchmarks):
+    """Test that the Pareto-optimal benchmarks meeting all constraints are
+    recommended."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "recommend",
+                "--directory={}".format(benchmarks),
+                "--max-nodes=4",
+                "--min-throughput=150",
+                "--max-cost=0.35",
+            ],
+        )
+    assert result.exit_code == 0
+    assert (
+        "Found 2 configurations where no other configuration on the same host, "
+        "module and GPU usage is both faster and cheaper:"
+    ) in result.output
+    assert (
+        "draco - gromacs/2016.3, CPU-only: 226.108 ns/day for 0.318 node-hours/ns\n"
+        "  #SBATCH --nodes=3\n"
+        "  #SBATCH --ntasks-per-node=16\n"
+        "  #SBATCH --cpus-per-task=2\n"
+        "  export OMP_NUM_THREADS=2\n"
+        "  srun gmx_mpi mdrun -ntomp $OMP_NUM_THREADS\n"
+    ) in result.output
+    assert "--nodes=2" in result.output
+    assert "--nodes=1" not in result.output
+    assert "--nodes=4" not in result.output
+
+
+def test_recommend_csv(cli_runner, tmpdir, data):
+    """Test that results can be read from CSV files of analyze."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "analyze",
+                "--directory={}".format(data["analyze-files-gromacs"]),
+                "--save-csv=results.csv",
+            ],
+        )
+        assert result.exit_code == 0
+
+        result = cli_runner.invoke(
+            cli, ["recommend", "--csv=results.csv", "--min-throughput=250"]
+        )
+    assert result.exit_code == 0
+    assert "254.266 ns/day for 0.472 node-hours/ns" in result.output
+    assert "  #SBATCH --nodes=5\n  srun gmx_mpi mdrun\n" in result.output
+
+
+def test_recommend_no_benchmarks(cli_runner, tmpdir, benchmarks):
+    """Test the error if no benchmark meets the constraints."""
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(
+            cli,
+            [
+                "recommend",
+                "--directory={}".format(benchmarks),
+                "--max-nodes=1",
+                "--min-throughput=150",
+            ],
+        )
+    assert result.exit_code == 1
+    assert result.output.endswith(
+        "ERROR None of the benchmarks meets the constraints.\n"
+    )
@@ -0,0 +1,140 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import math
+
+import numpy as np
+import pytest
+
+from mdbenchmark import scaling
+
+
+@pytest.mark.parametrize(
+    "min_nodes, max_nodes, nodes",
+    [(1, 1, [1]), (1, 5, [1, 2, 4]), (1, 8, [1, 2, 4, 8]), (3, 20, [3, 6, 12])],
+)
+def test_geometric_nodes(min_nodes, max_nodes, nodes):
+    assert scaling.geometric_nodes(min_nodes, max_nodes) == nodes
+
+
+def test_parallel_efficiency():
+    efficiencies = scaling.parallel_efficiency(
+        [2, 1, 4, 8], [180.0, 100.0, float("nan"), 400.0]
+    )
+
+    assert efficiencies[:2] == [0.9, 1.0]
+    assert math.isnan(efficiencies[2])
+    assert efficiencies[3] == 0.5
+
+
+@pytest.mark.parametrize("performance", [[math.nan, math.nan], [0.0, 10.0]])
+def test_parallel_efficiency_without_base(performance):
+    assert all(math.isnan(e) for e in scaling.parallel_efficiency([1, 2], performance))
+
+
+@pytest.mark.parametrize(
+    "performance, max_nodes, nodes",
+    [
+        ({}, 10, [1, 2, 4, 8]),
+        # Bisect between the last efficient and the first inefficient count
+        ({1: 100, 2: 190, 4: 360, 8: 400}, 10, [6]),
+        ({1: 100, 2: 190, 4: 360, 6: 500, 8: 400}, 10, [7]),
+        ({1: 100, 2: 190, 4: 360, 6: 500, 7: 450, 8: 400}, 10, []),
+        ({1: 100, 2: 100, 4: 360}, 10, []),
+        # Continue with more nodes, if all benchmarks are efficient
+        ({1: 100, 2: 190, 4: 360, 8: 700}, 10, [10]),
+        ({1: 100, 2: 190, 4: 360, 8: 700}, 8, []),
+        ({1: 100, 2: 190}, 10, [4]),
+    ],
+)
+def test_next_nodes(performance, max_nodes, nodes):
+    assert scaling.next_nodes(performance, 1, max_nodes, threshold=0.7) == nodes
+
+
+def test_efficient_nodes():
+    performance = {1: 100, 2: 190, 4: 360, 6: 500, 7: 450, 8: 400}
+
+    assert scaling.efficient_nodes(performance, threshold=0.7) == 6
+    assert scaling.efficient_nodes(performance, threshold=0.9) == 4
+    assert scaling.efficient_nodes({3: 10}) == 3
+
+
+def synthetic_performance(nodes, serial=0.1, parallel=0.9, communication=0.0):
+    """Return the performance in ns/day for a known time per nanosecond."""
+    nodes = np.asarray(nodes, dtype=float)
+    return 1 / (serial + parallel / nodes + communication * np.log2(nodes))
+
+
+@pytest.mark.parametrize(
+    "model, coefficients",
+    [("amdahl", [0.1, 0.9]), ("communication", [0.1, 0.9, 0.05])],
+)
+def test_fit_model(model, coefficients):
+    nodes = [1, 2, 4, 8, 16]
+    performance = synthetic_performance(nodes, *coefficients)
+
+    fitted = scaling.fit_model(nodes, performance, model)
+
+    np.testing.assert_allclose(fitted, coefficients, atol=1e-10)
+    np.testing.assert_allclose(
+        scaling.predict(fitted, model, [32, 64]),
+        synthetic_performance([32, 64], *coefficients),
+    )
+
+
+def test_fit_model_non_negative():
+    """Test that performance that grows superlinearly does not give a negative
+    serial part."""
+    fitted = scaling.fit_model([1, 2, 4], [100, 210, 450], "amdahl")
+
+    assert (fitted >= 0).all()
+    assert scaling.serial_fraction(fitted) == 0
+
+
+def test_fit_model_too_few_benchmarks():
+    assert scaling.fit_model([1, 1, 2], [10, 11, 19], "communication") is None
+    assert scaling.fit_model([1, 2, 4], [10, np.nan, 30], "communication") is None
+    assert scaling.fit_model([1, 2], [10, 19], "amdahl") is not None
+
+
+def test_serial_fraction():
+    assert scaling.serial_fraction(np.array([0.1, 0.3])) == pytest.approx(0.25)
+    assert scaling.serial_fraction(np.array([0.1, 0.3, 2.0])) == pytest.approx(0.25)
+    assert math.isnan(scaling.serial_fraction(np.array([0.0, 0.0, 1.0])))
+
+
+@pytest.mark.parametrize(
+    "coefficients, model, min_nodes, efficient",
+    [
+        # E(n) = 1 / (0.1 n + 0.9) >= 0.7 up to n = 5.29
+        ([0.1, 0.9], "amdahl", 1, 5),
+        ([0.01, 0.99], "amdahl", 1, 43),
+        # E(n) = 1.1 / (0.1 n + 0.9) relative to 2 nodes
+        ([0.1, 0.9], "amdahl", 2, 6),
+        ([0.1, 0.9, 0.05], "communication", 1, 2),
+        ([0.0, 1.0], "amdahl", 1, scaling.MAX_PREDICTED_NODES),
+    ],
+)
+def test_predicted_efficient_nodes(coefficients, model, min_nodes, efficient):
+    assert (
+        scaling.predicted_efficient_nodes(
+            np.array(coefficients), model, min_nodes, threshold=0.7
+        )
+        == efficient
+    )
@@ -0,0 +1,277 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from mdbenchmark import schedulers
+from mdbenchmark.schedulers import (
+    FINISHED,
+    PENDING,
+    RUNNING,
+    FakeScheduler,
+    LoadLevelerScheduler,
+    LocalScheduler,
+    SGEScheduler,
+    SlurmScheduler,
+)
+
+SQUEUE_OUTPUT = """\
+1001 RUNNING
+1002 PENDING
+1003_0 RUNNING
+1003_1 PENDING
+"""
+
+QSTAT_OUTPUT = """\
+job-ID  prior   name       user         state submit/start at     queue                          slots ja-task-ID
+-----------------------------------------------------------------------------------------------------------------
+   2001 0.55500 bench      user         r     05/04/2020 10:00:00 all.q@node01                       1
+   2002 0.00000 bench      user         qw    05/04/2020 10:00:00                                    1
+   2003 0.55500 bench      user         r     05/04/2020 10:00:00 all.q@node02                       1 1
+   2003 0.00000 bench      user         qw    05/04/2020 10:00:00                                    1 2-3:1
+"""
+
+LLQ_OUTPUT = """\
+Id                       Owner      Submitted   ST PRI Class        Running On
+------------------------ ---------- ----------- -- --- ------------ -----------
+hydra01.3001.0           user        5/4  10:00 R  50  parallel     hydra0101
+hydra01.3002.0           user        5/4  10:00 I  50  parallel
+
+2 job step(s) in queue, 1 waiting, 0 pending, 1 running, 0 held, 0 preempted
+"""
+
+
+@pytest.mark.parametrize(
+    "scheduler, output, job_id",
+    [
+        (SlurmScheduler, "Submitted batch job 1234\n", "1234"),
+        (SGEScheduler, 'Your job 1234 ("bench") has been submitted\n', "1234"),
+        (
+            SGEScheduler,
+            'Your job-array 1234.1-4:1 ("bench") has been submitted\n',
+            "1234",
+        ),
+        (
+            LoadLevelerScheduler,
+            'llsubmit: The job "hydra01.1234" has been submitted.\n',
+            "hydra01.1234",
+        ),
+        (SlurmScheduler, "sbatch: error: Batch job submission failed\n", None),
+    ],
+)
+def test_parse_job_id(scheduler, output, job_id):
+    assert scheduler().parse_job_id(output) == job_id
+
+
+@pytest.mark.parametrize(
+    "scheduler, output, expected",
+    [
+        (
+            SlurmScheduler,
+            SQUEUE_OUTPUT,
+            {
+                "1001": RUNNING,
+                "1002": PENDING,
+                "1003_0": RUNNING,
+                "1003_1": PENDING,
+                "1000": FINISHED,
+            },
+        ),
+        (
+            SGEScheduler,
+            QSTAT_OUTPUT,
+            {
+                "2001": RUNNING,
+                "2002": PENDING,
+                "2003.1": RUNNING,
+                "2003.2": PENDING,
+                "2003.3": PENDING,
+                "2003.4": FINISHED,
+            },
+        ),
+        (
+            LoadLevelerScheduler,
+            LLQ_OUTPUT,
+            {
+                "hydra01.3001": RUNNING,
+                "hydra01.3002": PENDING,
+                "hydra01.3000": FINISHED,
+            },
+        ),
+    ],
+)
+def test_status(monkeypatch, scheduler, output, expected):
+    """Test that the queue is queried once and missing jobs are finished."""
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 0, output)
+
+    monkeypatch.setattr(schedulers.subprocess, "run", run)
+
+    assert scheduler().status(list(expected)) == expected
+    assert len(calls) == 1
+    assert calls[0][0] == scheduler.status_command[0]
+
+
+def test_status_failure(monkeypatch):
+    monkeypatch.setattr(
+        schedulers.subprocess,
+        "run",
+        lambda args, **kwargs: subprocess.CompletedProcess(args, 1, ""),
+    )
+    assert SlurmScheduler().status(["1001"]) is None
+
+
+def test_submit_and_cancel(monkeypatch):
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append((args, kwargs.get("cwd")))
+        return subprocess.CompletedProcess(args, 0, "Submitted batch job 42\n")
+
+    monkeypatch.setattr(schedulers.subprocess, "run", run)
+
+    scheduler = SlurmScheduler()
+    assert scheduler.submit("bench.job", "some/dir") == (True, "42")
+    assert scheduler.array_task_id("42", 3) == "42_3"
+    assert scheduler.cancel(["42", "43"])
+    assert calls == [
+        (["sbatch", "bench.job"], "some/dir"),
+        (["scancel", "42", "43"], None),
+    ]
+
+
+def test_submit_missing_command(monkeypatch):
+    def run(args, **kwargs):
+        raise FileNotFoundError(args[0])
+
+    monkeypatch.setattr(schedulers.subprocess, "run", run)
+    assert SGEScheduler().submit("bench.job", ".") == (False, None)
+
+
+def test_fake_scheduler():
+    scheduler = FakeScheduler(fail=lambda script, cwd: cwd == "fail")
+
+    assert scheduler.submit("bench.job", "a") == (True, "1")
+    assert scheduler.submit("bench.job", "fail") == (False, None)
+    assert scheduler.submit("bench.job", "b") == (True, "2")
+
+    scheduler.jobs["2"] = RUNNING
+    assert scheduler.status(["1", "2", "3"]) == {
+        "1": PENDING,
+        "2": RUNNING,
+        "3": FINISHED,
+    }
+
+    scheduler.cancel(["1"])
+    assert scheduler.status(["1"]) == {"1": FINISHED}
+
+
+def test_detect_scheduler(monkeypatch):
+    monkeypatch.setattr(schedulers.shutil, "which", lambda x: None)
+    assert schedulers.detect_scheduler() is None
+
+    monkeypatch.setattr(
+        schedulers.shutil,
+        "which",
+        lambda x: "/usr/bin/llsubmit" if x == "llsubmit" else None,
+    )
+    assert isinstance(schedulers.detect_scheduler(), LoadLevelerScheduler)
+
+
+def write_job(directory, script, **categories):
+    os.makedirs(os.path.join(directory, ".datreant"))
+    with open(os.path.join(directory, ".datreant", "categories.json"), "w") as fh:
+        fh.write(json.dumps(categories))
+    with open(os.path.join(directory, "bench.job"), "w") as fh:
+        fh.write(script)
+
+
+def test_local_scheduler(tmpdir):
+    """Test that job scripts are run and pinned to the reserved CPUs."""
+    cpus = schedulers.available_cpus()[:1]
+    directory = str(tmpdir.join("bench"))
+    write_job(
+        directory,
+        "echo $OMP_NUM_THREADS\n"
+        '{} -c "import os; print(sorted(os.sched_getaffinity(0)))"\n'.format(
+            sys.executable
+        ),
+        name="protein",
+        job_name="job",
+        nodes=1,
+        ranks=1,
+        threads=1,
+    )
+
+    scheduler = LocalScheduler(cpus=cpus)
+    assert scheduler.submit("bench.job", directory) == (True, "1")
+    with open(os.path.join(directory, "job.out.1")) as fh:
+        output = fh.read().split("\n")
+    assert output[0] == "1"
+    if hasattr(os, "sched_getaffinity"):
+        assert output[1] == str(cpus)
+    assert scheduler.status(["1"]) == {"1": FINISHED}
+
+    # Failing job scripts and jobs that need too many CPUs are not successful
+    with open(os.path.join(directory, "bench.job"), "w") as fh:
+        fh.write("exit 1\n")
+    assert scheduler.submit("bench.job", directory) == (False, "2")
+    write_job(str(tmpdir.join("large")), "", nodes=1, ranks=2, threads=1)
+    assert scheduler.submit("bench.job", str(tmpdir.join("large"))) == (False, None)
+
+
+def test_local_scheduler_disjoint_cpus():
+    """Test that reserved CPUs are never handed out twice."""
+    scheduler = LocalScheduler(cpus=[0, 1, 2])
+    first = scheduler._reserve(2)
+    assert first == [0, 1]
+
+    reserved = []
+    thread = threading.Thread(target=lambda: reserved.append(scheduler._reserve(2)))
+    thread.start()
+    time.sleep(0.05)
+    # Only a single CPU is free, so the second job has to wait
+    assert reserved == []
+
+    scheduler._release(first)
+    thread.join(timeout=1)
+    assert reserved == [[0, 1]]
+    assert scheduler._free_cpus == [2]
+
+
+@pytest.mark.parametrize(
+    "categories, cpus",
+    [
+        ({"nodes": 1, "ranks": 4, "threads": 2}, 8),
+        ({"nodes": 2, "ranks": 4, "threads": 1}, 8),
+        ({"nodes": 1}, None),
+    ],
+)
+def test_local_scheduler_cpus_required(categories, cpus):
+    assert LocalScheduler.cpus_required(categories) == cpus
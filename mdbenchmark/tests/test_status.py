@@ -0,0 +1,95 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+from mdbenchmark import cli
+from mdbenchmark.cli import status, submit
+from mdbenchmark.discover import discover
+from mdbenchmark.schedulers import RUNNING, FakeScheduler
+
+
+def generate_benchmarks(cli_runner):
+    open("protein.tpr", "a").close()
+    for module in ["gromacs/2018.3", "gromacs/2019.1"]:
+        result = cli_runner.invoke(
+            cli,
+            [
+                "generate",
+                "--module={}".format(module),
+                "--host=draco",
+                "--max-nodes=2",
+                "--name=protein",
+                "--skip-validation",
+                "--yes",
+            ],
+        )
+        assert result.exit_code == 0
+
+
+def test_status(cli_runner, tmpdir, monkeypatch):
+    """Test that the states of each sweep are counted."""
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(submit, "get_scheduler", lambda local=False: scheduler)
+    monkeypatch.setattr(status, "detect_scheduler", lambda: scheduler)
+
+    with tmpdir.as_cwd():
+        generate_benchmarks(cli_runner)
+        result = cli_runner.invoke(
+            cli, ["submit", "--directory=draco_gromacs/2018.3", "--yes"]
+        )
+        assert result.exit_code == 0
+
+        # The first job is running, the second one finished
+        scheduler.jobs["1"] = RUNNING
+        scheduler.jobs.pop("2")
+
+        result = cli_runner.invoke(cli, ["status"])
+        assert result.exit_code == 0
+        assert result.output.splitlines()[4:6] == [
+            "| draco_gromacs/2018.3 |            2 |               0 |"
+            "         0 |         1 |          1 |         0 |",
+            "| draco_gromacs/2019.1 |            2 |               2 |"
+            "         0 |         0 |          0 |         0 |",
+        ]
+
+
+def test_status_unknown(cli_runner, tmpdir, monkeypatch, capsys):
+    """Test that benchmarks without a job ID or batch system are unknown."""
+    with tmpdir.as_cwd():
+        generate_benchmarks(cli_runner)
+        benchmarks = discover(".")
+        benchmarks[0].treant.categories["started"] = True
+        benchmarks[1].treant.categories["started"] = True
+        benchmarks[1].treant.categories["job_id"] = "1"
+
+        states = status.query_states(discover("."), None)
+        out, _ = capsys.readouterr()
+        assert states == [
+            status.UNKNOWN,
+            status.UNKNOWN,
+            status.NOT_SUBMITTED,
+            status.NOT_SUBMITTED,
+        ]
+        assert "Cannot query the state of submitted benchmarks." in out
+
+
+def test_status_no_benchmarks(cli_runner, tmpdir):
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli, ["status"])
+        assert result.exit_code == 1
+        assert result.output == "ERROR No benchmarks found.\n"
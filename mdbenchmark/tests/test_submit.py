@@ -17,36 +17,38 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import subprocess
+
 import datreant as dtr
 import pandas as pd
 import pytest
 
-from mdbenchmark import cli
-from mdbenchmark.cli.submit import get_batch_command
+from mdbenchmark import cli, schedulers
+from mdbenchmark.cli import submit
+from mdbenchmark.cli.submit import RateLimiter, get_scheduler
+from mdbenchmark.discover import discover
 from mdbenchmark.mdengines import gromacs
+from mdbenchmark.schedulers import FakeScheduler, SlurmScheduler
 from mdbenchmark.utils import map_columns, print_dataframe
 from mdbenchmark.versions import Version2Categories
 
 
-@pytest.mark.skip(reason="monkeypatching is a problem. skip for now.")
-def test_get_batch_command(capsys, monkeypatch, tmpdir):
-    """Test that the get_engine_command works correctly.
-
-    It should exit if no batching system was found.
-    """
-    # Test fail state
-    output = (
+def test_get_scheduler(capsys, monkeypatch):
+    """Test that get_scheduler exits if no batching system was found."""
+    monkeypatch.setattr(schedulers.shutil, "which", lambda x: None)
+    with pytest.raises(SystemExit):
+        get_scheduler()
+    out, _ = capsys.readouterr()
+    assert out == (
         "ERROR Was not able to find a batch system. "
         "Are you trying to use this package on a host with a queuing system?\n"
     )
-    with pytest.raises(SystemExit):
-        get_batch_command()
-        out, _ = capsys.readouterr()
-        assert out == output
 
-    # Test non-fail state
-    monkeypatch.setattr("mdbenchmark.cli.submit.glob", lambda x: ["qsub"])
-    assert get_batch_command()
+    monkeypatch.setattr(
+        schedulers.shutil, "which", lambda x: "/usr/bin/qsub" if x == "qsub" else None
+    )
+    assert get_scheduler().name == "sge"
 
 
 @pytest.mark.skip(reason="monkeypatching is a problem. skip for now.")
@@ -181,3 +183,240 @@ def test_submit_test_prompt_yes(cli_runner, tmpdir, data, monkeypatch):
         # TODO: We need to clean up all of our unit tests...
         treant = dtr.Bundle(data["analyze-files-gromacs-one-unstarted"] + "/1")
         treant.categories["started"] = False
+
+
+def generate_benchmarks(cli_runner, host="draco"):
+    open("protein.tpr", "a").close()
+    result = cli_runner.invoke(
+        cli,
+        [
+            "generate",
+            "--module=gromacs/2018.3",
+            "--host={}".format(host),
+            "--max-nodes=2",
+            "--ranks=20",
+            "--ranks=40",
+            "--multidir=1",
+            "--multidir=2",
+            "--name=protein",
+            "--skip-validation",
+            "--yes",
+        ],
+    )
+    assert result.exit_code == 0
+
+
+def test_group_array_jobs(cli_runner, tmpdir):
+    """Test that only benchmarks with the same resources are grouped."""
+    with tmpdir.as_cwd():
+        generate_benchmarks(cli_runner)
+        groups = submit.group_array_jobs(discover("."))
+
+        assert len(groups) == 4
+        for group in groups:
+            assert len(group) == 2
+            assert len({b.categories["nodes"] for b in group}) == 1
+            assert len({b.categories["ranks"] for b in group}) == 1
+
+
+def test_group_array_jobs_different_commands(cli_runner, tmpdir):
+    """Test that benchmarks with different modules, mdrun options and
+    replicates share a job array."""
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+        result = cli_runner.invoke(
+            cli,
+            [
+                "generate",
+                "--module=gromacs/2018.3",
+                "--module=gromacs/2019.1",
+                "--host=draco",
+                "--max-nodes=3",
+                "--ranks=20",
+                "--name=protein",
+                "--mdrun-option=-npme=0,2",
+                "--repeats=2",
+                "--skip-validation",
+                "--yes",
+            ],
+        )
+        assert result.exit_code == 0
+
+        groups = submit.group_array_jobs(discover("."))
+        assert len(groups) == 3
+        for group in groups:
+            assert len(group) == 8
+            assert len({b.categories["nodes"] for b in group}) == 1
+
+
+def test_write_array_job(cli_runner, tmpdir):
+    with tmpdir.as_cwd():
+        generate_benchmarks(cli_runner)
+        group = submit.group_array_jobs(discover("."))[0]
+        script = submit.write_array_job(group, str(tmpdir), 3)
+
+        assert script == str(tmpdir.join("draco_003.job"))
+        with open(str(tmpdir.join("draco_003.txt"))) as fh:
+            assert fh.read().split() == [b.abspath for b in group]
+        with open(script) as fh:
+            content = fh.read()
+        assert "#SBATCH --array=0-1\n" in content
+        assert str(tmpdir.join("draco_003.txt")) in content
+        assert content.endswith("\nbash -l ./bench.job")
+        assert "gmx_mpi" not in content
+
+
+def test_write_array_job_unsupported_template(cli_runner, tmpdir, capsys):
+    with tmpdir.as_cwd():
+        generate_benchmarks(cli_runner, host="hydra")
+        group = submit.group_array_jobs(discover("."))[0]
+        with pytest.raises(SystemExit):
+            submit.write_array_job(group, str(tmpdir), 0)
+
+        out, _ = capsys.readouterr()
+        assert "The host template hydra does not support job arrays." in out
+
+
+def test_submit_array(cli_runner, tmpdir, monkeypatch):
+    """Test that job IDs are stored and failed submissions are not started."""
+    scheduler = FakeScheduler(fail=lambda script, cwd: script == "draco_001.job")
+    monkeypatch.setattr(submit, "get_scheduler", lambda local=False: scheduler)
+
+    with tmpdir.as_cwd():
+        generate_benchmarks(cli_runner)
+        result = cli_runner.invoke(cli, ["submit", "--array", "--yes"])
+        assert result.exit_code == 1
+        assert "Submitting 8 benchmarks as 4 job arrays." in result.output
+        assert "ERROR Could not submit 2 of 8 benchmarks" in result.output
+        assert len(scheduler.submitted) == 4
+
+        benchmarks = discover(".")
+        started = [b for b in benchmarks if b.categories["started"]]
+        assert len(started) == 6
+        job_ids = sorted(b.categories["job_id"] for b in started)
+        assert job_ids == ["1_0", "1_1", "2_0", "2_1", "3_0", "3_1"]
+        assert all("job_id" not in b.categories for b in benchmarks if b not in started)
+        assert os.path.isdir(submit.ARRAY_DIRECTORY)
+
+
+def test_submit_jobs(cli_runner, tmpdir, monkeypatch):
+    """Test that only successfully submitted benchmarks are marked as started."""
+    calls = []
+
+    def run(args, cwd, **kwargs):
+        calls.append(cwd)
+        if "n001_r20" in cwd and "nsim1" in cwd:
+            return subprocess.CompletedProcess(args, 1, "")
+        job_id = sorted(os.listdir(os.path.dirname(cwd))).index(os.path.basename(cwd))
+        return subprocess.CompletedProcess(
+            args, 0, "Submitted batch job {}\n".format(job_id)
+        )
+
+    monkeypatch.setattr(schedulers.subprocess, "run", run)
+    monkeypatch.setattr(submit, "get_scheduler", lambda local=False: SlurmScheduler())
+
+    with tmpdir.as_cwd():
+        generate_benchmarks(cli_runner)
+        result = cli_runner.invoke(
+            cli, ["submit", "--yes", "--jobs=4", "--rate-limit=1000"]
+        )
+        assert result.exit_code == 1
+        assert "ERROR Could not submit 1 of 8 benchmarks" in result.output
+        assert "n001_r20_t02_woht_nsim1" in result.output
+        assert len(calls) == 8
+
+        for benchmark in discover("."):
+            failed = "n001_r20" in benchmark.name and "nsim1" in benchmark.name
+            assert benchmark.categories["started"] is not failed
+            if not failed:
+                assert benchmark.categories["job_id"] == str(
+                    sorted(os.listdir(os.path.dirname(benchmark.abspath))).index(
+                        benchmark.name
+                    )
+                )
+
+        # Only the failed benchmark is submitted again
+        calls.clear()
+        result = cli_runner.invoke(cli, ["submit", "--yes"])
+        assert len(calls) == 1
+        assert "n001_r20_t02_woht_nsim1" in calls[0]
+
+
+def test_submit_rate_limit_validation(cli_runner, tmpdir):
+    with tmpdir.as_cwd():
+        result = cli_runner.invoke(cli, ["submit", "--rate-limit=0"])
+        assert result.exit_code == 2
+        assert "The rate limit must be a positive number." in result.output
+
+
+def test_rate_limiter(monkeypatch):
+    now = [100.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(submit.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(submit.time, "sleep", sleep)
+
+    limiter = RateLimiter(rate=4)
+    for _ in range(3):
+        limiter.wait()
+    assert sleeps == [0.25, 0.25]
+
+    # Waiting longer than the interval does not allow bursts afterwards
+    now[0] += 10
+    limiter.wait()
+    limiter.wait()
+    assert sleeps == [0.25, 0.25, 0.25]
+
+
+def test_submit_local(cli_runner, tmpdir):
+    """Test that benchmarks are run on this machine."""
+    with tmpdir.as_cwd():
+        open("protein.tpr", "a").close()
+        result = cli_runner.invoke(
+            cli,
+            [
+                "generate",
+                "--module=gromacs/2018.3",
+                "--host=local",
+                "--max-nodes=1",
+                "--physical-cores=1",
+                "--logical-cores=1",
+                "--ranks=1",
+                "--name=protein",
+                "--skip-validation",
+                "--yes",
+            ],
+        )
+        assert result.exit_code == 0
+
+        benchmark = discover(".")[0]
+        with open(os.path.join(benchmark.abspath, "bench.job")) as fh:
+            assert "gmx mdrun -v -ntmpi 1 -ntomp $OMP_NUM_THREADS" in fh.read()
+        with open(os.path.join(benchmark.abspath, "bench.job"), "w") as fh:
+            fh.write("echo running\n")
+
+        result = cli_runner.invoke(cli, ["submit", "--local", "--yes"])
+        assert result.exit_code == 0
+        assert "Finished running all benchmarks." in result.output
+
+        benchmark = discover(".")[0]
+        assert benchmark.categories["started"]
+        job_id = benchmark.categories["job_id"]
+        with open(os.path.join(benchmark.abspath, "protein.out." + job_id)) as fh:
+            assert fh.read() == "running\n"
+
+
+def test_submit_local_too_many_cpus(cli_runner, tmpdir, monkeypatch):
+    monkeypatch.setattr(schedulers, "available_cpus", lambda: [0])
+    with tmpdir.as_cwd():
+        generate_benchmarks(cli_runner, host="local")
+        result = cli_runner.invoke(cli, ["submit", "--local", "--yes"])
+        assert result.exit_code == 1
+        assert (
+            "ERROR The benchmark local_gromacs/2018.3/n001_r20_t02_woht_nsim1 "
+            "needs 40 CPUs, but only 1 are available."
+        ) in result.output
@@ -0,0 +1,115 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+import os
+
+import numpy as np
+import pytest
+
+from mdbenchmark import timeseries
+
+
+def series(performance):
+    """Return a performance time series with one interval per minute."""
+    return np.column_stack([np.arange(1, len(performance) + 1), performance])
+
+
+def test_throughput_filename():
+    assert timeseries.throughput_filename(
+        os.path.join("a", "protein.log")
+    ) == os.path.join("a", ".protein.throughput.npy")
+
+
+def test_load_throughput(tmpdir):
+    """Test that the time series is stored and only parsed again on changes."""
+    log = tmpdir.join("protein.log")
+    log.write("log")
+    calls = []
+
+    def parse(filename):
+        calls.append(filename)
+        return series([100.0, 110.0])
+
+    throughput = timeseries.load_throughput(parse, str(log))
+    np.testing.assert_equal(throughput, series([100.0, 110.0]))
+    assert tmpdir.join(".protein.throughput.npy").check()
+
+    np.testing.assert_equal(timeseries.load_throughput(parse, str(log)), throughput)
+    assert len(calls) == 1
+
+    # Parse the log file again, if it is newer than the stored series
+    stat = os.stat(str(log))
+    os.utime(str(log), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    timeseries.load_throughput(parse, str(log))
+    assert len(calls) == 2
+
+
+def test_load_throughput_corrupt(tmpdir):
+    """Test that unreadable time series are parsed again."""
+    log = tmpdir.join("protein.log")
+    log.write("log")
+    tmpdir.join(".protein.throughput.npy").write("garbage")
+
+    throughput = timeseries.load_throughput(lambda f: series([1.0]), str(log))
+    np.testing.assert_equal(throughput, series([1.0]))
+
+
+def test_steady_state():
+    """Test that only the second half of the run is judged."""
+    drift, noise = timeseries.steady_state(series([50.0, 80.0] + [100.0] * 6))
+    assert drift == pytest.approx(0)
+    assert noise == pytest.approx(0)
+
+
+def test_steady_state_drift():
+    """Test that a performance that decreases linearly drifts."""
+    drift, noise = timeseries.steady_state(
+        series([100.0, 100.0, 100.0, 100.0, 100.0, 90.0, 80.0, 70.0])
+    )
+    # The line drops from 105 to 65 over the last four minutes.
+    assert drift == pytest.approx(-40 / 85)
+    assert noise == pytest.approx(0, abs=1e-12)
+    assert not timeseries.is_steady(drift, noise)
+
+
+def test_steady_state_noise():
+    """Test that a fluctuating performance is noisy."""
+    drift, noise = timeseries.steady_state(
+        series([100.0] * 4 + [80.0, 120.0, 120.0, 80.0])
+    )
+    assert drift == pytest.approx(0, abs=1e-12)
+    assert noise == pytest.approx(0.2)
+    assert not timeseries.is_steady(drift, noise)
+
+
+def test_steady_state_two_intervals():
+    """Test that two intervals in the second half are enough for the drift,
+    but not for the noise."""
+    drift, noise = timeseries.steady_state(series([100.0, 100.0, 100.0, 80.0]))
+    assert drift == pytest.approx(-40 / 90)
+    assert np.isnan(noise)
+    assert not timeseries.is_steady(drift, noise)
+
+
+@pytest.mark.parametrize("performance", [[], [100.0], [100.0] * 2])
+def test_steady_state_too_few_intervals(performance):
+    drift, noise = timeseries.steady_state(series(performance).reshape(-1, 2))
+    assert np.isnan(drift)
+    assert np.isnan(noise)
+    assert timeseries.is_steady(drift, noise)
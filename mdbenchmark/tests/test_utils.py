@@ -21,7 +21,9 @@ import os
 
 import datreant as dtr
 import jinja2
+import numpy as np
 import pandas as pd
+import pytest
 import tabulate
 from pandas.testing import assert_frame_equal
 
@@ -58,7 +60,7 @@ def test_get_possible_hosts():
     """
     hosts = utils.get_possible_hosts()
     assert isinstance(hosts, list)
-    assert len(hosts) == 3
+    assert len(hosts) == 4
 
 
 def test_print_possible_hosts(capsys):
@@ -66,7 +68,7 @@ def test_print_possible_hosts(capsys):
     utils.print_possible_hosts()
     out, err = capsys.readouterr()
 
-    assert out == "Available host templates:\ncobra\ndraco\nhydra\n"
+    assert out == "Available host templates:\ncobra\ndraco\nhydra\nlocal\n"
 
 
 def test_guess_host():
@@ -109,6 +111,27 @@ def test_parse_bundle(data):
     assert_frame_equal(test_output, expected_output)
 
 
+def test_parse_bundle_jobs(data):
+    """Test that analyzing in parallel does not change the resulting DataFrame."""
+    bundle = dtr.discover(data["analyze-files-w-errors"])
+    version = VersionFactory(categories=bundle.categories).version_class
+    kwargs = {
+        "columns": version.analyze_categories,
+        "sort_values_by": version.analyze_sort,
+    }
+    serial = utils.parse_bundle(bundle, **kwargs)
+    parallel = utils.parse_bundle(bundle, jobs=4, **kwargs)
+    assert_frame_equal(serial, parallel)
+
+
+def test_parallel_map():
+    with utils.parallel_map(1) as pmap:
+        assert pmap is map
+
+    with utils.parallel_map(3) as pmap:
+        assert list(pmap(lambda x: x * 2, range(10))) == list(range(0, 20, 2))
+
+
 def test_consolidate_dataframe(capsys, data):
     bundle = dtr.discover(data["analyze-files-gromacs"])
     version = VersionFactory(categories=bundle.categories).version_class
@@ -160,3 +183,225 @@ def test_print_dataframe(capsys, data):
     out, _ = capsys.readouterr()
 
     assert "\n".join(out.split("\n")) == expected_output
+
+
+def test_confidence_interval():
+    """Test the half width of the 95% confidence interval of the mean."""
+    assert np.isnan(utils.confidence_interval([10.0]))
+    assert np.isnan(utils.confidence_interval([10.0, np.nan]))
+    np.testing.assert_allclose(
+        utils.confidence_interval([10.0, 12.0, 14.0]), 4.303 * 2 / np.sqrt(3)
+    )
+    # The normal distribution is used for many replicates
+    values = np.tile([9.0, 11.0], 40)
+    np.testing.assert_allclose(
+        utils.confidence_interval(values), 1.960 * np.std(values, ddof=1) / np.sqrt(80),
+    )
+
+
+def test_aggregate_repeats():
+    """Test that replicates of a benchmark are aggregated into one row."""
+    df = pd.DataFrame(
+        {
+            "module": ["gromacs/2018"] * 5 + ["gromacs/2019"],
+            "nodes": [1, 1, 1, 2, 2, 1],
+            "performance": [10.0, 12.0, 14.0, 20.0, np.nan, 8.0],
+            "ncores": [32, 32, 32, 64, 64, 32],
+            "npme": [4, 4, 4, 8, 8, 4],
+            "timing_force": [70.0, 80.0, 90.0, 60.0, np.nan, 75.0],
+            "mdrun_options": [np.nan] * 6,
+            utils.REPLICATE_COLUMN: ["a", "a", "a", "b", "b", "c"],
+        }
+    )
+
+    df = utils.aggregate_repeats(df)
+
+    assert df["module"].tolist() == ["gromacs/2018"] * 2 + ["gromacs/2019"]
+    assert df["nodes"].tolist() == [1, 2, 1]
+    np.testing.assert_allclose(df["performance"], [12, 20, 8])
+    np.testing.assert_allclose(df["timing_force"], [80, 60, 75])
+    # Categories are taken from the first replicate and keep their type
+    assert df["ncores"].tolist() == [32, 64, 32]
+    assert df["npme"].dtype == np.int64
+    assert df["repeats"].tolist() == [3, 1, 1]
+    np.testing.assert_allclose(df["performance_std"], [2, np.nan, np.nan])
+    np.testing.assert_allclose(df["performance_min"], [10, 20, 8])
+    np.testing.assert_allclose(
+        df["performance_ci"], [4.303 * 2 / np.sqrt(3), np.nan, np.nan]
+    )
+    assert utils.REPLICATE_COLUMN not in df.columns
+
+
+def test_aggregate_repeats_unchanged():
+    """Test that benchmarks without replicates are not touched."""
+    df = pd.DataFrame(
+        {"module": ["gromacs/2018"] * 2, "nodes": [1, 2], "performance": [10.0, 18.0]}
+    )
+    assert_frame_equal(utils.aggregate_repeats(df), df)
+
+    keys = df.assign(**{utils.REPLICATE_COLUMN: ["a", "b"]})
+    assert_frame_equal(utils.aggregate_repeats(keys), df)
+
+
+def test_replicate_key(tmpdir):
+    """Test that only replicates generated with repeats share their key."""
+    treants = {}
+    for name, directory, repeat in [
+        ("protein", "a/n001_rep1", 1),
+        ("protein", "a/n001_rep2", 2),
+        ("protein", "b/n001_rep1", 1),
+        ("membrane", "a/n001_rep3", 3),
+        ("protein", "a/n002_rep1", 0),
+        ("protein", "a/n002_rep2", 0),
+    ]:
+        treant = dtr.Treant(str(tmpdir.join(directory)))
+        treant.categories = {"name": name, "repeat": repeat}
+        treants[directory] = utils.replicate_key(treant)
+
+    assert treants["a/n001_rep1"] == treants["a/n001_rep2"]
+    # Other sweeps, names or benchmarks without the category are not replicates
+    assert treants["b/n001_rep1"] != treants["a/n001_rep1"]
+    assert treants["a/n001_rep3"] != treants["a/n001_rep1"]
+    assert treants["a/n002_rep1"] != treants["a/n002_rep2"]
+
+
+def test_add_diagnostics():
+    """Test that the wasted time and suggestions for -npme are added."""
+    df = pd.DataFrame(
+        {
+            "nodes": [1, 2, 1],
+            "number_of_ranks": [16, 16, 16],
+            "multidir": [1, 1, 2],
+            "npme": [4, 4, np.nan],
+            "pme_load": [1.42, 1.0, np.nan],
+            "imbalance_wait": [9.6, 1.0, np.nan],
+            "pme_wait": [8.1, np.nan, np.nan],
+        }
+    )
+    df = utils.add_diagnostics(df)
+    np.testing.assert_allclose(df["wasted_time"], [17.7, 1.0, np.nan])
+    np.testing.assert_equal(df["suggested_npme"].tolist(), [5, 4, np.nan])
+
+    # Nothing to add for other MD engines
+    df = utils.add_diagnostics(pd.DataFrame({"nodes": [1]}))
+    assert list(df.columns) == ["nodes"]
+
+
+def test_rank_dataframe(capsys):
+    """Test that benchmarks are sorted by the column of `RANK_BY`."""
+    df = pd.DataFrame({"nodes": [1, 2, 3], "wasted_time": [5.0, np.nan, 1.0]})
+    ranked = utils.rank_dataframe(df, "waste")
+    assert ranked["nodes"].tolist() == [3, 1, 2]
+
+    with pytest.raises(SystemExit):
+        utils.rank_dataframe(df[["nodes"]], "waste")
+    out, _ = capsys.readouterr()
+    assert out == (
+        "ERROR Cannot rank the benchmarks by waste. None of the log files contains "
+        "the necessary information.\n"
+    )
+
+
+def test_rank_dataframe_descending():
+    """Test that higher values are better for throughput and efficiency."""
+    df = pd.DataFrame(
+        {
+            "nodes": [1, 2, 3],
+            "ns/day": [10.0, np.nan, 30.0],
+            "efficiency": [1.0, 0.5, 0.8],
+        }
+    )
+
+    ranked = utils.rank_dataframe(df, "efficiency")
+    assert ranked["nodes"].tolist() == [1, 3, 2]
+
+    ranked = utils.rank_dataframe(df, "throughput", performance_column="ns/day")
+    assert ranked["nodes"].tolist() == [3, 1, 2]
+
+
+def test_add_efficiency():
+    """Test the speedup, efficiency and cost of each group of benchmarks."""
+    df = pd.DataFrame(
+        {
+            "module": ["gromacs/2018"] * 3 + ["gromacs/2019"] * 3,
+            "nodes": [2, 4, 8, 1, 2, 3],
+            "performance": [100.0, 160.0, 240.0, np.nan, 48.0, 72.0],
+            "ncores": [64, 128, 256, 32, np.nan, 96],
+            "mdrun_options": [np.nan] * 6,
+        }
+    )
+
+    df = utils.add_efficiency(df, columns=["module", "use_gpu", "mdrun_options"])
+
+    np.testing.assert_allclose(df["speedup"], [1, 1.6, 2.4, np.nan, 1, 1.5])
+    np.testing.assert_allclose(df["efficiency"], [1, 0.8, 0.6, np.nan, 1, 1])
+    np.testing.assert_allclose(
+        df["core_hours_per_ns"], [15.36, 19.2, 25.6, np.nan, np.nan, 32]
+    )
+    np.testing.assert_allclose(df["node_hours_per_ns"], [0.48, 0.6, 0.8, np.nan, 1, 1])
+
+
+def test_pareto_front():
+    """Test that only configurations that are not dominated are kept."""
+    df = pd.DataFrame(
+        {
+            "host": ["draco"] * 5 + ["cobra"] * 2,
+            "nodes": [1, 2, 3, 4, 5, 1, 2],
+            "performance": [100.0, 180.0, 170.0, 250.0, 250.0, 50.0, 50.0],
+            "cost": [0.24, 0.27, 0.42, 0.38, 0.48, 0.48, 0.96],
+        }
+    )
+
+    front = utils.pareto_front(
+        df, columns=["host", "use_gpu"], maximize="performance", minimize="cost"
+    )
+
+    assert front[["host", "nodes"]].values.tolist() == [
+        ["cobra", 1],
+        ["draco", 1],
+        ["draco", 2],
+        ["draco", 4],
+    ]
+
+
+def test_fit_scaling():
+    """Test that scaling models are fitted to each group of benchmarks."""
+    nodes = [1, 2, 4, 8]
+    df = pd.DataFrame(
+        {
+            "module": ["gromacs/2018"] * 8 + ["gromacs/2019"],
+            "host": ["draco"] * 9,
+            "nodes": nodes * 2 + [1],
+            "performance": [1 / (0.1 + 0.9 / n) for n in nodes]
+            + [1 / (0.2 + 0.8 / n) for n in nodes[:3]]
+            + [np.nan, 10],
+            "mdrun_options": [""] * 4 + [np.nan] * 4 + [""],
+        }
+    )
+    df["host"] = df["host"].where(df.index < 4, "cobra")
+
+    fits = utils.fit_scaling(
+        df, columns=["module", "host", "mdrun_options", "use_gpu"], predict_nodes=[16],
+    )
+
+    assert list(fits.columns) == [
+        "module",
+        "host",
+        "mdrun_options",
+        "model",
+        "serial_fraction",
+        "efficient_nodes",
+        "predicted_16",
+    ]
+    # A single benchmark on gromacs/2019 is not enough for any model
+    assert fits[["host", "model"]].values.tolist() == [
+        ["draco", "amdahl"],
+        ["draco", "communication"],
+        ["cobra", "amdahl"],
+        ["cobra", "communication"],
+    ]
+    np.testing.assert_allclose(fits["serial_fraction"], [0.1, 0.1, 0.2, 0.2])
+    np.testing.assert_allclose(fits["efficient_nodes"], [5, 5, 3, 3])
+    np.testing.assert_allclose(
+        fits["predicted_16"], [1 / (0.1 + 0.9 / 16)] * 2 + [1 / (0.2 + 0.8 / 16)] * 2
+    )
@@ -0,0 +1,137 @@
+# -*- Mode: python; tab-width: 4; indent-tabs-mode:nil; coding:utf-8 -*-
+# vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4 fileencoding=utf-8
+#
+# MDBenchmark
+# Copyright (c) 2017-2020 The MDBenchmark development team and contributors
+# (see the file AUTHORS for the full list of names)
+#
+# MDBenchmark is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MDBenchmark is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
+"""Analysis of the performance of benchmarks over the course of a run."""
+import os
+
+import numpy as np
+
+# Relative drift or noise of the performance above which a benchmark is not
+# considered to run at a steady state.
+STEADY_STATE_TOLERANCE = 0.1
+# Minimum number of measured intervals needed to judge the drift and the noise.
+# A line fits two intervals exactly, so the noise needs at least three.
+MIN_INTERVALS = 2
+MIN_NOISE_INTERVALS = 3
+
+
+def throughput_filename(filename):
+    """Return the file the performance over time of a log file is stored in.
+
+    The file is hidden and placed next to the log file, e.g.,
+    `.protein.throughput.npy` for `protein.log`.
+    """
+    directory, basename = os.path.split(filename)
+    name = os.path.splitext(basename)[0]
+    return os.path.join(directory, ".{}.throughput.npy".format(name))
+
+
+def load_throughput(parse, filename):
+    """Return the performance over time of a log file.
+
+    The result of `parse` is stored as a NumPy file next to the log file, see
+    `throughput_filename`. It is only parsed again when the log file changed.
+
+    Parameters
+    ----------
+    parse : callable
+        Function that returns the performance over time of a log file, e.g.,
+        `mdbenchmark.mdengines.utils.parse_throughput`
+    filename : str
+        Filename of the log file
+
+    Returns
+    -------
+    numpy.ndarray
+        Array with the end of each interval in minutes and the performance
+        during the interval in ns/day.
+    """
+    stored = throughput_filename(filename)
+    try:
+        if os.stat(stored).st_mtime_ns >= os.stat(filename).st_mtime_ns:
+            return np.load(stored)
+    except (OSError, ValueError):
+        # Missing or unreadable files are written again.
+        pass
+
+    throughput = parse(filename)
+    try:
+        with open(stored, "wb") as fh:
+            np.save(fh, throughput)
+    except OSError:
+        # The log file is parsed again next time.
+        pass
+
+    return throughput
+
+
+def steady_state(throughput):
+    """Return the drift and the noise of the performance of a run.
+
+    Benchmarks are run with `-resethway`, so only intervals in the second half
+    of the run are used. A line is fitted to their performance, weighted by the
+    length of each interval. The drift is the change of the line from the
+    start to the end of the second half, the noise is the standard deviation
+    of the performance around the line. Both are relative to the mean
+    performance.
+
+    Parameters
+    ----------
+    throughput : numpy.ndarray
+        Performance over time as returned by `load_throughput`
+
+    Returns
+    -------
+    tuple
+        Drift and noise, or NaN if there are less than `MIN_INTERVALS`
+        intervals in the second half of the run. The noise is NaN for less
+        than `MIN_NOISE_INTERVALS` intervals.
+    """
+    if len(throughput) == 0:
+        return np.nan, np.nan
+
+    end, performance = throughput[:, 0], throughput[:, 1]
+    start = np.concatenate([[0], end[:-1]])
+    middle = (start + end) / 2
+    measured = middle >= end[-1] / 2
+    if measured.sum() < MIN_INTERVALS:
+        return np.nan, np.nan
+
+    weights = (end - start)[measured]
+    middle = middle[measured]
+    performance = performance[measured]
+    mean = np.average(performance, weights=weights)
+
+    # `polyfit` weights the residuals, not their squares
+    slope, intercept = np.polyfit(middle, performance, 1, w=np.sqrt(weights))
+    residuals = performance - (slope * middle + intercept)
+    drift = slope * (end[-1] - start[measured][0]) / mean
+    noise = np.nan
+    if measured.sum() >= MIN_NOISE_INTERVALS:
+        noise = np.sqrt(np.average(residuals ** 2, weights=weights)) / mean
+
+    return drift, noise
+
+
+def is_steady(drift, noise, tolerance=STEADY_STATE_TOLERANCE):
+    """Return whether neither the drift nor the noise exceed the `tolerance`.
+
+    Runs that could not be judged, i.e., with NaN values, are steady.
+    """
+    return not (abs(drift) > tolerance or noise > tolerance)
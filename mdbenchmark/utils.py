@@ -18,18 +18,56 @@
 # You should have received a copy of the GNU General Public License
 # along with MDBenchmark.  If not, see <http://www.gnu.org/licenses/>.
 import datetime as dt
+import itertools
 import os
+import re
 import socket
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 
 import click
 import datreant as dtr
+import numpy as np
 import pandas as pd
 import xdg
 from jinja2 import ChoiceLoader, Environment, FileSystemLoader, PackageLoader
 from tabulate import tabulate
 
-from mdbenchmark import console, mdengines
-from mdbenchmark.mdengines import detect_md_engine, utils
+from mdbenchmark import console, mdengines, profiling, scaling
+from mdbenchmark.constants import RANK_BY
+from mdbenchmark.mdengines import detect_md_engine, gromacs, utils
+
+# Columns added by `aggregate_repeats` when benchmarks were replicated
+REPEAT_COLUMNS = ["repeats", "performance_std", "performance_min", "performance_ci"]
+# Measured columns that `aggregate_repeats` averages, besides the performance
+# and the timings of GROMACS
+AVERAGED_COLUMNS = [
+    "load_imbalance",
+    "imbalance_wait",
+    "pme_load",
+    "pme_wait",
+    "throughput_drift",
+    "throughput_noise",
+]
+
+# Column that identifies the replicates of a benchmark, see `replicate_key`
+REPLICATE_COLUMN = "replicate_of"
+
+# Columns that are only printed, if any benchmark has a value for them.
+OPTIONAL_COLUMNS = ["mdrun_options"] + REPEAT_COLUMNS
+
+# 97.5% quantiles of Student's t-distribution by degrees of freedom, used for
+# 95% confidence intervals. Larger samples use the normal distribution.
+# fmt: off
+T_QUANTILES = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+# fmt: on
+Z_QUANTILE = 1.960
 
 # Order where to look for host templates: HOME -> etc -> package
 # home
@@ -111,7 +149,23 @@ def construct_generate_data(
     number_of_ranks,
     enable_hyperthreading,
     multidir,
+    mdrun_options=(),
+    repeats=1,
 ):
+    """Return the categories of all benchmarks to generate.
+
+    `mdrun_options` is a list of tuples with the name of an mdrun option and a
+    list of its values. A benchmark is created for every combination of values.
+    With more than one of `repeats`, each benchmark is generated that many
+    times, numbered from one. Otherwise the number of the replicate is zero.
+    """
+    replicates = range(1, repeats + 1) if repeats > 1 else [0]
+    names = [name for name, _ in mdrun_options]
+    sweeps = [
+        list(zip(names, values))
+        for values in itertools.product(*[values for _, values in mdrun_options])
+    ]
+
     data = []
     for module in modules:
         # Here we detect the MD engine (supported: GROMACS and NAMD).
@@ -138,7 +192,12 @@ def construct_generate_data(
                     ranks, threads = processor.get_ranks_and_threads(
                         _ranks, with_hyperthreading=enable_hyperthreading
                     )
-                    for nsim in multidir:
+                    for nsim, options, repeat in itertools.product(
+                        multidir, sweeps, replicates
+                    ):
+                        formatted_options = ""
+                        if options:
+                            formatted_options = engine.format_mdrun_options(options)
 
                         # Append the data to our list
                         data.append(
@@ -157,12 +216,79 @@ def construct_generate_data(
                                 threads,
                                 enable_hyperthreading,
                                 nsim,
+                                formatted_options,
+                                repeat,
                             ]
                         )
 
     return data
 
 
+def select_adaptive_nodes(df, columns, min_nodes, max_nodes, threshold):
+    """Return the rows of `df` that are needed next in an adaptive search over
+    the number of nodes.
+
+    The rows are grouped by `columns`. The performance of benchmarks that were
+    generated before is read from their log files and the next node counts are
+    chosen with `scaling.next_nodes`, using the mean performance of all
+    replicates. Existing benchmarks are never generated again. Groups with
+    benchmarks that did not finish yet are skipped.
+    """
+    # `mdbenchmark.discover` imports this module
+    from mdbenchmark.discover import TREANT_DIRECTORY
+
+    selected = []
+    for _, group in df.groupby(columns, sort=False):
+        performance = defaultdict(list)
+        pending = 0
+        label = None
+        for index, row in group.iterrows():
+            settings = [
+                row["nodes"],
+                row["number_of_ranks"],
+                row["number_of_threads"],
+                row["hyperthreading"],
+                row["multidir"],
+                row["mdrun_options"],
+            ]
+            label = os.path.join(
+                row["base_directory"].relpath,
+                utils.benchmark_dirname(*settings).split("_", 1)[1],
+            )
+            dirname = utils.benchmark_dirname(*settings, repeat=row["repeat"])
+            path = os.path.join(row["base_directory"].abspath, dirname)
+            if not os.path.isdir(os.path.join(path, TREANT_DIRECTORY)):
+                continue
+
+            with profiling.phase("parse"):
+                value = utils.analyze_benchmark(row["engine"], dtr.Treant(path))[2]
+            if pd.isnull(value):
+                pending += 1
+            else:
+                performance[row["nodes"]].append(value)
+        performance = {n: np.mean(values) for n, values in performance.items()}
+
+        if pending:
+            console.warn(
+                "Skipping {}: {} benchmarks did not finish yet.", label, pending
+            )
+            continue
+
+        nodes = scaling.next_nodes(performance, min_nodes, max_nodes, threshold)
+        if not nodes:
+            console.info(
+                "Finished the search for {}: efficient up to {} nodes.",
+                label,
+                scaling.efficient_nodes(performance, threshold),
+            )
+        selected.append(group[group["nodes"].isin(nodes)])
+
+    if not selected:
+        return df.iloc[:0]
+
+    return pd.concat(selected)
+
+
 def generate_output_name(extension):
     """ generate a unique filename based on the date and time for a given extension.
     """
@@ -171,42 +297,371 @@ def generate_output_name(extension):
     return out
 
 
-def parse_bundle(bundle, columns, sort_values_by, discard_performance=False):
-    """Generates a DataFrame from a datreant.Bundle."""
-    data = []
+@contextmanager
+def parallel_map(jobs=1):
+    """Provide a `map` function that runs on a pool of `jobs` threads.
+
+    The results are returned in the same order as the input. For a single job
+    we fall back to the builtin `map` and do not spawn any threads.
+    """
+    if jobs is None or jobs <= 1:
+        yield map
+        return
 
-    with click.progressbar(
-        bundle, length=len(bundle), label="Analyzing benchmarks", show_pos=True
-    ) as bar:
-        for treant in bar:
-            module = treant.categories["module"]
-            engine = detect_md_engine(module)
-            row = utils.analyze_benchmark(engine=engine, benchmark=treant)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        yield executor.map
 
-            version = 2
-            if "version" in treant.categories:
-                version = 3
-            if version == 2:
-                row.pop()  # multidir is not a category for version 2 data
-            row += [version]
 
-            if discard_performance:
-                row = row[:2] + row[3:]
+def replicate_key(treant):
+    """Return the key shared by all replicates of a benchmark.
 
-            data.append(row)
+    Replicates generated with `repeats` have the category `repeat` and their
+    directory names end with `_repN`. The key consists of the name of the
+    benchmark and its path without this suffix. All other benchmarks have a
+    key of their own.
+    """
+    categories = treant.categories
+    path = os.path.normpath(treant.abspath)
+    if "repeat" in categories and categories["repeat"]:
+        path = re.sub(r"_rep\d+$", "", path)
+    name = categories["name"] if "name" in categories else ""
+
+    return "{}:{}".format(name, path)
+
+
+def analyze_treant(
+    treant, discard_performance=False, cache=None, details=False, time_series=False
+):
+    """Return the row of a single benchmark for the DataFrame of `parse_bundle`.
+
+    With `details`, the additional columns parsed from the log files are
+    returned as a dictionary, too. See `mdengines.utils.analyze_benchmark` for
+    `time_series`.
+    """
+    module = treant.categories["module"]
+    engine = detect_md_engine(module)
+    with profiling.phase("parse"):
+        row, extra_columns = utils.analyze_benchmark(
+            engine=engine,
+            benchmark=treant,
+            cache=cache,
+            details=True,
+            time_series=time_series,
+        )
+
+    version = 2
+    if "version" in treant.categories:
+        version = 3
+    if version == 2:
+        # multidir and mdrun_options are not categories for version 2 data
+        del row[-2:]
+    row += [version]
+
+    if discard_performance:
+        row = row[:2] + row[3:]
+
+    if details:
+        extra_columns = dict(extra_columns)
+        extra_columns[REPLICATE_COLUMN] = replicate_key(treant)
+        return row, extra_columns
+
+    return row
+
+
+def parse_bundle(
+    bundle,
+    columns,
+    sort_values_by,
+    discard_performance=False,
+    jobs=1,
+    cache=None,
+    details=False,
+    time_series=False,
+):
+    """Generates a DataFrame from a `datreant.Bundle` or `BenchmarkList`.
 
-    df = pd.DataFrame(data, columns=columns)
+    With `jobs` > 1 the benchmarks are analyzed concurrently. The order of the
+    rows does not depend on the number of jobs. Parsed log files are looked up
+    in and added to the optional `mdbenchmark.cache.ResultsCache`.
+
+    With `details`, the columns parsed from the tables of the log files, e.g.,
+    the timings of GROMACS, are appended after `columns`, followed by the
+    `REPLICATE_COLUMN` used by `aggregate_repeats`. With `time_series`,
+    the drift and noise of the performance over the course of each run are
+    among them.
+    """
+    analyze = partial(
+        analyze_treant,
+        discard_performance=discard_performance,
+        cache=cache,
+        details=details,
+        time_series=time_series,
+    )
+
+    with parallel_map(jobs) as pmap:
+        with click.progressbar(
+            pmap(analyze, bundle),
+            length=len(bundle),
+            label="Analyzing benchmarks",
+            show_pos=True,
+        ) as bar:
+            data = list(bar)
+
+    with profiling.phase("aggregate"):
+        if details:
+            data, extra_columns = zip(*data) if data else ([], [])
+            df = pd.DataFrame(list(data), columns=columns)
+            df = pd.concat(
+                [df, pd.DataFrame(list(extra_columns), index=df.index)], axis=1
+            )
+        else:
+            df = pd.DataFrame(data, columns=columns)
 
     # Exit if no data is available
     if df.empty:
         console.error("There is no data for the given path.")
 
     # Sort values by `nodes`
-    df = df.sort_values(sort_values_by).reset_index(drop=True)
+    with profiling.phase("aggregate"):
+        df = df.sort_values(sort_values_by).reset_index(drop=True)
 
     return df
 
 
+def confidence_interval(values):
+    """Return the half width of the 95% confidence interval of the mean.
+
+    Missing values are ignored. Returns NaN for less than two values.
+    """
+    values = pd.Series(values).dropna()
+    n = len(values)
+    if n < 2:
+        return np.nan
+
+    quantile = T_QUANTILES[n - 2] if n - 1 <= len(T_QUANTILES) else Z_QUANTILE
+    return quantile * values.std() / np.sqrt(n)
+
+
+def aggregate_repeats(df, performance_column="performance"):
+    """Aggregate the replicates of each benchmark in a DataFrame created by
+    `parse_bundle` with `details`.
+
+    Benchmarks with the same `REPLICATE_COLUMN` are replicates, see
+    `replicate_key`. Their measured values, i.e., the performance, the timings
+    and the columns in `AVERAGED_COLUMNS`, are averaged. All other columns are
+    taken from the first replicate and keep their type. The number of finished
+    replicates and the standard deviation, minimum and 95% confidence interval
+    of the performance are added as `repeats`, `performance_std`,
+    `performance_min` and `performance_ci`. The `REPLICATE_COLUMN` is removed.
+    """
+    if REPLICATE_COLUMN not in df.columns:
+        return df
+    if not df.duplicated(REPLICATE_COLUMN).any():
+        return df.drop(columns=REPLICATE_COLUMN)
+
+    measured = [
+        column
+        for column in df.columns
+        if column == performance_column
+        or column.startswith("timing_")
+        or column in AVERAGED_COLUMNS
+    ]
+    groups = df.groupby(REPLICATE_COLUMN, sort=False)
+
+    # Both are ordered by the first appearance of each benchmark.
+    aggregated = groups.head(1).reset_index(drop=True)
+    aggregated[measured] = groups[measured].mean().reset_index(drop=True)
+
+    performance = groups[performance_column]
+    aggregated["repeats"] = performance.count().values
+    aggregated["performance_std"] = performance.std().values
+    aggregated["performance_min"] = performance.min().values
+    aggregated["performance_ci"] = performance.agg(confidence_interval).values
+
+    return aggregated.drop(columns=REPLICATE_COLUMN)
+
+
+def add_diagnostics(df):
+    """Add diagnostic columns to a DataFrame created by `parse_bundle`.
+
+    The wasted time is the share of the run time that was spent waiting due
+    to load imbalance between the PP ranks and between the PP and PME ranks.
+    For GROMACS runs with separate PME ranks, a number of PME ranks that
+    balances the load is suggested, see `mdengines.gromacs.suggest_npme`.
+    """
+    waiting = [c for c in ["imbalance_wait", "pme_wait"] if c in df.columns]
+    if waiting:
+        df["wasted_time"] = df[waiting].sum(axis=1, min_count=1)
+
+    if {"pme_load", "npme", "number_of_ranks"}.issubset(df.columns):
+        multidir = 1
+        if "multidir" in df.columns:
+            multidir = pd.to_numeric(df["multidir"], errors="coerce").fillna(1)
+        nranks = (
+            pd.to_numeric(df["nodes"], errors="coerce")
+            * pd.to_numeric(df["number_of_ranks"], errors="coerce")
+            / multidir
+        )
+        df["suggested_npme"] = [
+            gromacs.suggest_npme(*values)
+            for values in zip(df["pme_load"], df["npme"], nranks)
+        ]
+
+    return df
+
+
+def add_efficiency(df, columns, performance_column="performance"):
+    """Add the speedup, parallel efficiency and cost to a DataFrame created by
+    `parse_bundle`.
+
+    The benchmarks are grouped by `columns`, e.g., the `consolidate_categories`
+    of a version. Speedup and efficiency are relative to the benchmark with the
+    smallest number of nodes in each group, see `scaling.parallel_efficiency`.
+    The cost is given in core-hours and node-hours per simulated nanosecond.
+    """
+    columns = [column for column in columns if column in df.columns]
+    nodes = pd.to_numeric(df["nodes"], errors="coerce")
+    performance = pd.to_numeric(df[performance_column], errors="coerce")
+
+    speedup = pd.Series(np.nan, index=df.index)
+    efficiency = pd.Series(np.nan, index=df.index)
+    groups = df.groupby([df[column].fillna("") for column in columns], sort=False)
+    for index in groups.indices.values():
+        index = df.index[index]
+        finished = performance[index].notnull() & (performance[index] > 0)
+        if not finished.any():
+            continue
+        efficiency[index] = scaling.parallel_efficiency(
+            nodes[index], performance[index]
+        )
+        speedup[index] = efficiency[index] * nodes[index] / nodes[index][finished].min()
+
+    df["speedup"] = speedup
+    df["efficiency"] = efficiency
+    hours = 24 / performance.where(performance > 0)
+    df["core_hours_per_ns"] = pd.to_numeric(df["ncores"], errors="coerce") * hours
+    df["node_hours_per_ns"] = nodes * hours
+
+    return df
+
+
+def fit_scaling(
+    df,
+    columns,
+    predict_nodes,
+    threshold=scaling.EFFICIENCY_THRESHOLD,
+    performance_column="performance",
+):
+    """Fit all scaling models to each group of benchmarks in a DataFrame.
+
+    The benchmarks are grouped by `columns`, e.g., the `consolidate_categories`
+    of a version. Groups with too few finished benchmarks for a model are left
+    out.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per group and model with the values of `columns`, the name of
+        the model, the serial fraction, the largest number of nodes with a
+        parallel efficiency of at least `threshold` and the predicted
+        performance on each of `predict_nodes`.
+    """
+    columns = [column for column in columns if column in df.columns]
+    df = df.assign(**{column: df[column].fillna("") for column in columns})
+    prediction_columns = ["predicted_{}".format(n) for n in predict_nodes]
+
+    rows = []
+    for key, group in df.groupby(columns, sort=False):
+        key = list(key) if isinstance(key, tuple) else [key]
+        nodes = pd.to_numeric(group["nodes"], errors="coerce")
+        performance = pd.to_numeric(group[performance_column], errors="coerce")
+        min_nodes = nodes[performance.notnull()].min()
+        for model in scaling.MODELS:
+            coefficients = scaling.fit_model(nodes, performance, model)
+            if coefficients is None:
+                continue
+            rows.append(
+                key
+                + [
+                    model,
+                    scaling.serial_fraction(coefficients),
+                    scaling.predicted_efficient_nodes(
+                        coefficients, model, min_nodes, threshold
+                    ),
+                ]
+                + list(scaling.predict(coefficients, model, predict_nodes))
+            )
+
+    return pd.DataFrame(
+        rows,
+        columns=columns
+        + ["model", "serial_fraction", "efficient_nodes"]
+        + prediction_columns,
+    )
+
+
+def rank_dataframe(df, rank_by, performance_column="performance"):
+    """Sort a DataFrame by one of the columns in `RANK_BY`, best first.
+
+    Benchmarks without a value are put at the end. The performance is read from
+    `performance_column`, which is called `ns/day` for version 2 data.
+    """
+    column, ascending = RANK_BY[rank_by]
+    if column == "performance":
+        column = performance_column
+    if column not in df.columns or df[column].isnull().all():
+        console.error(
+            "Cannot rank the benchmarks by {}. None of the log files contains the "
+            "necessary information.",
+            rank_by,
+        )
+
+    return df.sort_values(
+        column, ascending=ascending, kind="mergesort", na_position="last"
+    ).reset_index(drop=True)
+
+
+def pareto_front(df, columns, maximize, minimize):
+    """Return the Pareto-optimal rows of each group of a DataFrame.
+
+    The rows are grouped by `columns`. A row is kept, unless another row of its
+    group is at least as good in both `maximize` and `minimize` and better in
+    one of them. The result is sorted by the groups and `minimize`.
+    """
+    columns = [column for column in columns if column in df.columns]
+    keep = []
+    for _, group in df.groupby([df[column].fillna("") for column in columns]):
+        for index, row in group.iterrows():
+            at_least_as_good = (group[maximize] >= row[maximize]) & (
+                group[minimize] <= row[minimize]
+            )
+            better = (group[maximize] > row[maximize]) | (
+                group[minimize] < row[minimize]
+            )
+            if not (at_least_as_good & better).any():
+                keep.append(index)
+
+    return (
+        df.loc[keep]
+        .sort_values(columns + [minimize], kind="mergesort")
+        .reset_index(drop=True)
+    )
+
+
+def printed_columns(df, columns):
+    """Return the `columns` worth printing.
+
+    Columns listed in `OPTIONAL_COLUMNS` are skipped, unless any benchmark has
+    a value for them.
+    """
+    return [
+        column
+        for column in columns
+        if column not in OPTIONAL_COLUMNS
+        or (column in df.columns and (df[column].fillna("") != "").any())
+    ]
+
+
 def map_columns(map_dict, columns):
     return [map_dict[key] for key in columns]
 
@@ -216,7 +671,8 @@ def consolidate_dataframe(df, columns):
     new_columns = df.columns
     agg = {column: "first" for column in new_columns if column not in columns}
     agg["nodes"] = format_interval_groups
-    new_df = df.groupby(columns, as_index=False).agg(agg)
+    with profiling.phase("aggregate"):
+        new_df = df.groupby(columns, as_index=False).agg(agg)
     return new_df[new_columns]
 
 
@@ -254,7 +710,8 @@ def group_consecutives(values, step=1):
 
 def format_interval_groups(nodes):
     output = []
-    groups = group_consecutives(nodes)
+    # Replicates of a benchmark have the same number of nodes
+    groups = group_consecutives(sorted(set(nodes)))
 
     for group in groups:
         if len(group) == 1:
@@ -106,6 +106,20 @@ class Version2Categories(VersionCategories):
         "hyperthreading": "Hyperthreading?",
         "job_name": "Job name",
         "submitted": "Submitted?",
+        "npme": "# PME ranks",
+        "pme_load": "PME/PP load",
+        "suggested_npme": "Suggested -npme",
+        "wasted_time": "Wasted time (%)",
+        "speedup": "Speedup",
+        "efficiency": "Efficiency",
+        "core_hours_per_ns": "Core-hours/ns",
+        "node_hours_per_ns": "Node-hours/ns",
+        "repeats": "Repeats",
+        "performance_std": "Std. dev. (ns/day)",
+        "performance_min": "Min. (ns/day)",
+        "performance_ci": "95% CI (ns/day)",
+        "throughput_drift": "Drift",
+        "throughput_noise": "Noise",
     }
 
 
@@ -118,6 +132,7 @@ class Version3Categories(VersionCategories):
         "number_of_ranks",
         "hyperthreading",
         "multidir",
+        "mdrun_options",
     ]
     generate_categories = [
         "name",
@@ -134,6 +149,8 @@ class Version3Categories(VersionCategories):
         "number_of_threads",
         "hyperthreading",
         "multidir",
+        "mdrun_options",
+        "repeat",
     ]
     generate_mapping = {
         "engine": "engine",
@@ -149,6 +166,8 @@ class Version3Categories(VersionCategories):
         "number_of_threads": "number_of_threads",
         "hyperthreading": "hyperthreading",
         "multidir": "multidir",
+        "mdrun_options": "mdrun_options",
+        "repeat": "repeat",
     }
     generate_printing = [
         "name",
@@ -161,6 +180,7 @@ class Version3Categories(VersionCategories):
         "number_of_threads",
         "hyperthreading",
         "multidir",
+        "mdrun_options",
     ]
     analyze_categories = [
         "module",
@@ -174,6 +194,7 @@ class Version3Categories(VersionCategories):
         "number_of_threads",
         "hyperthreading",
         "multidir",
+        "mdrun_options",
         "version",
     ]
     analyze_printing = [
@@ -188,8 +209,16 @@ class Version3Categories(VersionCategories):
         "number_of_threads",
         "hyperthreading",
         "multidir",
+        "mdrun_options",
+    ]
+    analyze_sort = [
+        "module",
+        "number_of_ranks",
+        "hyperthreading",
+        "use_gpu",
+        "mdrun_options",
+        "nodes",
     ]
-    analyze_sort = ["module", "number_of_ranks", "hyperthreading", "use_gpu", "nodes"]
     submit_categories = [
         "module",
         "nodes",
@@ -201,6 +230,7 @@ class Version3Categories(VersionCategories):
         "number_of_threads",
         "hyperthreading",
         "multidir",
+        "mdrun_options",
         "version",
     ]
     category_mapping = {
@@ -218,7 +248,22 @@ class Version3Categories(VersionCategories):
         "hyperthreading": "Hyperthreading?",
         "job_name": "Job name",
         "submitted": "Submitted?",
+        "npme": "# PME ranks",
+        "pme_load": "PME/PP load",
+        "suggested_npme": "Suggested -npme",
+        "wasted_time": "Wasted time (%)",
+        "speedup": "Speedup",
+        "efficiency": "Efficiency",
+        "core_hours_per_ns": "Core-hours/ns",
+        "node_hours_per_ns": "Node-hours/ns",
+        "repeats": "Repeats",
+        "performance_std": "Std. dev. (ns/day)",
+        "performance_min": "Min. (ns/day)",
+        "performance_ci": "95% CI (ns/day)",
+        "throughput_drift": "Drift",
+        "throughput_noise": "Noise",
         "multidir": "# Simulations",
+        "mdrun_options": "mdrun options",
     }
 
 
@@ -249,6 +294,9 @@ class VersionFactory:
             elif "module" in categories:
                 # Version 2 uses "module", but has no "version" key
                 self.version = "2"
+            elif not categories:
+                # No benchmarks were found. Set some default version.
+                self.version = "3"
             else:
                 # We found a version that is not enumerated above
                 self.version = "next"